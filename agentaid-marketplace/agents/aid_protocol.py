@@ -22,6 +22,8 @@ class QuoteRequest(Model):
     items: List[Item]
     priority: Priority
     max_eta_hours: float
+    # traceparent of the sender's span (services.tracing); echoed back on the reply
+    trace: Optional[str] = None
 
 class QuoteResponse(Model):
     need_id: str
@@ -34,6 +36,19 @@ class QuoteResponse(Model):
     # Items here reflect the supplier's **offered quantities** (capped by inventory)
     items: Optional[List[Item]] = None
     terms: Optional[str] = None
+    # set with reason="overloaded": ask again no sooner than this
+    retry_after_s: Optional[float] = None
+    trace: Optional[str] = None
+
+class BatchQuoteRequest(Model):
+    """Many needs in one envelope; suppliers price them against one inventory snapshot."""
+    batch_id: str
+    requests: List[QuoteRequest]
+
+class BatchQuoteResponse(Model):
+    batch_id: str
+    supplier_id: str
+    responses: List[QuoteResponse]  # one per request, same order
 
 class Accept(Model):
     need_id: str
@@ -41,6 +56,7 @@ class Accept(Model):
     accept: bool
     # Per-supplier allocation the needer wants this supplier to fulfill (partial allowed)
     items: List[Item]
+    trace: Optional[str] = None
 
 class AllocationNotice(Model):
     """Supplier→Needer: final confirmed allocation if multiple accepts exceed stock."""
@@ -48,30 +64,65 @@ class AllocationNotice(Model):
     supplier_id: str
     items: List[Item]   # confirmed allocated quantities (may be less than requested)
     note: Optional[str] = None
+    trace: Optional[str] = None
 
 class Restock(Model):
     """Add quantities to inventory (admin use)."""
     secret: str                 # shared secret
     items: List[Item]           # name + qty (+ optional unit / unit_price)
+    request_id: Optional[str] = None    # echoed in the InventoryStatus / ErrorMessage ack
 
 class AdjustInventory(Model):
     """Arbitrary delta adjustment (+/-) (admin use)."""
     secret: str
     items: List[Item]           # when qty is negative -> deduct
+    request_id: Optional[str] = None
 
 class InventoryStatus(Model):
-    """Echo inventory after change or on query."""
+    """
+    Echo inventory after change or on query. Also the supplier→coordinator
+    change feed, where `inventory` lists changed items with their new absolute
+    qty (or all items when `full`), and `seq` increases per supplier.
+    """
     supplier_id: str
     inventory: List[Item]
     note: Optional[str] = None
+    seq: Optional[int] = None
+    full: Optional[bool] = None
+    request_id: Optional[str] = None    # set when acking a Restock / AdjustInventory
 
 class ErrorMessage(Model):
     message: str
+    request_id: Optional[str] = None
 
 
 # doc-only; no logic
 @AidProtocol.on_message(model=QuoteRequest, replies=QuoteResponse)
 async def _req_to_resp(_, __, ___): pass
 
+@AidProtocol.on_message(model=BatchQuoteRequest, replies=BatchQuoteResponse)
+async def _batch_req_to_resp(_, __, ___): pass
+
 @AidProtocol.on_message(model=Accept, replies=AllocationNotice)
 async def _acc_to_alloc(_, __, ___): pass
+
+@AidProtocol.on_message(model=Restock, replies={InventoryStatus, ErrorMessage})
+async def _restock_to_status(_, __, ___): pass
+
+@AidProtocol.on_message(model=AdjustInventory, replies={InventoryStatus, ErrorMessage})
+async def _adjust_to_status(_, __, ___): pass
+
+# The replies themselves (handled by need agents / the coordinator). Declared
+# here too so every agent's spec, and so its published digest, is the same;
+# agents re-register these models with the same `replies` as above.
+@AidProtocol.on_message(model=QuoteResponse)
+async def _resp(_, __, ___): pass
+
+@AidProtocol.on_message(model=BatchQuoteResponse)
+async def _batch_resp(_, __, ___): pass
+
+@AidProtocol.on_message(model=AllocationNotice)
+async def _alloc(_, __, ___): pass
+
+@AidProtocol.on_message(model=InventoryStatus)
+async def _status(_, __, ___): pass
@@ -2,6 +2,7 @@
 import os
 import json
 import asyncio
+import sqlite3
 import time
 import uuid
 from typing import List, Dict, Any, Optional
@@ -13,19 +14,23 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from agents.aid_protocol import (
-    AidProtocol, QuoteRequest, QuoteResponse, Accept, AllocationNotice, Item, Geo
+    AidProtocol, QuoteRequest, QuoteResponse, BatchQuoteRequest, BatchQuoteResponse,
+    Accept, AllocationNotice, InventoryStatus, Item, Geo
 )
+from services.agent_registry import REGISTRY_HEARTBEAT_S, REGISTRY_POLL_S, open_registry
+from services.inventory_db import InventoryPool, find_suppliers_for_items
+from services.profiling import profiled, start_profiling
+from services.loopmon import LOOPMON_REPORT_S, format_block, start_loop_monitor
+from services.stock_view import StockView
 
-# ---------- telemetry helper ----------
-import httpx
+# ---------- telemetry helper (batched) ----------
+from services.telemetry import TelemetryExporter
+from services.tracing import Span, Tracer
 TELEMETRY_URL = os.getenv("TELEMETRY_URL", "http://127.0.0.1:8088/ingest")
+TELEMETRY = TelemetryExporter(TELEMETRY_URL)
 
 async def emit(ev: dict):
-    try:
-        async with httpx.AsyncClient(timeout=2) as c:
-            await c.post(TELEMETRY_URL, json=ev)
-    except Exception:
-        pass
+    TELEMETRY.emit(ev)
 
 # ---------- config ----------
 COORDINATOR_NAME = os.getenv("COORDINATOR_NAME", "coordination_agent_1")
@@ -44,6 +49,20 @@ DEFAULT_NEED_AGENT = "agent1qgw06us8yrrmnx40dq7vlm5vqyd25tv3qx3kyax9x5k2kz7kugux
 DEFAULT_SUPPLY_AGENT_1 = "agent1q0teepydaltv70mnht98uwcxz6murcysrm782k4qge58pap4w6vaqhea6y9"
 DEFAULT_SUPPLY_AGENT_2 = "agent1q0teepydaltv70mnht98uwcxz6murcysrm782k4qge58pap4w6vaqhea6y9"
 
+# Routing oracle: the shared inventory DB narrows QuoteRequest fan-out to supply
+# agents that actually stock something requested near the incident
+INV_DB_PATH = os.getenv("INV_DB_PATH", str(Path(__file__).resolve().parent.parent / "db" / "agent_aid.db"))
+ROUTING_RADIUS_KM = float(os.getenv("ROUTING_RADIUS_KM", "150"))
+ROUTING_MAX_CANDIDATES = int(os.getenv("ROUTING_MAX_CANDIDATES", "20"))
+
+# QuoteRequests for one supplier within a polling round go out as one BatchQuoteRequest;
+# keep QUOTE_BATCH_MAX within the suppliers' QUOTE_MAX_BATCH (their QUOTE_BURST by default)
+QUOTE_BATCHING = os.getenv("QUOTE_BATCHING", "1") != "0"
+QUOTE_BATCH_MAX = int(os.getenv("QUOTE_BATCH_MAX", "40"))
+
+# suppliers silent (no InventoryStatus) for longer than this are routed via the DB oracle again
+STOCK_VIEW_STALE_S = float(os.getenv("STOCK_VIEW_STALE_S", "120"))
+
 # ---------- data structures ----------
 @dataclass
 class DisasterRequest:
@@ -66,20 +85,54 @@ class AgentStatus:
     status: str  # "active", "busy", "offline"
     last_seen: float
     capabilities: List[str]
+    name: str = ""  # registry name; for supply agents, the SUPPLIER_NAME row in the inventory DB
 
 # ---------- agent setup ----------
 agent = Agent(name=COORDINATOR_NAME, seed=COORDINATOR_SEED, port=COORDINATOR_PORT)
+TRACER = Tracer("coordinator", COORDINATOR_NAME, TELEMETRY.emit)
+LOOP = None     # LoopMonitor, started with the agent
 
 # ---------- state management ----------
 active_requests: Dict[str, DisasterRequest] = {}
 agent_registry: Dict[str, AgentStatus] = {}
 request_assignments: Dict[str, str] = {}  # request_id -> agent_id
+supply_outbox: Dict[str, List[QuoteRequest]] = {}  # supply address -> requests to batch
+
+# live need/supply addresses from the local registry, merged with the env lists
+REGISTRY = open_registry()
+AGENT_WATCH = REGISTRY.watch(["need", "supply"]) if REGISTRY is not None else None
+
+ROUTING_DB: Optional[InventoryPool] = None    # opened at startup; queries run on its reader threads
+
+def open_routing_db() -> Optional[InventoryPool]:
+    """Pool on the shared inventory DB, or None if it is missing (never creates an empty one)."""
+    if not os.path.exists(INV_DB_PATH):
+        return None
+    try:
+        return InventoryPool(INV_DB_PATH, readers=2)
+    except sqlite3.Error:
+        return None
+STOCK = StockView(stale_s=STOCK_VIEW_STALE_S)  # live stock from supplier InventoryStatus feeds
+
+AGENT_CAPABILITIES = {
+    "need": ["disaster_assessment", "priority_evaluation"],
+    "supply": ["inventory_management", "logistics_coordination"],
+}
 
 # ---------- lifecycle ----------
 @agent.on_event("startup")
 async def startup(ctx: Context):
     ctx.logger.info(f"[{COORDINATOR_NAME}] Address: {agent.address}")
+    global LOOP, ROUTING_DB
     ctx.logger.info("Coordination Agent started - monitoring Claude service")
+    start_profiling(COORDINATOR_NAME)
+    LOOP = start_loop_monitor(COORDINATOR_NAME, on_block=lambda b: report_block(ctx, b))
+    # opening may migrate the file; keep that off the event loop
+    ROUTING_DB = await asyncio.get_running_loop().run_in_executor(None, open_routing_db)
+    if ROUTING_DB is None:
+        ctx.logger.warning(f"Inventory DB {INV_DB_PATH} unavailable; quote requests go to every supply agent")
+    if REGISTRY is not None:
+        await REGISTRY.run_write(REGISTRY.publish, agent.address, "coordinator", name=COORDINATOR_NAME)
     
     # Start monitoring Claude service for new requests
     asyncio.create_task(monitor_claude_service(ctx))
@@ -87,70 +140,120 @@ async def startup(ctx: Context):
     # Start agent discovery
     asyncio.create_task(discover_agents(ctx))
 
+def report_block(ctx: Context, block: Dict[str, Any]) -> None:
+    ctx.logger.warning(f"[{COORDINATOR_NAME}] {format_block(block)}")
+    TELEMETRY.emit({"ts": block["ts"], "agent_type": "coordinator", "agent_id": COORDINATOR_NAME,
+                    "event_type": "loop_block", "duration_ms": block["duration_ms"],
+                    "meta": {"stack": block["stack"]}})
+
+@agent.on_interval(period=LOOPMON_REPORT_S)
+async def report_loop(ctx: Context):
+    if LOOP is not None:
+        await emit({"ts": time.time(), "agent_type": "coordinator", "agent_id": COORDINATOR_NAME,
+                    "event_type": "loop_stats", "meta": LOOP.stats()})
+
 async def monitor_claude_service(ctx: Context):
     """Poll Claude service for new disaster requests"""
     while True:
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                # Get pending requests from Claude service
-                response = await client.get(f"{CLAUDE_SERVICE_URL}/api/uagent/pending-requests")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success") and data.get("requests"):
-                        for req_data in data["requests"]:
-                            await process_new_request(ctx, req_data)
-                
-                # Get agent updates
-                updates_response = await client.get(f"{CLAUDE_SERVICE_URL}/api/uagent/updates")
-                if updates_response.status_code == 200:
-                    updates_data = updates_response.json()
-                    if updates_data.get("success") and updates_data.get("updates"):
-                        for update in updates_data["updates"]:
-                            await process_agent_update(ctx, update)
-                            
+            await poll_claude_service(ctx)
         except Exception as e:
             # Don't log error every time - just wait and try again
             pass
         
         await asyncio.sleep(10)  # Poll every 10 seconds
 
+@profiled("monitor_claude_service")
+async def poll_claude_service(ctx: Context):
+    """One polling round (profiled per round; the loop itself never returns)"""
+    import httpx    # first round runs after startup, off the cold-start path
+    async with httpx.AsyncClient(timeout=10) as client:
+        # Get pending requests from Claude service
+        response = await client.get(f"{CLAUDE_SERVICE_URL}/api/uagent/pending-requests")
+        
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("success") and data.get("requests"):
+                for req_data in data["requests"]:
+                    await process_new_request(ctx, req_data)
+                await flush_supply_outbox(ctx)
+        
+        # Get agent updates
+        updates_response = await client.get(f"{CLAUDE_SERVICE_URL}/api/uagent/updates")
+        if updates_response.status_code == 200:
+            updates_data = updates_response.json()
+            if updates_data.get("success") and updates_data.get("updates"):
+                for update in updates_data["updates"]:
+                    await process_agent_update(ctx, update)
+
+def register_agent(addr: str, agent_type: str, name: str = ""):
+    """Add `addr` to agent_registry (or mark it active again)."""
+    status = agent_registry.get(addr)
+    if status is None:
+        agent_registry[addr] = AgentStatus(
+            agent_id=f"{agent_type}_{len(agent_registry)}",
+            agent_type=agent_type,
+            address=addr,
+            status="active",
+            last_seen=time.time(),
+            capabilities=AGENT_CAPABILITIES.get(agent_type, []),
+            name=name
+        )
+    else:
+        status.status = "active"
+        status.last_seen = time.time()
+        status.name = name or status.name
+
 async def discover_agents(ctx: Context):
-    """Discover and register available agents"""
+    """Register agents configured through the environment"""
     while True:
         try:
-            # In a real implementation, this would use agent discovery protocols
-            # For now, we'll use environment variables and direct communication
-            
-            # Register known need agents
             for addr in NEED_AGENT_ADDRESSES:
                 if addr not in agent_registry:
-                    agent_registry[addr] = AgentStatus(
-                        agent_id=f"need_{len(agent_registry)}",
-                        agent_type="need",
-                        address=addr,
-                        status="active",
-                        last_seen=time.time(),
-                        capabilities=["disaster_assessment", "priority_evaluation"]
-                    )
-            
-            # Register known supply agents
+                    register_agent(addr, "need")
             for addr in SUPPLY_AGENT_ADDRESSES:
                 if addr not in agent_registry:
-                    agent_registry[addr] = AgentStatus(
-                        agent_id=f"supply_{len(agent_registry)}",
-                        agent_type="supply",
-                        address=addr,
-                        status="active",
-                        last_seen=time.time(),
-                        capabilities=["inventory_management", "logistics_coordination"]
-                    )
-                    
+                    register_agent(addr, "supply")
         except Exception as e:
             ctx.logger.error(f"Error in agent discovery: {e}")
         
         await asyncio.sleep(30)  # Check every 30 seconds
 
+@agent.on_interval(period=REGISTRY_POLL_S)
+async def watch_registry(ctx: Context):
+    """Apply incremental registry updates (agents joining / leaving)"""
+    if AGENT_WATCH is None:
+        return
+    added, removed = AGENT_WATCH.poll()
+    for entry in added:
+        register_agent(entry.address, entry.role, entry.name or "")
+        addrs = NEED_AGENT_ADDRESSES if entry.role == "need" else SUPPLY_AGENT_ADDRESSES
+        if entry.address not in addrs:
+            addrs.append(entry.address)
+        ctx.logger.info(f"Registry: {entry.role} agent {entry.name or entry.address} joined")
+    for addr in removed:
+        status = agent_registry.get(addr)
+        if status is not None:
+            status.status = "offline"
+            if status.name:
+                STOCK.forget(status.name)
+            ctx.logger.info(f"Registry: {status.agent_type} agent {addr} left")
+
+@agent.on_interval(period=REGISTRY_HEARTBEAT_S)
+async def registry_heartbeat(ctx: Context):
+    if REGISTRY is not None:
+        await REGISTRY.run_write(REGISTRY.keepalive, agent.address)
+
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    if REGISTRY is not None:
+        await REGISTRY.run_write(REGISTRY.withdraw, agent.address)
+    if LOOP is not None:
+        await LOOP.close()
+    if ROUTING_DB is not None:
+        await asyncio.get_running_loop().run_in_executor(None, ROUTING_DB.close)
+    await TELEMETRY.close()
+
 async def process_new_request(ctx: Context, req_data: Dict[str, Any]):
     """Process a new disaster request from Claude service"""
     request_id = req_data.get("request_id")
@@ -180,7 +283,11 @@ async def process_new_request(ctx: Context, req_data: Dict[str, Any]):
     ctx.logger.info(f"  Priority: {disaster_req.priority}")
     
     # Assign to appropriate agents
-    await assign_request_to_agents(ctx, disaster_req)
+    root = TRACER.root("request", request_id, need_id=request_id, priority=disaster_req.priority)
+    try:
+        await assign_request_to_agents(ctx, disaster_req, root)
+    finally:
+        TRACER.finish(root)
     
     # Emit telemetry
     await emit({
@@ -193,7 +300,8 @@ async def process_new_request(ctx: Context, req_data: Dict[str, Any]):
         "items_count": len(disaster_req.items)
     })
 
-async def assign_request_to_agents(ctx: Context, disaster_req: DisasterRequest):
+async def assign_request_to_agents(ctx: Context, disaster_req: DisasterRequest,
+                                   span: Optional[Span] = None):
     """Assign disaster request to appropriate need and supply agents"""
     
     # Find available need agents
@@ -233,7 +341,8 @@ async def assign_request_to_agents(ctx: Context, disaster_req: DisasterRequest):
         location=geo,
         items=items,
         priority=disaster_req.priority,
-        max_eta_hours=24.0  # Default max ETA
+        max_eta_hours=24.0,  # Default max ETA
+        trace=span.traceparent if span is not None else None,
     )
     
     # Send to need agents
@@ -244,8 +353,14 @@ async def assign_request_to_agents(ctx: Context, disaster_req: DisasterRequest):
         except Exception as e:
             ctx.logger.error(f"Failed to send to need agent {need_agent.agent_id}: {e}")
     
-    # Send to supply agents
+    # Send to supply agents that can plausibly serve it
+    with TRACER.span("route", span, candidates=len(supply_agents)) as route:
+        supply_agents = await route_supply_agents(ctx, supply_agents, geo, items)
+        route.attrs["routed"] = len(supply_agents)
     for supply_agent in supply_agents:
+        if QUOTE_BATCHING:
+            supply_outbox.setdefault(supply_agent.address, []).append(quote_req)
+            continue
         try:
             await ctx.send(supply_agent.address, quote_req)
             ctx.logger.info(f"Sent quote request to supply agent: {supply_agent.agent_id}")
@@ -256,6 +371,58 @@ async def assign_request_to_agents(ctx: Context, disaster_req: DisasterRequest):
     request_assignments[disaster_req.request_id] = "assigned"
     disaster_req.status = "processing"
 
+async def flush_supply_outbox(ctx: Context):
+    """Send queued QuoteRequests, one BatchQuoteRequest per supplier (plain message for singles)."""
+    outbox = dict(supply_outbox)
+    supply_outbox.clear()
+    for addr, reqs in outbox.items():
+        for i in range(0, len(reqs), QUOTE_BATCH_MAX):
+            chunk = reqs[i:i + QUOTE_BATCH_MAX]
+            try:
+                if len(chunk) == 1:
+                    await ctx.send(addr, chunk[0])
+                else:
+                    await ctx.send(addr, BatchQuoteRequest(batch_id=str(uuid.uuid4()), requests=chunk))
+            except Exception as e:
+                ctx.logger.error(f"Failed to send {len(chunk)} quote request(s) to {addr}: {e}")
+        ctx.logger.info(f"Sent {len(reqs)} quote request(s) to supply agent {addr[:16]}…")
+
+async def route_supply_agents(ctx: Context, supply_agents: List[AgentStatus], geo: Geo,
+                              items: List[Item]) -> List[AgentStatus]:
+    """Live stock feed for suppliers that publish one, the inventory DB for the rest."""
+    stocked = STOCK.suppliers_with_any(it.name for it in items)
+    live = [a for a in supply_agents if a.name and STOCK.knows(a.name)]
+    others = [a for a in supply_agents if not (a.name and STOCK.knows(a.name))]
+    routed = [a for a in live if a.name in stocked] + await route_by_inventory_db(ctx, others, geo, items)
+    if not routed:
+        return supply_agents
+    if live:
+        ctx.logger.info(f"Stock view: {len(stocked & {a.name for a in live})}/{len(live)} "
+                        f"live-reporting suppliers hold requested items")
+    return routed
+
+async def route_by_inventory_db(ctx: Context, supply_agents: List[AgentStatus], geo: Geo,
+                                items: List[Item]) -> List[AgentStatus]:
+    """Pre-filter supply agents with the inventory DB; falls back to all of them."""
+    if not supply_agents:
+        return supply_agents
+    if ROUTING_DB is None:
+        return supply_agents
+    try:
+        hits = await ROUTING_DB.run_read(find_suppliers_for_items, geo.lat, geo.lon, ROUTING_RADIUS_KM,
+                                         [(it.name, it.qty) for it in items], ROUTING_MAX_CANDIDATES)
+    except sqlite3.Error as e:
+        ctx.logger.warning(f"Routing oracle unavailable, broadcasting: {e}")
+        return supply_agents
+    names = {h["name"] for h in hits}
+    # agents we can't map to an inventory row still get the request
+    routed = [a for a in supply_agents if not a.name or a.name in names]
+    if not routed:
+        return supply_agents
+    ctx.logger.info(f"Routing oracle: {len(routed)}/{len(supply_agents)} supply agents "
+                    f"({len(hits)} stocked suppliers within {ROUTING_RADIUS_KM:g} km)")
+    return routed
+
 async def process_agent_update(ctx: Context, update: Dict[str, Any]):
     """Process updates from agents"""
     request_id = update.get("request_id")
@@ -272,15 +439,25 @@ async def process_agent_update(ctx: Context, update: Dict[str, Any]):
             "agent_type": "coordinator",
             "agent_id": COORDINATOR_NAME,
             "event_type": "status_update",
-            "request_id": request_id,
-            "agent_id": agent_id,
-            "status": status
+            "meta": {"request_id": request_id, "agent_id": agent_id, "status": status},
         })
 
 # ---------- protocol handlers ----------
 @AidProtocol.on_message(model=QuoteResponse)
+@profiled("on_quote_response")
 async def on_quote_response(ctx: Context, sender: str, resp: QuoteResponse):
     """Handle quote responses from agents"""
+    await record_quote(ctx, sender, resp)
+
+@AidProtocol.on_message(model=BatchQuoteResponse)
+async def on_batch_quote_response(ctx: Context, sender: str, batch: BatchQuoteResponse):
+    """Unpack a supplier's batched answers"""
+    for resp in batch.responses:
+        await record_quote(ctx, sender, resp)
+
+async def record_quote(ctx: Context, sender: str, resp: QuoteResponse):
+    TRACER.finish(TRACER.start("quote.receive", resp.trace or TRACER.root("request", resp.need_id),
+                               need_id=resp.need_id, supplier_id=resp.supplier_id, ok=resp.ok))
     ctx.logger.info(f"Quote response from {sender}: {resp.supplier_id}")
     ctx.logger.info(f"  Cost: ${resp.total_cost}, ETA: {resp.eta_hours}h")
     ctx.logger.info(f"  Coverage: {resp.coverage_ratio}")
@@ -298,9 +475,18 @@ async def on_quote_response(ctx: Context, sender: str, resp: QuoteResponse):
         "coverage": resp.coverage_ratio
     })
 
+@AidProtocol.on_message(model=InventoryStatus)
+async def on_inventory_status(ctx: Context, sender: str, status: InventoryStatus):
+    """Fold a supplier's stock delta / snapshot into the stock view"""
+    STOCK.apply(status.supplier_id, [(i.name, i.qty) for i in status.inventory],
+                seq=status.seq, full=bool(status.full))
+
 @AidProtocol.on_message(model=AllocationNotice)
+@profiled("on_allocation_notice")
 async def on_allocation_notice(ctx: Context, sender: str, notice: AllocationNotice):
     """Handle allocation confirmations"""
+    TRACER.finish(TRACER.start("allocation.receive", notice.trace or TRACER.root("request", notice.need_id),
+                               need_id=notice.need_id, supplier_id=notice.supplier_id))
     ctx.logger.info(f"Allocation confirmed by {notice.supplier_id}")
     ctx.logger.info(f"  Items: {[f'{i.name}:{i.qty}' for i in notice.items]}")
     
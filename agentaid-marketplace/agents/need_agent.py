@@ -1,7 +1,8 @@
 # agents/need_agent.py
 import os, json, asyncio, uuid, time
-from typing import List, Tuple, Dict, Any
-from collections import defaultdict
+from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
+from collections import OrderedDict, defaultdict
 
 from uagents import Agent, Context
 import sys
@@ -11,25 +12,36 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from agents.aid_protocol import (
     AidProtocol, QuoteRequest, QuoteResponse, Accept, AllocationNotice, Item, Geo
 )
-
-# ---------- telemetry helper (POST to FastAPI ingest) ----------
-import httpx
+from agents.quote_records import ItemIds, ItemLine, QuoteRecord, SupplierTable
+from services.agent_registry import REGISTRY_HEARTBEAT_S, REGISTRY_POLL_S, open_registry
+from services.profiling import profiled, start_profiling
+from services.loopmon import LOOPMON_REPORT_S, format_block, start_loop_monitor
+
+# ---------- telemetry helper (batched POSTs to FastAPI ingest) ----------
+from services.telemetry import TelemetryExporter
+from services.tracing import Span, Tracer
 TELEMETRY_URL = os.getenv("TELEMETRY_URL", "http://127.0.0.1:8088/ingest")
+TELEMETRY = TelemetryExporter(TELEMETRY_URL)
 
 async def emit(ev: dict):
-    try:
-        async with httpx.AsyncClient(timeout=2) as c:
-            await c.post(TELEMETRY_URL, json=ev)
-    except Exception:
-        # telemetry is best-effort; never break the flow
-        pass
+    TELEMETRY.emit(ev)
 
 # ---------- optional intel (Bright Data -> Elastic) ----------
-try:
-    from intel.intel_client import fetch_intel as _fetch_intel  # optional module
-except Exception:
-    def _fetch_intel(lat: float, lon: float, radius_km: float = 25.0, horizon_min: int = 180):
-        return {"count": 0, "road_block_count": 0, "weather_worst_severity": 0, "nearby_inventory": []}
+def _no_intel(lat: float, lon: float, radius_km: float = 25.0, horizon_min: int = 180):
+    return {"count": 0, "road_block_count": 0, "weather_worst_severity": 0, "nearby_inventory": []}
+
+_INTEL = None
+
+def _fetch_intel(lat: float, lon: float, radius_km: float = 25.0, horizon_min: int = 180):
+    """Resolves the intel client (and its Elasticsearch client) on first use, not at startup."""
+    global _INTEL
+    if _INTEL is None:
+        try:
+            from intel.intel_client import fetch_intel  # optional module
+            _INTEL = fetch_intel
+        except Exception:
+            _INTEL = _no_intel
+    return _INTEL(lat, lon, radius_km=radius_km, horizon_min=horizon_min)
 
 # ---------- config ----------
 NEEDER_NAME = os.getenv("NEEDER_NAME", "need_agent_berkeley_1")
@@ -38,12 +50,80 @@ NEEDER_PORT = int(os.getenv("NEEDER_PORT", "8000"))
 ENDPOINT = [f"http://127.0.0.1:{NEEDER_PORT}/submit"]
 
 SUPPLY_ADDRESSES = [a.strip() for a in os.getenv("SUPPLY_ADDRS", "").split(",") if a.strip()]
+_STATIC_SUPPLY = frozenset(SUPPLY_ADDRESSES)   # env addresses are never dropped by discovery
 
 # Wait windows to collect multiple quotes before allocating
 QUOTE_WAIT_S = float(os.getenv("QUOTE_WAIT_S", "3.0"))        # delay after first valid quote
 QUOTE_MAX_WAIT_S = float(os.getenv("QUOTE_MAX_WAIT_S", "9.0"))  # absolute maximum from first quote
 
 agent = Agent(name=NEEDER_NAME, seed=NEEDER_SEED, port=NEEDER_PORT, endpoint=ENDPOINT)
+TRACER = Tracer("needer", NEEDER_NAME, TELEMETRY.emit)
+# need_id -> (root span, AllocationNotices still expected); the root closes on the last one
+OPEN_TRACES: "OrderedDict[str, List]" = OrderedDict()
+OPEN_TRACES_MAX = 1000
+LOOP = None     # LoopMonitor, started with the agent
+
+# ---------- address discovery (local registry; SUPPLY_ADDRS still honoured) ----------
+REGISTRY = open_registry()
+SUPPLY_WATCH = REGISTRY.watch(["supply"]) if REGISTRY is not None else None
+
+# ---------- in-memory working set (wire models only at the boundary) ----------
+SUPPLIERS = SupplierTable()
+ITEMS = ItemIds()
+
+# Quotes only mark the working set dirty; it is snapshotted to ctx.storage at most
+# once per SNAPSHOT_DEBOUNCE_S. State transitions (new need, allocation, completion)
+# snapshot immediately. On startup the last snapshot is reloaded.
+SNAPSHOT_KEY = "need_snapshot"
+SNAPSHOT_DEBOUNCE_S = float(os.getenv("SNAPSHOT_DEBOUNCE_S", "2.0"))
+
+@dataclass(slots=True)
+class NeedState:
+    need_id: str
+    requested: List[ItemLine]
+    remaining: Dict[int, int]           # item id -> qty still needed
+    quotes: List[QuoteRecord] = field(default_factory=list)
+    start_ts: float = 0.0
+    first_quote_ts: Optional[float] = None
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        return {
+            "need_id": self.need_id,
+            "requested": [ln.to_row(ITEMS) for ln in self.requested],
+            "remaining": {ITEMS.name(i): q for i, q in self.remaining.items()},
+            "quotes": [q.to_row(SUPPLIERS, ITEMS) for q in self.quotes],
+            "start_ts": self.start_ts,
+            "first_quote_ts": self.first_quote_ts,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snap: Dict[str, Any]) -> "NeedState":
+        return cls(
+            need_id=snap["need_id"],
+            requested=[ItemLine.from_row(r, ITEMS) for r in snap.get("requested") or []],
+            remaining={ITEMS.id(name): int(q) for name, q in (snap.get("remaining") or {}).items()},
+            quotes=[QuoteRecord.from_row(r, SUPPLIERS, ITEMS) for r in snap.get("quotes") or []],
+            start_ts=float(snap.get("start_ts") or 0.0),
+            first_quote_ts=snap.get("first_quote_ts"),
+        )
+
+_need: Optional[NeedState] = None
+_dirty = False
+
+def _snapshot(ctx: Context):
+    global _dirty
+    ctx.storage.set(SNAPSHOT_KEY, _need.to_snapshot() if _need else None)
+    _dirty = False
+
+def _restore(ctx: Context) -> Optional[NeedState]:
+    snap = ctx.storage.get(SNAPSHOT_KEY)
+    if not snap:
+        return None
+    try:
+        return NeedState.from_snapshot(snap)
+    except Exception as e:
+        ctx.logger.warning(f"Discarding unreadable need snapshot: {e}")
+        return None
 
 # ---------- scoring ----------
 def score_with_intel(resp: QuoteResponse) -> float:
@@ -63,21 +143,87 @@ def score_with_intel(resp: QuoteResponse) -> float:
 # ---------- lifecycle ----------
 @agent.on_event("startup")
 async def startup(ctx: Context):
+    global _need, _gather_task, LOOP
     ctx.logger.info(f"[{NEEDER_NAME}] Address: {agent.address}")
-    if not SUPPLY_ADDRESSES:
-        ctx.logger.warning("No supply addresses set. Provide env SUPPLY_ADDRS='agent1...,agent1...'")
+    LOOP = start_loop_monitor(NEEDER_NAME, on_block=lambda b: report_block(ctx, b))
+    start_profiling(NEEDER_NAME)
+    if REGISTRY is not None:
+        await REGISTRY.run_write(REGISTRY.publish, agent.address, "need", name=NEEDER_NAME,
+                                 endpoint=ENDPOINT[0])
     await asyncio.sleep(0.8)
-    await send_need(ctx)
+    _sync_suppliers()
+    if not SUPPLY_ADDRESSES:
+        ctx.logger.warning("No supply agents discovered yet; will broadcast as they register "
+                           "(or set env SUPPLY_ADDRS='agent1...,agent1...')")
+
+    # crash recovery: resume the in-flight need from the last snapshot
+    _need = _restore(ctx)
+    if _need is None:
+        await send_need(ctx)
+    elif _need.quotes:
+        ctx.logger.info(f"Resuming {_need.need_id} with {len(_need.quotes)} snapshotted quotes")
+        _gather_task = asyncio.create_task(_gather_then_allocate(ctx))
+    else:
+        ctx.logger.info(f"Resuming {_need.need_id}; re-broadcasting request")
+        await broadcast_need(ctx, _need)
+
+def report_block(ctx: Context, block: Dict[str, Any]) -> None:
+    ctx.logger.warning(f"[{NEEDER_NAME}] {format_block(block)}")
+    TELEMETRY.emit({"ts": block["ts"], "agent_type": "needer", "agent_id": NEEDER_NAME,
+                    "event_type": "loop_block", "duration_ms": block["duration_ms"],
+                    "meta": {"stack": block["stack"]}})
+
+@agent.on_interval(period=LOOPMON_REPORT_S)
+async def report_loop(ctx: Context):
+    if LOOP is not None:
+        await emit({"ts": time.time(), "agent_type": "needer", "agent_id": NEEDER_NAME,
+                    "event_type": "loop_stats", "meta": LOOP.stats()})
+
+def _sync_suppliers() -> List[str]:
+    """Apply registry changes to SUPPLY_ADDRESSES; returns newly added addresses."""
+    if SUPPLY_WATCH is None:
+        return []
+    added, removed = SUPPLY_WATCH.poll()
+    for addr in removed:
+        if addr in SUPPLY_ADDRESSES and addr not in _STATIC_SUPPLY:
+            SUPPLY_ADDRESSES.remove(addr)
+    new = [e.address for e in added if e.address not in SUPPLY_ADDRESSES]
+    SUPPLY_ADDRESSES.extend(new)
+    return new
+
+@agent.on_interval(period=REGISTRY_POLL_S)
+async def discover_suppliers(ctx: Context):
+    new = _sync_suppliers()
+    if new:
+        ctx.logger.info(f"Discovered {len(new)} new supplier(s); {len(SUPPLY_ADDRESSES)} known")
+        # a need still gathering quotes is offered to late joiners as well
+        if _need is not None:
+            await broadcast_need(ctx, _need, targets=new)
+
+@agent.on_interval(period=REGISTRY_HEARTBEAT_S)
+async def registry_heartbeat(ctx: Context):
+    if REGISTRY is not None:
+        await REGISTRY.run_write(REGISTRY.keepalive, agent.address)
+
+@agent.on_interval(period=SNAPSHOT_DEBOUNCE_S)
+async def flush_snapshot(ctx: Context):
+    if _dirty:
+        _snapshot(ctx)
+
+@agent.on_event("shutdown")
+async def shutdown(ctx: Context):
+    if _dirty:
+        _snapshot(ctx)
+    if REGISTRY is not None:
+        await REGISTRY.run_write(REGISTRY.withdraw, agent.address)
+    if LOOP is not None:
+        await LOOP.close()
+    await TELEMETRY.close()
 
 async def send_need(ctx: Context):
+    global _need
     need_id = f"need_{uuid.uuid4().hex[:6]}"
 
-    lat = float(os.getenv("NEED_LAT", "37.8715"))
-    lon = float(os.getenv("NEED_LON", "-122.2730"))
-    label = os.getenv("NEED_LABEL", "123 Main St, Berkeley")
-    priority = os.getenv("NEED_PRIORITY", "critical")
-    max_eta = float(os.getenv("NEED_MAX_ETA_H", "6"))
-
     items_json = os.getenv("NEED_ITEMS_JSON", '[{"name":"blanket","qty":200,"unit":"ea"}]')
     try:
         req_items = [Item(**x) for x in json.loads(items_json)]
@@ -85,68 +231,80 @@ async def send_need(ctx: Context):
         ctx.logger.error(f"Invalid NEED_ITEMS_JSON: {e}")
         req_items = [Item(name="blanket", qty=200, unit="ea")]
 
+    requested = [ItemLine.from_item(it, ITEMS) for it in req_items]
+    remaining: Dict[int, int] = {}
+    for ln in requested:
+        remaining[ln.item_id] = remaining.get(ln.item_id, 0) + ln.qty
+
+    # working set + immediate snapshot (state transition)
+    _need = NeedState(need_id=need_id, requested=requested, remaining=remaining, start_ts=_now())
+    _snapshot(ctx)
+
+    await broadcast_need(ctx, _need)
+
+async def broadcast_need(ctx: Context, need: NeedState, targets: Optional[List[str]] = None):
+    need_id = need.need_id
+    targets = SUPPLY_ADDRESSES if targets is None else targets
+
+    lat = float(os.getenv("NEED_LAT", "37.8715"))
+    lon = float(os.getenv("NEED_LON", "-122.2730"))
+    label = os.getenv("NEED_LABEL", "123 Main St, Berkeley")
+    priority = os.getenv("NEED_PRIORITY", "critical")
+    max_eta = float(os.getenv("NEED_MAX_ETA_H", "6"))
+
     req = QuoteRequest(
         need_id=need_id,
         location=Geo(lat=lat, lon=lon, label=label),
-        items=req_items,
+        items=[ln.to_item(ITEMS) for ln in need.requested],
         priority=priority,
         max_eta_hours=max_eta,
     )
 
-    ctx.logger.info(f"Broadcasting QuoteRequest for {need_id} to {len(SUPPLY_ADDRESSES)} suppliers")
-    for addr in SUPPLY_ADDRESSES:
-        await ctx.send(addr, req)
+    ctx.logger.info(f"Broadcasting QuoteRequest for {need_id} to {len(targets)} suppliers")
+    with TRACER.span("quote.send", _root(need), targets=len(targets)) as span:
+        req.trace = span.traceparent
+        for addr in targets:
+            await ctx.send(addr, req)
 
     # telemetry
     await emit({"ts": time.time(), "agent_type":"needer","agent_id": NEEDER_NAME,
                 "event_type":"quote_request","need_id": need_id, "lat": lat, "lon": lon})
 
-    # persist ephemeral state
-    try:
-        requested_items = [it.model_dump() for it in req_items]  # pydantic v2
-    except AttributeError:
-        requested_items = [it.dict() for it in req_items]        # pydantic v1
-    now = time.time()
-    ctx.storage.set("awaiting_need", need_id)
-    ctx.storage.set("quotes", [])
-    ctx.storage.set("requested_items", requested_items)
-    ctx.storage.set("alloc_start_ts", now)
-    ctx.storage.set("alloc_first_deadline", now + QUOTE_WAIT_S)
-    ctx.storage.set("alloc_final_deadline", now + QUOTE_MAX_WAIT_S)
-    ctx.storage.set("remaining_needed", {it["name"].lower(): int(it["qty"]) for it in requested_items})
-
 # ---------- quote collection with gather window ----------
 _gather_task = None
 
 def _now() -> float:
     return time.time()
 
+def _root(need: NeedState) -> Span:
+    """The need's root span; its ids derive from need_id, so they survive restarts."""
+    return TRACER.root("need", need.need_id, start=need.start_ts or None, need_id=need.need_id)
+
 async def _gather_then_allocate(ctx: Context):
     """Wait QUOTE_WAIT_S (bounded by QUOTE_MAX_WAIT_S) after first valid quote, then allocate."""
-    first_ts = ctx.storage.get("first_quote_ts") or _now()
+    first_ts = (_need.first_quote_ts if _need else None) or _now()
     deadline = min(first_ts + QUOTE_MAX_WAIT_S, _now() + QUOTE_WAIT_S)
     await asyncio.sleep(max(0.0, deadline - _now()))
 
-    need_id = ctx.storage.get("awaiting_need")
-    quotes: List[Dict[str, Any]] = ctx.storage.get("quotes") or []
-    valid = [q for q in quotes if q["resp"].get("ok")]
-    if need_id and valid:
+    if _need and _need.quotes:
+        TRACER.record("gather", _root(_need), start=first_ts, quotes=len(_need.quotes))
         await allocate_and_accept(ctx)
 
 @AidProtocol.on_message(model=QuoteResponse)
+@profiled("on_quote")
 async def on_quote(ctx: Context, sender: str, resp: QuoteResponse):
-    need_id = ctx.storage.get("awaiting_need")
-    if not need_id or resp.need_id != need_id:
+    global _dirty
+    if _need is None or resp.need_id != _need.need_id:
         return
 
-    quotes: List[Dict[str, Any]] = ctx.storage.get("quotes") or []
+    # parented on the supplier's handling span: the gap between the two is the return trip
+    recv = TRACER.start("quote.receive", resp.trace or _root(_need), need_id=resp.need_id,
+                        supplier_id=resp.supplier_id, ok=resp.ok)
     if resp.ok:
-        sc = score_with_intel(resp)
-        try:
-            resp_dict = resp.model_dump()
-        except AttributeError:
-            resp_dict = resp.dict()
-        quotes.append({"score": sc, "resp": resp_dict, "sender": sender})
+        with TRACER.span("score", recv):
+            sc = score_with_intel(resp)
+        _need.quotes.append(QuoteRecord.from_response(resp, sc, sender, SUPPLIERS, ITEMS))
+        _dirty = True
         ctx.logger.info(
             f"Quote from {sender} | cost=${resp.total_cost} | eta={resp.eta_hours}h | "
             f"cov={resp.coverage_ratio} | score={sc}"
@@ -158,102 +316,92 @@ async def on_quote(ctx: Context, sender: str, resp: QuoteResponse):
                     "meta":{"total_cost": resp.total_cost, "coverage": resp.coverage_ratio}})
 
         # mark first-quote arrival and start single gather task
-        if ctx.storage.get("first_quote_ts") is None:
-            ctx.storage.set("first_quote_ts", _now())
+        if _need.first_quote_ts is None:
+            _need.first_quote_ts = _now()
 
         global _gather_task
         if _gather_task is None or _gather_task.done():
             _gather_task = asyncio.create_task(_gather_then_allocate(ctx))
     else:
+        recv.attrs["reason"] = resp.reason
         ctx.logger.info(f"Rejected by {sender}: {resp.reason}")
-
-    ctx.storage.set("quotes", quotes)
+    TRACER.finish(recv)
 
 # ---------- allocation ----------
-def _deserialize_items(dicts: List[Dict[str, Any]]) -> List[Item]:
-    out = []
-    for d in dicts or []:
-        try:
-            out.append(Item(**d))
-        except Exception:
-            pass
-    return out
-
+@profiled("allocate_and_accept")
 async def allocate_and_accept(ctx: Context):
-    need_id = ctx.storage.get("awaiting_need")
-    if not need_id:
+    global _need
+    need = _need
+    if need is None or not need.quotes:
         return
+    need_id = need.need_id
+    remaining = need.remaining
+    root = _root(need)
+    alloc = TRACER.start("allocate", root, quotes=len(need.quotes))
 
-    quotes: List[Dict[str, Any]] = ctx.storage.get("quotes") or []
-    valid = [q for q in quotes if q["resp"].get("ok")]
-    if not valid:
-        return
+    if not remaining:
+        remaining[ITEMS.id("blanket")] = 200
 
-    requested_dicts = ctx.storage.get("requested_items") or []
-    requested = _deserialize_items(requested_dicts) or [Item(name="blanket", qty=200, unit="ea")]
-    remaining_needed: Dict[str, int] = ctx.storage.get("remaining_needed") or {it.name.lower(): it.qty for it in requested}
-
-    per_supplier: Dict[str, Dict[str, int]] = defaultdict(dict)
-    supplier_sender_addr: Dict[str, str] = {}
-    supplier_items_meta: Dict[str, Dict[str, Tuple[str, float]]] = defaultdict(dict)
+    # supplier idx -> item id -> ItemLine to accept
+    per_supplier: Dict[int, Dict[int, ItemLine]] = defaultdict(dict)
 
     # prefer higher score first
-    for q in sorted(valid, key=lambda q: -q["score"]):
-        resp = q["resp"]
-        sid = resp["supplier_id"]
-        supplier_sender_addr[sid] = q["sender"]
-        for it in resp.get("items", []) or []:
-            name = str(it["name"]).lower()
-            offer_qty = int(it.get("qty") or 0)
-            if offer_qty <= 0:
+    for q in sorted(need.quotes, key=lambda q: -q.score):
+        for ln in q.lines:
+            if ln.qty <= 0:
                 continue
-            need_qty = int(remaining_needed.get(name, 0))
+            need_qty = remaining.get(ln.item_id, 0)
             if need_qty <= 0:
                 continue
-            take = min(offer_qty, need_qty)
-            if take > 0:
-                per_supplier[sid][name] = per_supplier[sid].get(name, 0) + take
-                remaining_needed[name] = need_qty - take
-                supplier_items_meta[sid][name] = (it.get("unit"), float(it.get("unit_price") or 0.0))
-        if all(qty <= 0 for qty in remaining_needed.values()):
+            take = min(ln.qty, need_qty)
+            acc = per_supplier[q.supplier_idx].get(ln.item_id)
+            if acc is None:
+                per_supplier[q.supplier_idx][ln.item_id] = ItemLine(ln.item_id, take, ln.unit, ln.unit_price)
+            else:
+                acc.qty += take
+            remaining[ln.item_id] = need_qty - take
+        if all(qty <= 0 for qty in remaining.values()):
             break
 
     accepts_sent = 0
-    for sid, items_map in per_supplier.items():
-        acc_items: List[Item] = []
-        for name, qty in items_map.items():
-            if qty <= 0:
-                continue
-            unit, price = supplier_items_meta[sid].get(name, (None, 0.0))
-            acc_items.append(Item(name=name, qty=qty, unit=unit, unit_price=price))
+    for sidx, lines in per_supplier.items():
+        acc_items: List[Item] = [ln.to_item(ITEMS) for ln in lines.values() if ln.qty > 0]
         if not acc_items:
             continue
-        # IMPORTANT: use ctx.send (not agent.send)
-        await ctx.send(supplier_sender_addr[sid], Accept(
-            need_id=need_id, supplier_id=sid, accept=True, items=acc_items
-        ))
+        sid = SUPPLIERS.key(sidx)
+        with TRACER.span("accept.send", alloc, supplier_id=sid) as span:
+            # IMPORTANT: use ctx.send (not agent.send)
+            await ctx.send(SUPPLIERS.address(sidx), Accept(
+                need_id=need_id, supplier_id=sid, accept=True, items=acc_items, trace=span.traceparent
+            ))
         accepts_sent += 1
         await emit({"ts": time.time(), "agent_type":"needer","agent_id": NEEDER_NAME,
                     "event_type":"accept_sent","need_id": need_id,"supplier_id": sid})
         ctx.logger.info(f"ACCEPT → {sid}: " + ", ".join([f"{i.name}:{i.qty}" for i in acc_items]))
 
-    ctx.storage.set("remaining_needed", remaining_needed)
+    TRACER.finish(alloc, accepts=accepts_sent)
+    if accepts_sent:
+        _, pending = OPEN_TRACES.setdefault(need_id, [root, 0])
+        OPEN_TRACES[need_id][1] = pending + accepts_sent
+        while len(OPEN_TRACES) > OPEN_TRACES_MAX:
+            OPEN_TRACES.popitem(last=False)
 
-    # If everything is filled, clear state
-    if accepts_sent > 0 and all(qty <= 0 for qty in remaining_needed.values()):
-        for k in ("awaiting_need","quotes","requested_items","alloc_start_ts",
-                  "alloc_first_deadline","alloc_final_deadline","remaining_needed","first_quote_ts"):
-            try:
-                if hasattr(ctx.storage, "remove"):
-                    ctx.storage.remove(k)
-                else:
-                    ctx.storage.set(k, None)
-            except Exception:
-                ctx.storage.set(k, None)
+    # If everything is filled, clear state; either way snapshot the transition
+    if accepts_sent > 0 and all(qty <= 0 for qty in remaining.values()):
+        _need = None
+    _snapshot(ctx)
 
 # ---------- final confirmation ----------
 @AidProtocol.on_message(model=AllocationNotice)
+@profiled("on_allocation")
 async def on_allocation(ctx: Context, sender: str, msg: AllocationNotice):
+    TRACER.finish(TRACER.start("allocation.receive", msg.trace or TRACER.root("need", msg.need_id),
+                               need_id=msg.need_id, supplier_id=msg.supplier_id))
+    open_trace = OPEN_TRACES.get(msg.need_id)
+    if open_trace is not None:
+        open_trace[1] -= 1
+        if open_trace[1] <= 0:      # last confirmation: close the end-to-end span
+            TRACER.finish(OPEN_TRACES.pop(msg.need_id)[0])
     summary = ", ".join([f"{i.name}:{i.qty}" for i in msg.items])
     ctx.logger.info(f"CONFIRMED by {msg.supplier_id}: {summary} ({msg.note or 'final allocation'})")
     await emit({"ts": time.time(), "agent_type":"needer","agent_id": NEEDER_NAME,
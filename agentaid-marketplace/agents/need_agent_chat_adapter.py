@@ -7,16 +7,17 @@ Exposes the need agent functionality via Chat Protocol for Agentverse deployment
 import os
 import json
 import asyncio
-from typing import cast, Dict, List, Any
+from typing import TYPE_CHECKING, cast, Dict, List, Any
 from fastapi import FastAPI
-import httpx
-from uagents_core.contrib.protocols.chat import ChatMessage, TextContent
 from uagents_core.envelope import Envelope
 from uagents_core.identity import Identity
-from uagents_core.models import Model
-from uagents_core.utils.messages import parse_envelope
 import math
 
+# httpx and the chat-protocol pieces (ChatMessage, parse_envelope -> requests) are
+# imported on first use, so the adapter binds its port without paying for them
+if TYPE_CHECKING:
+    import httpx
+
 # Agent configuration
 AGENT_NAME = "AgentAid Need Agent"
 AGENT_SEED_PHRASE = os.environ.get("AGENT_SEED_PHRASE", "need_agent_berkeley_1_demo_seed")
@@ -130,6 +131,9 @@ async def agent_info():
 @app.post("/")
 async def handle_message(env: Envelope):
     """Handle incoming chat messages via Chat Protocol"""
+    from uagents_core.contrib.protocols.chat import ChatMessage, TextContent
+    from uagents_core.models import Model
+    from uagents_core.utils.messages import parse_envelope
     try:
         # Parse the incoming chat message
         msg = cast(ChatMessage, parse_envelope(env, ChatMessage))
@@ -291,6 +295,7 @@ Thank you for using AgentAid! 🚨
 
 async def query_supply_agents(need_request: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Query all supply agents with the need request"""
+    import httpx
     quotes = []
 
     async with httpx.AsyncClient(timeout=30.0) as client:
@@ -309,8 +314,10 @@ async def query_supply_agents(need_request: Dict[str, Any]) -> List[Dict[str, An
 
     return quotes
 
-async def query_single_supply_agent(client: httpx.AsyncClient, supplier: Dict[str, Any], need_request: Dict[str, Any]) -> Dict[str, Any]:
+async def query_single_supply_agent(client: "httpx.AsyncClient", supplier: Dict[str, Any], need_request: Dict[str, Any]) -> Dict[str, Any]:
     """Query a single supply agent"""
+    from uagents_core.contrib.protocols.chat import ChatMessage, TextContent
+    from uagents_core.models import Model
     try:
         print(f"📤 Querying {supplier['name']} at {supplier['endpoint']}")
 
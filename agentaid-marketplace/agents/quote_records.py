@@ -0,0 +1,135 @@
+# agents/quote_records.py
+"""
+Compact in-memory quote/item records.
+
+Agents hold quotes as slotted dataclasses keyed by small ints (supplier index,
+item id) and only build pydantic `Item`/`QuoteResponse` models at the protocol
+boundary: when a message arrives, when one is sent, and when state is persisted.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from agents.aid_protocol import Item, QuoteResponse
+from services.item_catalog import canonical_key
+
+
+class Interner:
+    """Bidirectional str <-> small int table (ids are process-local)."""
+    __slots__ = ("_ids", "_keys")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._keys: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def id(self, key: str) -> int:
+        idx = self._ids.get(key)
+        if idx is None:
+            idx = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+        return idx
+
+    def key(self, idx: int) -> str:
+        return self._keys[idx]
+
+
+class ItemIds(Interner):
+    """Item names interned by canonical key, so 'Blankets', 'blanket' and 'blankets' share one id."""
+    __slots__ = ("_raw", "_display")
+
+    def __init__(self):
+        super().__init__()
+        self._raw: Dict[str, int] = {}
+        self._display: List[str] = []
+
+    def id(self, name: str) -> int:
+        idx = self._raw.get(name)
+        if idx is None:
+            idx = super().id(canonical_key(name))
+            if idx == len(self._display):
+                self._display.append(name.lower())
+            self._raw[name] = idx
+        return idx
+
+    def name(self, idx: int) -> str:
+        """First spelling seen for this item (what we send back on the wire)."""
+        return self._display[idx]
+
+
+class SupplierTable(Interner):
+    """supplier_id -> index, plus the sender address each supplier replies from."""
+    __slots__ = ("_addrs",)
+
+    def __init__(self):
+        super().__init__()
+        self._addrs: List[str] = []
+
+    def add(self, supplier_id: str, sender: str) -> int:
+        idx = self.id(supplier_id)
+        if idx == len(self._addrs):
+            self._addrs.append(sender)
+        else:
+            self._addrs[idx] = sender
+        return idx
+
+    def address(self, idx: int) -> str:
+        return self._addrs[idx]
+
+
+@dataclass(slots=True)
+class ItemLine:
+    item_id: int
+    qty: int
+    unit: Optional[str] = None
+    unit_price: float = 0.0
+
+    @classmethod
+    def from_item(cls, it: Item, items: ItemIds) -> "ItemLine":
+        return cls(items.id(it.name), int(it.qty or 0), it.unit, float(it.unit_price or 0.0))
+
+    def to_item(self, items: ItemIds) -> Item:
+        return Item(name=items.name(self.item_id), qty=self.qty, unit=self.unit, unit_price=self.unit_price)
+
+    # rows use names, not ids: interned ids do not survive a restart
+    def to_row(self, items: ItemIds) -> list:
+        return [items.name(self.item_id), self.qty, self.unit, self.unit_price]
+
+    @classmethod
+    def from_row(cls, row: list, items: ItemIds) -> "ItemLine":
+        name, qty, unit, price = row
+        return cls(items.id(name), int(qty), unit, float(price or 0.0))
+
+
+@dataclass(slots=True)
+class QuoteRecord:
+    supplier_idx: int
+    score: float
+    coverage: float
+    eta_hours: float
+    total_cost: float
+    lines: Tuple[ItemLine, ...]
+
+    @classmethod
+    def from_response(cls, resp: QuoteResponse, score: float, sender: str,
+                      suppliers: SupplierTable, items: ItemIds) -> "QuoteRecord":
+        return cls(
+            supplier_idx=suppliers.add(resp.supplier_id, sender),
+            score=score,
+            coverage=float(resp.coverage_ratio or 0.0),
+            eta_hours=float(resp.eta_hours or 0.0),
+            total_cost=float(resp.total_cost or 0.0),
+            lines=tuple(ItemLine.from_item(it, items) for it in (resp.items or [])),
+        )
+
+    def to_row(self, suppliers: SupplierTable, items: ItemIds) -> list:
+        return [suppliers.key(self.supplier_idx), suppliers.address(self.supplier_idx),
+                self.score, self.coverage, self.eta_hours, self.total_cost,
+                [ln.to_row(items) for ln in self.lines]]
+
+    @classmethod
+    def from_row(cls, row: list, suppliers: SupplierTable, items: ItemIds) -> "QuoteRecord":
+        sid, sender, score, cov, eta, cost, lines = row
+        return cls(suppliers.add(sid, sender), float(score), float(cov), float(eta), float(cost),
+                   tuple(ItemLine.from_row(r, items) for r in lines))
@@ -1,8 +1,15 @@
 
 import os
+import hmac
+import hashlib
 import json
+import logging
 import math
-from typing import List, Dict, Any
+import re
+import time
+import asyncio
+from collections import Counter, OrderedDict
+from typing import Awaitable, List, Dict, Any, Set, Tuple, Hashable
 
 from uagents import Agent, Context
 import sys
@@ -13,21 +20,41 @@ from agents.aid_protocol import (
     AidProtocol,
     QuoteRequest,
     QuoteResponse,
+    BatchQuoteRequest,
+    BatchQuoteResponse,
     Accept,
     AllocationNotice,
+    Restock,
+    AdjustInventory,
+    InventoryStatus,
+    ErrorMessage,
     Item,
     Geo,
 )
 
 # ---- DB helpers (from services/inventory_db.py) ----
 from services.inventory_db import (
-    connect,
-    ensure_supplier,
     get_supplier_config,
-    get_inventory,
+    inventory_snapshot,
     offer_for_request,
-    deduct_allocation,
 )
+from services.async_inventory import AsyncInventory
+from services.item_catalog import ItemCatalog, normalize
+from services.quote_cache import QuoteCache
+from services.priority_scheduler import PRIORITIES, PriorityScheduler
+from services.admission import BATCH_TOO_LARGE, OVERLOADED, AdmissionControl
+from services.profiling import profiled, start_profiling
+from services.loopmon import LOOPMON_REPORT_S, format_block, start_loop_monitor
+from services.agent_registry import REGISTRY_HEARTBEAT_S, open_registry
+
+# ---------- telemetry helper (batched POSTs to FastAPI ingest) ----------
+from services.telemetry import TelemetryExporter
+from services.tracing import Span, Tracer
+TELEMETRY_URL = os.getenv("TELEMETRY_URL", "http://127.0.0.1:8088/ingest")
+TELEMETRY = TelemetryExporter(TELEMETRY_URL)
+
+async def emit(ev: dict):
+    TELEMETRY.emit(ev)
 
 # ---------- CONFIG ----------
 DB_PATH = os.getenv("INV_DB_PATH", "db/agent_aid.db")
@@ -46,6 +73,47 @@ if _endpoint_env:
 else:
     ENDPOINT = [f"http://127.0.0.1:{SUPPLIER_PORT}/submit"]
 
+# Quote memoization for identical repeated requests (0 disables)
+QUOTE_CACHE_TTL_S = float(os.getenv("QUOTE_CACHE_TTL_S", "2.0"))
+QUOTE_CACHE_GRID_DEG = float(os.getenv("QUOTE_CACHE_GRID_DEG", "0.01"))
+QUOTE_CACHE_STATS_S = float(os.getenv("QUOTE_CACHE_STATS_S", "30.0"))
+
+# Inventory change feed to coordinators: changed items are coalesced for
+# INVENTORY_FEED_S, with a full snapshot every INVENTORY_FULL_SYNC_S
+COORDINATOR_ADDRESSES = [a.strip() for a in os.getenv("COORDINATOR_ADDRS", "").split(",") if a.strip()]
+INVENTORY_FEED_S = float(os.getenv("INVENTORY_FEED_S", "0.5"))
+INVENTORY_FULL_SYNC_S = float(os.getenv("INVENTORY_FULL_SYNC_S", "60.0"))
+
+# Quote work is queued per priority and served by SCHED_WORKERS workers.
+# SCHED_POLICY: "weighted" (stride by weight), "strict" or "fifo" (arrival
+# order, for comparison). Each SCHED_AGING_S a job waits lifts it one level.
+SCHED_WORKERS = int(os.getenv("SCHED_WORKERS", "4"))
+SCHED_POLICY = os.getenv("SCHED_POLICY", "weighted").lower()
+SCHED_AGING_S = float(os.getenv("SCHED_AGING_S", "1.0"))
+SCHED_STATS_S = float(os.getenv("SCHED_STATS_S", "30.0"))
+
+# Admission control for quote traffic: per-sender token bucket
+# (QUOTE_RATE_PER_S, QUOTE_BURST; rate 0 disables) and a cap on quote jobs
+# pending in the scheduler, the last QUOTE_CRITICAL_RESERVE of it for
+# critical requests. Anything over is answered ok=False, reason="overloaded".
+# Both count quotes, so a BatchQuoteRequest costs one token and one pending
+# slot per request; batches over QUOTE_MAX_BATCH (default: the burst, the
+# most a bucket can ever hold) are refused with reason="batch_too_large".
+QUOTE_RATE_PER_S = float(os.getenv("QUOTE_RATE_PER_S", "20"))
+QUOTE_BURST = float(os.getenv("QUOTE_BURST", "40"))
+QUOTE_MAX_BATCH = int(os.getenv("QUOTE_MAX_BATCH", str(int(QUOTE_BURST))))
+QUOTE_MAX_PENDING = int(os.getenv("QUOTE_MAX_PENDING", "256"))
+QUOTE_CRITICAL_RESERVE = float(os.getenv("QUOTE_CRITICAL_RESERVE", "0.1"))
+
+# Accept idempotency: applied Accepts are remembered for ACCEPT_DEDUP_TTL_S,
+# in the DB (survives restarts) and for the newest ACCEPT_DEDUP_CACHE in memory
+ACCEPT_DEDUP_TTL_S = float(os.getenv("ACCEPT_DEDUP_TTL_S", str(7 * 24 * 3600)))
+ACCEPT_DEDUP_CACHE = int(os.getenv("ACCEPT_DEDUP_CACHE", "10000"))
+ACCEPT_PRUNE_S = float(os.getenv("ACCEPT_PRUNE_S", "3600"))
+
+# Shared secret for Restock / AdjustInventory; admin messages are refused when unset
+SUPPLY_ADMIN_SECRET = os.getenv("SUPPLY_ADMIN_SECRET", "")
+
 # Defaults used only if supplier row doesn’t exist yet
 DEFAULT_CFG = dict(
     lat=37.78,
@@ -58,9 +126,55 @@ DEFAULT_CFG = dict(
 
 # ---------- Agent + DB ----------
 agent = Agent(name=SUPPLIER_NAME, seed=SUPPLIER_SEED, port=SUPPLIER_PORT, endpoint=ENDPOINT)
-CONN = connect(DB_PATH)
+TRACER = Tracer("supplier", SUPPLIER_NAME, TELEMETRY.emit)
+# reads on pooled read-only connections, deductions group-committed by one writer task
+INV = AsyncInventory.open(DB_PATH)
+PENDING_WRITES: set = set()     # commit/ack tasks, referenced until done
+SCHED = PriorityScheduler(workers=SCHED_WORKERS, policy=SCHED_POLICY, aging_s=SCHED_AGING_S)
+ADMISSION = AdmissionControl(rate=QUOTE_RATE_PER_S, burst=QUOTE_BURST, max_pending=QUOTE_MAX_PENDING,
+                             workers=SCHED_WORKERS, critical_reserve=QUOTE_CRITICAL_RESERVE)
 SUPPLIER_ID: int | None = None
+LOOP = None     # LoopMonitor, started with the agent
+# (need_id, content hash) -> (created_at, future of the AllocationNotice JSON), oldest first
+ACCEPTS: "OrderedDict[Tuple[str, str], Tuple[float, asyncio.Future]]" = OrderedDict()
 CFG: Dict[str, Any] = {}
+QUOTES = QuoteCache(ttl_s=QUOTE_CACHE_TTL_S, grid_deg=QUOTE_CACHE_GRID_DEG)
+REGISTRY = open_registry()
+DIRTY_ITEMS: Set[int] = set()   # item ids changed since the last InventoryStatus
+# the event loop's own copy of the item catalog, loaded on a reader thread; the
+# writer connection's catalog belongs to the writer thread
+ITEM_KEYS = ItemCatalog()
+FEED_SEQ = time.time_ns() // 1_000_000  # ms base keeps seq increasing across restarts
+FEED_TARGETS: Set[str] = set()
+LAST_FULL_SYNC = 0.0
+
+class _DeferredReplyFilter(logging.Filter):
+    """
+    uAgents checks for a reply as soon as a handler returns. Drops its "No
+    valid reply" error only for a message whose handler handed the reply to a
+    task (see _defer_reply), once per expect(); that task reports a missing
+    reply itself when it ends. Every other missing reply is still logged.
+    """
+    PATTERN = re.compile(r"No valid reply .* was sent to (\S+) for received message: (\w+)\.$")
+
+    def __init__(self):
+        super().__init__()
+        self.expected: Counter = Counter()     # (sender, message type) -> replies deferred
+
+    def expect(self, sender: str, msg) -> None:
+        self.expected[(sender, type(msg).__name__)] += 1
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        m = self.PATTERN.match(record.getMessage())
+        if m is None or self.expected[m.groups()] <= 0:
+            return True
+        self.expected[m.groups()] -= 1
+        if not self.expected[m.groups()]:
+            del self.expected[m.groups()]
+        return False
+
+REPLY_FILTER = _DeferredReplyFilter()
+logging.getLogger(agent.name).addFilter(REPLY_FILTER)
 
 # ---------- Utils ----------
 def haversine_km(a: Geo, b: Geo) -> float:
@@ -81,9 +195,9 @@ async def on_start(ctx: Context):
     Ensure supplier row exists, log current address + inventory.
     Inventory and config are always read fresh from DB during requests.
     """
-    global SUPPLIER_ID, CFG
-    SUPPLIER_ID = ensure_supplier(
-        CONN,
+    global SUPPLIER_ID, CFG, LOOP
+    LOOP = start_loop_monitor(SUPPLIER_NAME, on_block=lambda b: report_block(ctx, b))
+    SUPPLIER_ID = await INV.ensure_supplier(
         SUPPLIER_NAME,
         float(os.getenv("SUPPLIER_LAT", DEFAULT_CFG["lat"])),
         float(os.getenv("SUPPLIER_LON", DEFAULT_CFG["lon"])),
@@ -92,51 +206,157 @@ async def on_start(ctx: Context):
         float(os.getenv("SUPPLIER_RADIUS_KM", DEFAULT_CFG["radius_km"])),
         os.getenv("SUPPLIER_DELIVERY_MODE", DEFAULT_CFG["delivery_mode"]),
     )
-    CFG = get_supplier_config(CONN, SUPPLIER_NAME) or {}
-    inv = get_inventory(CONN, SUPPLIER_ID)
+    CFG = await INV.get_supplier_config(SUPPLIER_NAME) or {}
+    inv = await INV.get_inventory(SUPPLIER_ID)
+    await reload_item_keys()
 
     ctx.logger.info(f"[{SUPPLIER_NAME}] Address: {agent.address}")
+    start_profiling(SUPPLIER_NAME)
     ctx.logger.info(
         "Inventory: " + (", ".join([f"{row['name']}:{row['qty']}" for row in inv]) if inv else "(empty)")
     )
 
-# ---------- Protocol Handlers ----------
-@AidProtocol.on_message(model=QuoteRequest, replies=QuoteResponse)
-async def on_quote(ctx: Context, sender: str, req: QuoteRequest):
+    # announce ourselves so need agents / coordinator pick us up without restarts
+    if REGISTRY is not None:
+        await REGISTRY.run_write(REGISTRY.publish, agent.address, "supply", name=SUPPLIER_NAME,
+                                 endpoint=ENDPOINT[0], meta={"lat": CFG.get("lat"), "lon": CFG.get("lon")})
+
+@agent.on_interval(period=REGISTRY_HEARTBEAT_S)
+async def registry_heartbeat(ctx: Context):
+    # a lapsed entry is re-published with its startup meta (lat/lon), not blanked
+    if REGISTRY is not None:
+        await REGISTRY.run_write(REGISTRY.keepalive, agent.address)
+
+@agent.on_event("shutdown")
+async def on_stop(ctx: Context):
+    if REGISTRY is not None:
+        await REGISTRY.run_write(REGISTRY.withdraw, agent.address)
+    await SCHED.close()
+    await INV.close()
+    if LOOP is not None:
+        await LOOP.close()
+    await TELEMETRY.close()
+
+def report_block(ctx: Context, block: Dict[str, Any]) -> None:
+    ctx.logger.warning(f"[{SUPPLIER_NAME}] {format_block(block)}")
+    TELEMETRY.emit({"ts": block["ts"], "agent_type": "supplier", "agent_id": SUPPLIER_NAME,
+                    "event_type": "loop_block", "duration_ms": block["duration_ms"],
+                    "meta": {"stack": block["stack"]}})
+
+@agent.on_interval(period=LOOPMON_REPORT_S)
+async def report_loop(ctx: Context):
+    """Publish event-loop lag percentiles and block counts."""
+    if LOOP is not None:
+        await emit({"ts": time.time(), "agent_type": "supplier", "agent_id": SUPPLIER_NAME,
+                    "event_type": "loop_stats", "meta": LOOP.stats()})
+
+@agent.on_interval(period=QUOTE_CACHE_STATS_S)
+async def report_quote_cache(ctx: Context):
+    """Periodically publish quote cache hit rates."""
+    stats = QUOTES.stats()
+    if not stats["hits"] and not stats["misses"]:
+        return
+    ctx.logger.info(f"[{SUPPLIER_NAME}] quote cache: {stats}")
+    await emit({"ts": time.time(), "agent_type": "supplier", "agent_id": SUPPLIER_NAME,
+                "event_type": "quote_cache_stats", "meta": stats})
+
+@agent.on_interval(period=SCHED_STATS_S)
+async def report_scheduler(ctx: Context):
+    """Publish queue depth and wait percentiles per priority, plus admission counters."""
+    stats = SCHED.stats()
+    if not any(stats[p]["served"] or stats[p]["depth"] for p in PRIORITIES):
+        return
+    stats["admission"] = ADMISSION.stats()
+    ctx.logger.info(f"[{SUPPLIER_NAME}] scheduler: " + ", ".join(
+        f"{p} depth={stats[p]['depth']} p95={stats[p]['wait_p95_ms']}ms" for p in PRIORITIES)
+        + f"; admission: {stats['admission']}")
+    await emit({"ts": time.time(), "agent_type": "supplier", "agent_id": SUPPLIER_NAME,
+                "event_type": "scheduler_stats", "meta": stats})
+
+# ---------- Inventory feed ----------
+def mark_dirty(names) -> None:
+    """Queue items for the next InventoryStatus delta."""
+    for name in names:
+        key = _item_key(name)
+        if isinstance(key, int):
+            DIRTY_ITEMS.add(key)
+
+def _feed_targets() -> List[str]:
+    addrs = set(COORDINATOR_ADDRESSES)
+    if REGISTRY is not None:
+        addrs.update(REGISTRY.addresses("coordinator"))
+    return sorted(addrs)
+
+@agent.on_interval(period=INVENTORY_FEED_S)
+async def publish_inventory_changes(ctx: Context):
+    """Send coalesced stock changes (absolute qty) to every known coordinator."""
+    global FEED_SEQ, LAST_FULL_SYNC
+    if SUPPLIER_ID is None:
+        return
+    targets = _feed_targets()
+    if not targets:
+        return
+    # newcomers need the whole picture, not just what changed since
+    full = (time.monotonic() - LAST_FULL_SYNC >= INVENTORY_FULL_SYNC_S
+            or not FEED_TARGETS.issuperset(targets))
+    if not full and not DIRTY_ITEMS:
+        return
+    dirty = set(DIRTY_ITEMS)
+    DIRTY_ITEMS.clear()
+    rows = await INV.get_inventory(SUPPLIER_ID)
+    if not full:
+        rows = [r for r in rows if r["item_id"] in dirty]
+    FEED_SEQ += 1
+    status = InventoryStatus(
+        supplier_id=SUPPLIER_NAME,
+        inventory=[Item(name=r["name"], qty=int(r["qty"]), unit=r["unit"], unit_price=r["unit_price"])
+                   for r in rows],
+        note="full" if full else "delta",
+        seq=FEED_SEQ,
+        full=full,
+    )
+    for addr in targets:
+        await ctx.send(addr, status)
+    FEED_TARGETS.clear()
+    FEED_TARGETS.update(targets)
+    if full:
+        LAST_FULL_SYNC = time.monotonic()
+
+# ---------- Quoting ----------
+def _item_key(name: str) -> Hashable:
+    """Catalog item id when known, else the normalized name. Runs on the loop; no SQL."""
+    iid = ITEM_KEYS.resolve(name)
+    return iid if iid is not None else normalize(name)
+
+async def reload_item_keys() -> None:
+    """Replace ITEM_KEYS with a fresh catalog read on a reader connection."""
+    global ITEM_KEYS
+    ITEM_KEYS = await INV.run_read(ItemCatalog.load)
+
+def build_quote(conn, req: QuoteRequest, inv: Dict[int, Dict[str, Any]] | None = None) -> Dict[str, Any]:
     """
     Build a quote from current DB stock. Only offer what's available.
     Reject if out of radius or ETA > SLA.
+    Returns QuoteResponse fields except need_id/supplier_id.
+    Blocking; runs on an INV reader thread. `inv` is a preloaded stock
+    snapshot (see build_quotes); without it config and stock are read fresh.
     """
     # load latest config each time
     global CFG
-    CFG = get_supplier_config(CONN, SUPPLIER_NAME) or CFG
+    if inv is None:
+        CFG = get_supplier_config(conn, SUPPLIER_NAME) or CFG
 
     # radius check
     d_km = haversine_km(req.location, _cfg_geo())
     if d_km > float(CFG["radius_km"]):
-        await ctx.send(
-            sender,
-            QuoteResponse(
-                need_id=req.need_id,
-                supplier_id=SUPPLIER_NAME,
-                ok=False,
-                reason=f"out_of_radius_{int(d_km)}km",
-            ),
-        )
-        return
+        return dict(ok=False, reason=f"out_of_radius_{int(d_km)}km")
 
     # DB computes coverage + per-item offer
     requested = [{"name": it.name, "qty": int(it.qty)} for it in (req.items or [])]
-    offered, cov = offer_for_request(CONN, SUPPLIER_ID, requested)
+    offered, cov = offer_for_request(conn, SUPPLIER_ID, requested, inv=inv)
 
     if cov <= 0.0 or not offered:
-        await ctx.send(
-            sender,
-            QuoteResponse(
-                need_id=req.need_id, supplier_id=SUPPLIER_NAME, ok=False, reason="no_coverage"
-            ),
-        )
-        return
+        return dict(ok=False, reason="no_coverage")
 
     # pricing + ETA
     base_cost = sum(float(it.get("unit_price", 0.0)) * int(it["qty"]) for it in offered)
@@ -144,16 +364,7 @@ async def on_quote(ctx: Context, sender: str, req: QuoteRequest):
     eta = round(float(CFG["base_lead_h"]) + travel_eta, 2)
 
     if req.max_eta_hours is not None and eta > float(req.max_eta_hours):
-        await ctx.send(
-            sender,
-            QuoteResponse(
-                need_id=req.need_id,
-                supplier_id=SUPPLIER_NAME,
-                ok=False,
-                reason=f"eta_exceeds_sla_{eta}h",
-            ),
-        )
-        return
+        return dict(ok=False, reason=f"eta_exceeds_sla_{eta}h")
 
     priority = (req.priority or "medium").lower()
     mod = {"critical": 0.90, "high": 0.95, "medium": 1.00, "low": 1.05}.get(priority, 1.00)
@@ -170,30 +381,209 @@ async def on_quote(ctx: Context, sender: str, req: QuoteRequest):
         for o in offered
     ]
 
-    await ctx.send(
-        sender,
-        QuoteResponse(
-            need_id=req.need_id,
-            supplier_id=SUPPLIER_NAME,
-            ok=True,
-            coverage_ratio=round(cov, 3),
-            eta_hours=eta,
-            total_cost=total,
-            items=offered_items,
-            terms=f"delivery:{CFG['delivery_mode']};priority:{priority}",
-        ),
+    return dict(
+        ok=True,
+        coverage_ratio=round(cov, 3),
+        eta_hours=eta,
+        total_cost=total,
+        items=offered_items,
+        terms=f"delivery:{CFG['delivery_mode']};priority:{priority}",
     )
+
+def build_quotes(conn, reqs: List[QuoteRequest]) -> List[Dict[str, Any]]:
+    """Price a batch against one config read and one inventory snapshot."""
+    global CFG
+    conn.execute("BEGIN;")      # one read transaction = one consistent snapshot
+    try:
+        CFG = get_supplier_config(conn, SUPPLIER_NAME) or CFG
+        inv = inventory_snapshot(conn, SUPPLIER_ID)
+    finally:
+        conn.execute("COMMIT;")
+    return [build_quote(conn, r, inv=inv) for r in reqs]
+
+def _quote_key(req: QuoteRequest) -> Tuple[Tuple, List[Hashable]]:
+    lines: List[Tuple[Hashable, int]] = [(_item_key(it.name), int(it.qty)) for it in (req.items or [])]
+    key = QUOTES.key(req.location.lat, req.location.lon, lines,
+                     (req.priority or "medium").lower(), req.max_eta_hours)
+    return key, [k for k, _ in lines]
+
+# ---------- Protocol Handlers ----------
+# Quotes are answered from scheduler workers after the handler returns, so
+# urgent requests overtake queued low-priority ones. The `replies` still match
+# aid_protocol.py (they are part of the protocol digest); the reply is checked
+# when the job ends instead of by uAgents (see _defer_reply).
+@AidProtocol.on_message(model=QuoteRequest, replies=QuoteResponse)
+@profiled("on_quote")
+async def on_quote(ctx: Context, sender: str, req: QuoteRequest):
+    level = SCHED.level(req.priority)
+    span = TRACER.start("quote.handle", req.trace, need_id=req.need_id, priority=level)
+    retry_after = _shed(ctx, sender, level, req.need_id)
+    if retry_after is None:
+        REPLY_FILTER.expect(sender, req)
+        SCHED.submit(level, lambda: _admitted(ctx, sender, req, answer_quote(ctx, sender, req, span)))
+    else:
+        TRACER.finish(span, shed=True)
+        _defer_reply(ctx, sender, req, ctx.send(sender, _overloaded(req.need_id, retry_after, span.traceparent)))
+
+@AidProtocol.on_message(model=BatchQuoteRequest, replies=BatchQuoteResponse)
+@profiled("on_batch_quote")
+async def on_batch_quote(ctx: Context, sender: str, batch: BatchQuoteRequest):
+    # a batch runs at the priority of its most urgent request
+    levels = [SCHED.level(r.priority) for r in batch.requests] or ["medium"]
+    level = min(levels, key=PRIORITIES.index)
+    received = time.time()
+    cost = len(batch.requests)
+    if cost > QUOTE_MAX_BATCH:
+        # needs more tokens than a bucket ever holds; the sender has to split it
+        ctx.logger.debug(f"[{SUPPLIER_NAME}] Refused batch {batch.batch_id} of {cost} from {sender}")
+        reason, retry_after = BATCH_TOO_LARGE, None
+    else:
+        reason, retry_after = OVERLOADED, _shed(ctx, sender, level, batch.batch_id, cost)
+        if retry_after is None:
+            REPLY_FILTER.expect(sender, batch)
+            SCHED.submit(level, lambda: _admitted(ctx, sender, batch,
+                                                  answer_batch_quote(ctx, sender, batch, received), cost))
+            return
+    spans = _batch_spans(batch, received, {"shed": True})
+    _defer_reply(ctx, sender, batch, ctx.send(sender, BatchQuoteResponse(
+        batch_id=batch.batch_id, supplier_id=SUPPLIER_NAME,
+        responses=[_overloaded(r.need_id, retry_after, s.traceparent, reason)
+                   for r, s in zip(batch.requests, spans)])))
+
+def _shed(ctx: Context, sender: str, level: str, ref: str, cost: int = 1) -> float | None:
+    """
+    None if admitted (the job must run through _admitted with the same cost),
+    else the retry-after hint. `cost` is the number of quotes in the job.
+    """
+    reason, retry_after = ADMISSION.admit(sender, critical=(level == "critical"), cost=cost)
+    if reason is None:
+        return None
+    ctx.logger.debug(f"[{SUPPLIER_NAME}] Shed {ref} ({cost}) from {sender}: {reason}, retry in {retry_after}s")
+    return retry_after
+
+def _overloaded(need_id: str, retry_after: float | None, trace: str | None = None,
+                reason: str = OVERLOADED) -> QuoteResponse:
+    """The cheap answer for shed requests: no DB access, just a retry hint."""
+    return QuoteResponse(need_id=need_id, supplier_id=SUPPLIER_NAME, ok=False, reason=reason,
+                         retry_after_s=retry_after, trace=trace)
+
+def _batch_spans(batch: BatchQuoteRequest, received: float, phases: Dict[str, Any]) -> List[Span]:
+    """One quote.handle span per batched request (they share timings; phases go in meta)."""
+    end = time.time()
+    return [TRACER.finish(TRACER.start("quote.handle", r.trace, start=received, need_id=r.need_id,
+                                       batch_id=batch.batch_id, batch_size=len(batch.requests), **phases),
+                          end)
+            for r in batch.requests]
+
+async def _admitted(ctx: Context, sender: str, msg, job: Awaitable, cost: int = 1):
+    """Run an admitted quote job (the reply was deferred to it) and release its admission."""
+    t0 = time.perf_counter()
+    try:
+        await _replying(ctx, sender, msg, job)
+    finally:
+        ADMISSION.release(time.perf_counter() - t0, cost)
+
+def _defer_reply(ctx: Context, sender: str, msg, job: Awaitable) -> None:
+    """
+    Answer `msg` from a task that outlives the handler. uAgents' reply check
+    is muted for this message only; the task reports a missing reply instead.
+    """
+    REPLY_FILTER.expect(sender, msg)
+    _spawn(_replying(ctx, sender, msg, job))
+
+async def _replying(ctx: Context, sender: str, msg, job: Awaitable) -> None:
+    """Await `job`, then log and emit a missing_reply event if nothing was sent to `sender`."""
+    try:
+        await job
+    finally:
+        if not ctx.outbound_messages.get(sender):
+            kind = type(msg).__name__
+            ctx.logger.error(f"[{SUPPLIER_NAME}] No reply was sent to {sender} for {kind}")
+            TELEMETRY.emit({"ts": time.time(), "agent_type": "supplier", "agent_id": SUPPLIER_NAME,
+                            "event_type": "missing_reply", "meta": {"message": kind, "sender": sender}})
+
+@profiled("answer_quote")
+async def answer_quote(ctx: Context, sender: str, req: QuoteRequest, span: Span):
+    """Answer from the quote cache when an identical nearby request was just priced."""
+    TRACER.record("queue", span, start=span.start)
+    try:
+        key, item_keys = _quote_key(req)
+        quote = QUOTES.get(key) if QUOTE_CACHE_TTL_S > 0 else None
+        cached = quote is not None
+        if not cached:
+            with TRACER.span("db", span):
+                quote = await INV.run_read(build_quote, req)
+            if QUOTE_CACHE_TTL_S > 0:
+                QUOTES.put(key, quote, items=item_keys)
+
+        with TRACER.span("send", span):
+            await ctx.send(
+                sender,
+                QuoteResponse(need_id=req.need_id, supplier_id=SUPPLIER_NAME, trace=span.traceparent, **quote),
+            )
+    except Exception as e:
+        TRACER.finish(span, error=type(e).__name__)
+        ctx.logger.error(f"[{SUPPLIER_NAME}] Quote for {req.need_id} failed: {e}")
+        return
+    TRACER.finish(span, cached=cached, ok=quote["ok"])
+    if quote["ok"]:
+        ctx.logger.info(
+            f"[{SUPPLIER_NAME}] Quote → {sender} offered="
+            + ", ".join([f"{i.name}:{i.qty}" for i in quote["items"]])
+            + f" eta={quote['eta_hours']}h total=${quote['total_cost']}"
+            + (" (cached)" if cached else "")
+        )
+
+@profiled("answer_batch_quote")
+async def answer_batch_quote(ctx: Context, sender: str, batch: BatchQuoteRequest, received: float):
+    """Price every request in the batch against one snapshot; answer in one envelope."""
+    phases = {"queue_ms": round((time.time() - received) * 1000, 3), "db_ms": 0.0}
+    try:
+        keys = [_quote_key(req) for req in batch.requests]
+        quotes: List[Dict[str, Any] | None] = [
+            QUOTES.get(key) if QUOTE_CACHE_TTL_S > 0 else None for key, _ in keys
+        ]
+        misses = [i for i, q in enumerate(quotes) if q is None]
+        if misses:
+            t0 = time.time()
+            fresh = await INV.run_read(build_quotes, [batch.requests[i] for i in misses])
+            phases["db_ms"] = round((time.time() - t0) * 1000, 3)
+            for i, quote in zip(misses, fresh):
+                quotes[i] = quote
+                if QUOTE_CACHE_TTL_S > 0:
+                    QUOTES.put(keys[i][0], quote, items=keys[i][1])
+
+        # span ids are needed for the replies, so these close before the send
+        spans = _batch_spans(batch, received, phases)
+        await ctx.send(
+            sender,
+            BatchQuoteResponse(
+                batch_id=batch.batch_id,
+                supplier_id=SUPPLIER_NAME,
+                responses=[QuoteResponse(need_id=req.need_id, supplier_id=SUPPLIER_NAME,
+                                         trace=span.traceparent, **quote)
+                           for req, quote, span in zip(batch.requests, quotes, spans)],
+            ),
+        )
+    except Exception as e:
+        ctx.logger.error(f"[{SUPPLIER_NAME}] Batch quote {batch.batch_id} failed: {e}")
+        return
     ctx.logger.info(
-        f"[{SUPPLIER_NAME}] Quote → {sender} offered="
-        + ", ".join([f"{i.name}:{i.qty}" for i in offered_items])
-        + f" eta={eta}h total=${total}"
+        f"[{SUPPLIER_NAME}] Batch quote {batch.batch_id} → {sender}: "
+        f"{sum(q['ok'] for q in quotes)}/{len(quotes)} ok, {len(quotes) - len(misses)} cached"
     )
 
+# Accept's AllocationNotice is sent from the commit task below, after the
+# handler returns (see _defer_reply).
 @AidProtocol.on_message(model=Accept, replies=AllocationNotice)
+@profiled("on_accept")
 async def on_accept(ctx: Context, sender: str, msg: Accept):
     """
-    Deduct the accepted quantities **atomically in the database**
-    and confirm with an AllocationNotice.
+    Queue the deduction for the next group commit and return, so the agent
+    keeps draining its message queue; the AllocationNotice goes out once
+    the deduction is durably in the database. A repeated Accept (same
+    need_id and items) is answered with the original notice and deducts
+    nothing. If the deduction fails, every sender gets an ErrorMessage.
     """
     # Build item dicts for DB deduction
     items = [
@@ -205,28 +595,153 @@ async def on_accept(ctx: Context, sender: str, msg: Accept):
         }
         for it in (msg.items or [])
     ]
+    key = (msg.need_id, accept_hash(msg, items))
+    span = TRACER.start("accept.handle", msg.trace, need_id=msg.need_id)
+    seen = ACCEPTS.get(key)
+    if seen is not None:
+        _defer_reply(ctx, sender, msg, resend_allocation(ctx, sender, msg.need_id, seen[1], span))
+        return
+    done = asyncio.get_running_loop().create_future()
+    ACCEPTS[key] = (time.time(), done)
+    while len(ACCEPTS) > ACCEPT_DEDUP_CACHE:
+        ACCEPTS.popitem(last=False)
+    _defer_reply(ctx, sender, msg, confirm_allocation(ctx, sender, msg, items, key, done, span))
+
+def accept_hash(msg: Accept, items: List[Dict[str, Any]]) -> str:
+    """Content hash of an Accept; item order does not matter."""
+    lines = sorted((i["name"], i["qty"], i["unit"] or "", i["unit_price"]) for i in items)
+    return hashlib.blake2b(json.dumps([msg.accept, lines]).encode(), digest_size=16).hexdigest()
 
-    # atomic deduction in DB
-    deduct_allocation(CONN, SUPPLIER_ID, items)
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    PENDING_WRITES.add(task)
+    task.add_done_callback(PENDING_WRITES.discard)
 
+@profiled("confirm_allocation")
+async def confirm_allocation(ctx: Context, sender: str, msg: Accept, items: List[Dict[str, Any]],
+                             key: Tuple[str, str], done: asyncio.Future, span: Span):
     # reply with what we confirm allocated
-    notice_items = [
-        Item(name=i["name"], qty=i["qty"], unit=i.get("unit"), unit_price=i.get("unit_price", 0.0))
-        for i in items
-    ]
+    notice = AllocationNotice(
+        need_id=msg.need_id,
+        supplier_id=SUPPLIER_NAME,
+        items=[Item(name=i["name"], qty=i["qty"], unit=i.get("unit"), unit_price=i.get("unit_price", 0.0))
+               for i in items],
+        note="allocation confirmed (DB-deducted)",
+    )
+    try:
+        with TRACER.span("commit", span):
+            raw, duplicate = await INV.deduct_once(SUPPLIER_ID, key[0], key[1], items, notice.json())
+    except Exception as e:
+        TRACER.finish(span, error=type(e).__name__)
+        ctx.logger.error(f"[{SUPPLIER_NAME}] Allocation for {msg.need_id} failed: {e}")
+        if ACCEPTS.get(key, (0, None))[1] is done:
+            del ACCEPTS[key]    # let a retry try again
+        done.set_exception(e)
+        done.exception()    # waiting duplicates re-raise it; nobody else has to retrieve it
+        await ctx.send(sender, ErrorMessage(message=f"allocation failed: {e}", request_id=msg.need_id))
+        return
+    done.set_result(raw)
+    if duplicate:
+        # applied before this process remembered it (e.g. across a restart)
+        notice = AllocationNotice.parse_raw(raw)
+    else:
+        QUOTES.invalidate_items(_item_key(i["name"]) for i in items)
+        mark_dirty(i["name"] for i in items)
+
+    notice.trace = span.traceparent
+    with TRACER.span("send", span):
+        await ctx.send(sender, notice)
+    TRACER.finish(span, duplicate=duplicate)
+    ctx.logger.info(
+        f"[{SUPPLIER_NAME}] Allocation confirmed for {sender}: "
+        + ", ".join([f"{i.name}:{i.qty}" for i in notice.items])
+        + (" (duplicate Accept)" if duplicate else "")
+    )
+
+async def resend_allocation(ctx: Context, sender: str, need_id: str, done: asyncio.Future, span: Span):
+    """Answer a duplicate Accept with the notice of the first one (waiting if it is still committing)."""
+    try:
+        raw = await asyncio.shield(done)
+    except Exception as e:
+        # the original failed; cancellation of this task itself propagates
+        TRACER.finish(span, duplicate=True, error="original_failed")
+        await ctx.send(sender, ErrorMessage(message=f"allocation failed: {e}", request_id=need_id))
+        return
+    notice = AllocationNotice.parse_raw(raw)
+    notice.trace = span.traceparent
+    await ctx.send(sender, notice)
+    TRACER.finish(span, duplicate=True)
+    ctx.logger.info(f"[{SUPPLIER_NAME}] Duplicate Accept for {need_id} from {sender}; resent notice")
+
+@agent.on_interval(period=ACCEPT_PRUNE_S)
+async def prune_accepts(ctx: Context):
+    """Forget Accepts older than ACCEPT_DEDUP_TTL_S, in memory and in one DELETE."""
+    if SUPPLIER_ID is None:
+        return
+    cutoff = time.time() - ACCEPT_DEDUP_TTL_S
+    while ACCEPTS:
+        key, (created, done) = next(iter(ACCEPTS.items()))
+        if created >= cutoff or not done.done():
+            break
+        del ACCEPTS[key]
+    try:
+        removed = await INV.prune_processed_accepts(SUPPLIER_ID, cutoff)
+    except Exception as e:
+        ctx.logger.error(f"[{SUPPLIER_NAME}] Pruning processed accepts failed: {e}")
+        return
+    if removed:
+        ctx.logger.info(f"[{SUPPLIER_NAME}] Pruned {removed} processed accepts")
+
+# ---------- Admin (Restock / AdjustInventory) ----------
+# Like Accept, acks are sent from the commit task so consecutive admin
+# messages share group commits (see _defer_reply).
+@AidProtocol.on_message(model=Restock, replies={InventoryStatus, ErrorMessage})
+async def on_restock(ctx: Context, sender: str, msg: Restock):
+    """Add quantities (creating new SKUs) in one transaction; ack with the new levels."""
+    if any(int(it.qty) < 0 for it in msg.items):
+        await ctx.send(sender, ErrorMessage(message="restock quantities must be >= 0",
+                                            request_id=msg.request_id))
+        return
+    _admin_change(ctx, sender, msg, note="restock ok")
+
+@AidProtocol.on_message(model=AdjustInventory, replies={InventoryStatus, ErrorMessage})
+async def on_adjust(ctx: Context, sender: str, msg: AdjustInventory):
+    """Signed deltas (negative deducts, clamped at zero) in one transaction."""
+    _admin_change(ctx, sender, msg, note="adjust ok")
+
+def _admin_change(ctx: Context, sender: str, msg, note: str) -> None:
+    if not SUPPLY_ADMIN_SECRET or not hmac.compare_digest(msg.secret.encode(), SUPPLY_ADMIN_SECRET.encode()):
+        ctx.logger.warning(f"[{SUPPLIER_NAME}] Rejected {type(msg).__name__} from {sender}")
+        _defer_reply(ctx, sender, msg, ctx.send(sender, ErrorMessage(message="unauthorized",
+                                                                     request_id=msg.request_id)))
+        return
+    changes = [{"name": it.name, "qty": int(it.qty), "unit": it.unit, "unit_price": it.unit_price}
+               for it in msg.items]
+    _defer_reply(ctx, sender, msg, confirm_admin_change(ctx, sender, msg.request_id, changes, note))
+
+async def confirm_admin_change(ctx: Context, sender: str, request_id: str | None,
+                               changes: List[Dict[str, Any]], note: str):
+    try:
+        rows = await INV.adjust_stock(SUPPLIER_ID, changes)
+    except Exception as e:
+        ctx.logger.error(f"[{SUPPLIER_NAME}] Inventory change {request_id} failed: {e}")
+        await ctx.send(sender, ErrorMessage(message=f"inventory change failed: {e}", request_id=request_id))
+        return
+    if any(ITEM_KEYS.name_of(r["item_id"]) is None for r in rows):
+        await reload_item_keys()    # the change created items
+    QUOTES.invalidate_items(r["item_id"] for r in rows)
+    DIRTY_ITEMS.update(r["item_id"] for r in rows)
     await ctx.send(
         sender,
-        AllocationNotice(
-            need_id=msg.need_id,
+        InventoryStatus(
             supplier_id=SUPPLIER_NAME,
-            items=notice_items,
-            note="allocation confirmed (DB-deducted)",
+            inventory=[Item(name=r["name"], qty=int(r["qty"]), unit=r["unit"], unit_price=r["unit_price"])
+                       for r in rows],
+            note=note,
+            request_id=request_id,
         ),
     )
-    ctx.logger.info(
-        f"[{SUPPLIER_NAME}] Allocation confirmed for {sender}: "
-        + ", ".join([f"{i.name}:{i.qty}" for i in notice_items])
-    )
+    ctx.logger.info(f"[{SUPPLIER_NAME}] {note} ({len(rows)} items) for {sender}")
 
 # include the protocol and run
 agent.include(AidProtocol)
@@ -10,11 +10,16 @@ import math
 from typing import cast, Dict, Any
 from datetime import datetime, timedelta
 from fastapi import FastAPI
-from uagents_core.contrib.protocols.chat import ChatMessage, TextContent
 from uagents_core.envelope import Envelope
 from uagents_core.identity import Identity
-from uagents_core.models import Model
-from uagents_core.utils.messages import parse_envelope, send_message_to_agent
+# the chat-protocol pieces (ChatMessage, parse_envelope -> requests) are imported
+# in handle_message, so the adapter binds its port without paying for them
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.item_catalog import synonyms_for
+from services.item_index import ItemIndex
 
 # Agent configuration
 AGENT_NAME = "AgentAid Supply Agent"
@@ -157,6 +162,9 @@ async def agent_info():
 @app.post("/")
 async def handle_message(env: Envelope):
     """Handle incoming chat messages via Chat Protocol"""
+    from uagents_core.contrib.protocols.chat import ChatMessage, TextContent
+    from uagents_core.models import Model
+    from uagents_core.utils.messages import parse_envelope
     try:
         # Parse the incoming chat message
         msg = cast(ChatMessage, parse_envelope(env, ChatMessage))
@@ -248,20 +256,15 @@ def generate_quote_json(need_request: Dict[str, Any]) -> str:
 
         # Get inventory
         inventory = get_inventory_dict()
+        index = get_item_index()
 
         # Calculate what we can provide
         items_offered = []
         total_quantity_available = 0
 
         for item in items:
-            item_lower = item.lower()
-
-            # Match requested items to inventory
-            matched_item = None
-            for inv_item, details in inventory.items():
-                if item_lower in inv_item.lower() or inv_item.lower() in item_lower:
-                    matched_item = inv_item
-                    break
+            # Match requested items to inventory via the prebuilt token index
+            matched_item = index.match(item)
 
             if matched_item:
                 available_qty = inventory[matched_item]["qty"]
@@ -352,17 +355,35 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 
     return R * c
 
+INVENTORY: Dict[str, Dict[str, Any]] = {
+    "Blankets": {"qty": 500, "unit": "ea", "price": 15.0},
+    "Water Bottles": {"qty": 1000, "unit": "bottles", "price": 2.0},
+    "Medical Supplies": {"qty": 200, "unit": "kits", "price": 50.0},
+    "Burn Medicine": {"qty": 150, "unit": "kits", "price": 75.0},
+    "Food Rations": {"qty": 800, "unit": "meals", "price": 8.0},
+    "Tents": {"qty": 50, "unit": "ea", "price": 200.0},
+    "Clothing": {"qty": 300, "unit": "sets", "price": 25.0}
+}
+
+# Name-matching index over INVENTORY; rebuilt only when set_inventory() swaps the catalog
+_ITEM_INDEX: ItemIndex | None = None
+
 def get_inventory_dict() -> Dict[str, Dict[str, Any]]:
-    """Get inventory as dictionary"""
-    return {
-        "Blankets": {"qty": 500, "unit": "ea", "price": 15.0},
-        "Water Bottles": {"qty": 1000, "unit": "bottles", "price": 2.0},
-        "Medical Supplies": {"qty": 200, "unit": "kits", "price": 50.0},
-        "Burn Medicine": {"qty": 150, "unit": "kits", "price": 75.0},
-        "Food Rations": {"qty": 800, "unit": "meals", "price": 8.0},
-        "Tents": {"qty": 50, "unit": "ea", "price": 200.0},
-        "Clothing": {"qty": 300, "unit": "sets", "price": 25.0}
-    }
+    """Get a copy of the inventory as dictionary (change it through set_inventory)"""
+    return {name: dict(details) for name, details in INVENTORY.items()}
+
+def set_inventory(inventory: Dict[str, Dict[str, Any]]) -> None:
+    """Replace the inventory (copied) and drop the name index so it is rebuilt on next use"""
+    global INVENTORY, _ITEM_INDEX
+    INVENTORY = {name: dict(details) for name, details in inventory.items()}
+    _ITEM_INDEX = None
+
+def get_item_index() -> ItemIndex:
+    """Get the (lazily built) name index for the current inventory"""
+    global _ITEM_INDEX
+    if _ITEM_INDEX is None:
+        _ITEM_INDEX = ItemIndex(INVENTORY.keys(), synonyms=synonyms_for(INVENTORY.keys()))
+    return _ITEM_INDEX
 
 def process_supply_inquiry(message: str) -> str:
     """Process a supply inquiry or quote request"""
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-need QuoteRequest fan-out vs BatchQuoteRequest.
+
+A coordinator holding --needs pending needs quotes them from --suppliers
+suppliers. Unbatched, that is needs x suppliers envelopes. Batched, it is
+one envelope per supplier per --batch-size needs. Every envelope takes the
+real wire path:
+  * uAgents Envelope;
+  * signed by the sender, verified by the receiver;
+  * HTTP POST to a separate receiver process;
+  * model parse, then pricing against a generated inventory DB;
+  * a signed reply envelope.
+The unbatched side does one fresh stock read per request (supply_agent.on_quote).
+The batched side reads one snapshot per batch (supply_agent.on_batch_quote).
+Replies ride back in the HTTP response, so this counts one POST per exchange
+(uAgents would use a second POST for the reply).
+
+Reports envelopes/s, quotes/s and per-need latency (until the need has a
+quote from every supplier).
+
+    python benchmarks/bench_batch_quotes.py --needs 300 --suppliers 4
+    python benchmarks/bench_batch_quotes.py --needs 300 --suppliers 8 --batch-size 50 --json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.aid_protocol import BatchQuoteRequest, BatchQuoteResponse, Geo, Item, QuoteRequest, QuoteResponse
+
+
+def _identity(seed: str):
+    from uagents_core.identity import Identity
+    return Identity.from_seed(seed, 0)
+
+
+def _envelope(identity, target: str, msg) -> str:
+    from uagents import Model
+    from uagents_core.envelope import Envelope
+    env = Envelope(version=1, sender=identity.address, target=target, session=uuid.uuid4(),
+                   schema_digest=Model.build_schema_digest(msg))
+    env.encode_payload(msg.json())
+    env.sign(identity)
+    return env.model_dump_json()
+
+
+def _open(raw: bytes):
+    from uagents_core.envelope import Envelope
+    env = Envelope.model_validate_json(raw)
+    if not env.verify():
+        raise ValueError("bad signature")
+    return env
+
+
+# ---------- receiver (separate process: the supply agents) ----------
+def _price(cfg: dict, req: QuoteRequest, offered: list, cov: float) -> dict:
+    """Trimmed supply_agent.build_quote (pricing only; radius/ETA checks add nothing here)."""
+    if cov <= 0.0:
+        return dict(ok=False, reason="no_coverage")
+    mod = {"critical": 0.90, "high": 0.95, "medium": 1.00, "low": 1.05}.get(req.priority, 1.00)
+    total = round(sum(o["unit_price"] * o["qty"] for o in offered) * mod, 2)
+    return dict(ok=True, coverage_ratio=round(cov, 3), eta_hours=float(cfg["base_lead_h"]), total_cost=total,
+                items=[Item(name=o["name"], qty=o["qty"], unit=o["unit"], unit_price=o["unit_price"])
+                       for o in offered])
+
+
+def _serve(db_path: str, n_suppliers: int, port: int) -> None:
+    import uvicorn
+    from services.inventory_db import connect_readonly, inventory_snapshot, offer_for_request
+
+    conn = connect_readonly(db_path)
+    suppliers = {}
+    for row in conn.execute("SELECT * FROM suppliers ORDER BY id LIMIT ?", (n_suppliers,)):
+        ident = _identity(f"bench_supplier_{row['id']}")
+        suppliers[ident.address] = (ident, dict(row))
+
+    def lines(req):
+        return [{"name": it.name, "qty": it.qty} for it in req.items]
+
+    def handle(raw: bytes) -> str:
+        env = _open(raw)
+        ident, cfg = suppliers[env.target]
+        payload = env.decode_payload()
+        if env.schema_digest == BATCH_DIGEST:
+            batch = BatchQuoteRequest.parse_raw(payload)
+            conn.execute("BEGIN;")
+            inv = inventory_snapshot(conn, cfg["id"])
+            conn.execute("COMMIT;")
+            out = BatchQuoteResponse(batch_id=batch.batch_id, supplier_id=cfg["name"], responses=[
+                QuoteResponse(need_id=r.need_id, supplier_id=cfg["name"],
+                              **_price(cfg, r, *offer_for_request(conn, cfg["id"], lines(r), inv=inv)))
+                for r in batch.requests])
+        else:
+            req = QuoteRequest.parse_raw(payload)
+            out = QuoteResponse(need_id=req.need_id, supplier_id=cfg["name"],
+                                **_price(cfg, req, *offer_for_request(conn, cfg["id"], lines(req))))
+        return _envelope(ident, env.sender, out)
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            ev = await receive()
+            body += ev.get("body", b"")
+            if not ev.get("more_body"):
+                break
+        # one message at a time, like a uAgents handler loop
+        out = handle(body).encode()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": out})
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _digest(model) -> str:
+    from uagents import Model
+    return Model.build_schema_digest(model)
+
+
+BATCH_DIGEST = _digest(BatchQuoteRequest)
+
+
+# ---------- sender (the coordinator) ----------
+def make_needs(n: int, item_names: list, rnd: random.Random) -> list:
+    return [QuoteRequest(
+        need_id=f"need-{i:05d}",
+        location=Geo(lat=37.77 + rnd.uniform(-0.2, 0.2), lon=-122.42 + rnd.uniform(-0.2, 0.2)),
+        items=[Item(name=name, qty=rnd.randint(1, 200)) for name in rnd.sample(item_names, 3)],
+        priority=rnd.choice(["critical", "high", "medium", "low"]), max_eta_hours=24.0,
+    ) for i in range(n)]
+
+
+async def run(url: str, needs: list, targets: list, batch_size: int, concurrency: int) -> dict:
+    import httpx
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    me = _identity("bench_coordinator")
+    pending = {n.need_id: len(targets) for n in needs}
+    done_at = {}
+    sem = asyncio.Semaphore(concurrency)
+    envelopes = 0
+
+    async def exchange(client, target, msg):
+        nonlocal envelopes
+        raw = _envelope(me, target, msg)
+        async with sem:
+            r = await client.post(url, content=raw, headers={"content-type": "application/json"})
+        envelopes += 2
+        env = _open(r.content)
+        payload = env.decode_payload()
+        resps = (BatchQuoteResponse.parse_raw(payload).responses if batch_size > 1
+                 else [QuoteResponse.parse_raw(payload)])
+        now = time.perf_counter()
+        for resp in resps:
+            pending[resp.need_id] -= 1
+            if not pending[resp.need_id]:
+                done_at[resp.need_id] = now
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        t0 = time.perf_counter()
+        jobs = []
+        for target in targets:
+            if batch_size > 1:
+                for i in range(0, len(needs), batch_size):
+                    msg = BatchQuoteRequest(batch_id=str(uuid.uuid4()), requests=needs[i:i + batch_size])
+                    jobs.append(exchange(client, target, msg))
+            else:
+                jobs.extend(exchange(client, target, n) for n in needs)
+        await asyncio.gather(*jobs)
+        wall = time.perf_counter() - t0
+
+    lat = sorted((t - t0) * 1000 for t in done_at.values())
+    return {"batch_size": batch_size, "envelopes": envelopes, "wall_s": round(wall, 3),
+            "envelopes_per_s": round(envelopes / wall, 1),
+            "quotes_per_s": round(len(needs) * len(targets) / wall, 1),
+            "need_p50_ms": round(lat[len(lat) // 2], 1), "need_p95_ms": round(lat[int(0.95 * (len(lat) - 1))], 1),
+            "need_max_ms": round(lat[-1], 1)}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--needs", type=int, default=300)
+    p.add_argument("--suppliers", type=int, default=4)
+    p.add_argument("--batch-size", type=int, default=100, help="needs per BatchQuoteRequest")
+    p.add_argument("--concurrency", type=int, default=16, help="in-flight HTTP exchanges")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json", action="store_true", help="emit machine-readable results")
+    p.add_argument("--serve", nargs=2, metavar=("DB", "PORT"), help=argparse.SUPPRESS)
+    args = p.parse_args()
+    if args.serve:
+        _serve(args.serve[0], args.suppliers, int(args.serve[1]))
+        return
+
+    from db.generate_suppliers import CORE_ITEMS, generate
+
+    with tempfile.TemporaryDirectory(prefix="bench_batch_") as tmp:
+        db = os.path.join(tmp, "fleet.db")
+        generate(db, args.suppliers, 500, 100, seed=42)
+        port = _free_port()
+        server = subprocess.Popen([sys.executable, __file__, "--suppliers", str(args.suppliers),
+                                   "--serve", db, str(port)])
+        url = f"http://127.0.0.1:{port}/submit"
+        for _ in range(400):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+
+        targets = [_identity(f"bench_supplier_{i}").address for i in range(1, args.suppliers + 1)]
+        needs = make_needs(args.needs, list(CORE_ITEMS), random.Random(args.seed))
+        try:
+            asyncio.run(run(url, needs[:10], targets, 1, args.concurrency))   # warm up
+            results = [asyncio.run(run(url, needs, targets, 1, args.concurrency)),
+                       asyncio.run(run(url, needs, targets, args.batch_size, args.concurrency))]
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps({"needs": args.needs, "suppliers": args.suppliers, "results": results}))
+        return
+    print(f"{args.needs} needs x {args.suppliers} suppliers")
+    for r in results:
+        label = "unbatched" if r["batch_size"] == 1 else f"batch={r['batch_size']}"
+        print(f"{label:>10}: {r['envelopes']} envelopes in {r['wall_s']}s  {r['envelopes_per_s']} env/s  "
+              f"{r['quotes_per_s']} quotes/s  need p50={r['need_p50_ms']}ms p95={r['need_p95_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
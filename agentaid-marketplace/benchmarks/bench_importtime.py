@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start import time of each entry point.
+
+Each entry point is imported --repeat times, each time in a fresh
+`python -X importtime` process. Every agent is its own process, so
+multi-agent startup costs roughly interpreter start + these numbers,
+once per agent. For every entry point the benchmark reports:
+  * wall:    whole process, interpreter start included (median);
+  * imports: total import time, from -X importtime (median);
+  * the heaviest direct imports, by cumulative time;
+  * which deferrable modules (httpx, elasticsearch, the chat protocol,
+    uagents_core.utils.messages, http.server, the intel client) still load
+    at import. These should be empty: they are imported on first use.
+
+A bare `python -c pass` is measured as the interpreter baseline. Runs happen
+in a scratch directory, against a copy of db/agent_aid.db, so importing the
+agents never touches the checked-in databases.
+
+    python benchmarks/bench_importtime.py
+    python benchmarks/bench_importtime.py --entries supply_agent,need_agent --repeat 9 --json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent       # agentaid-marketplace
+REPO = ROOT.parent
+
+# label -> (module, directory put on sys.path)
+ENTRIES = {
+    "supply_agent": ("agents.supply_agent", ROOT),
+    "need_agent": ("agents.need_agent", ROOT),
+    "coordination_agent": ("agents.coordination_agent", ROOT),
+    "supply_chat_adapter": ("agents.supply_agent_chat_adapter", ROOT),
+    "need_chat_adapter": ("agents.need_agent_chat_adapter", ROOT),
+    "telemetry_ingest": ("app", REPO / "telemetry_ingest"),
+    "collector": ("collector", REPO / "brightdata_collector"),
+}
+
+DEFERRED = ("httpx", "elasticsearch", "uagents_core.contrib.protocols.chat",
+            "uagents_core.utils.messages", "http.server", "intel")
+
+
+def parse_importtime(stderr: str) -> list:
+    """[(depth, self_us, cumulative_us, module)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        mod = parts[2].rstrip()
+        depth = (len(mod) - len(mod.lstrip(" "))) // 2
+        rows.append((depth, int(parts[0]), int(parts[1]), mod.strip()))
+    return rows
+
+
+def scratch_env(tmp: str) -> dict:
+    """Environment pointing the agents' databases into `tmp`."""
+    db = os.path.join(tmp, "agent_aid.db")
+    # plain file copies (with the WAL): even a read-only connection would touch the -shm
+    for suffix in ("", "-wal", "-shm"):
+        src = ROOT / "db" / f"agent_aid.db{suffix}"
+        if src.exists():
+            shutil.copyfile(src, db + suffix)
+    env = dict(os.environ)
+    env["INV_DB_PATH"] = db
+    env["AGENT_REGISTRY_PATH"] = os.path.join(tmp, "agent_registry.db")
+    return env
+
+
+def run_once(module: str, path: Path, env: dict, cwd: str) -> dict:
+    env = dict(env)
+    env["PYTHONPATH"] = os.pathsep.join([str(path), str(ROOT), env.get("PYTHONPATH", "")]).rstrip(os.pathsep)
+    code = f"import {module}" if module else "pass"
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall_ms = (time.perf_counter() - t0) * 1000.0
+    rows = parse_importtime(proc.stderr)
+    error = None
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["exit %d" % proc.returncode])[-1]
+    return {"wall_ms": wall_ms, "rows": rows, "error": error}
+
+
+def summarize(label: str, module: str, path: Path, repeat: int, top: int, env: dict, cwd: str) -> dict:
+    runs = [run_once(module, path, env, cwd) for _ in range(repeat)]
+    failed = next((r["error"] for r in runs if r["error"]), None)
+    last = runs[-1]["rows"]
+    loaded = {m for _, _, _, m in last}
+    # depth 1 = direct imports of a top-level import, i.e. mostly the entry module's own
+    heaviest = sorted(((cum, m) for d, _, cum, m in last if d == 1), reverse=True)[:top]
+    return {
+        "entry": label, "module": module or "<interpreter>",
+        "wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 1),
+        "imports_ms": round(statistics.median(sum(cum for d, _, cum, _ in r["rows"] if d == 0)
+                                              for r in runs) / 1000.0, 1),
+        "modules": len(last),
+        "heaviest": [{"module": m, "ms": round(cum / 1000.0, 1)} for cum, m in heaviest],
+        "deferred_loaded": sorted(m for m in DEFERRED if m in loaded),
+        "error": failed,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--entries", default=",".join(ENTRIES), help="comma-separated subset of: " + ", ".join(ENTRIES))
+    p.add_argument("--repeat", type=int, default=5, help="fresh processes per entry point (median is reported)")
+    p.add_argument("--top", type=int, default=5, help="heaviest imports to list per entry point")
+    p.add_argument("--json", action="store_true", help="emit machine-readable results")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_import_") as tmp:
+        env = scratch_env(tmp)
+        results = [summarize("baseline", "", ROOT, args.repeat, args.top, env, tmp)]
+        for label in args.entries.split(","):
+            module, path = ENTRIES[label]
+            results.append(summarize(label, module, path, args.repeat, args.top, env, tmp))
+
+    if args.json:
+        print(json.dumps({"python": sys.version.split()[0], "repeat": args.repeat, "results": results}))
+        return
+    print(f"python {sys.version.split()[0]}, median of {args.repeat} cold starts")
+    for r in results:
+        if r["error"]:
+            print(f"{r['entry']:>20}: failed ({r['error']})")
+            continue
+        print(f"{r['entry']:>20}: wall={r['wall_ms']}ms imports={r['imports_ms']}ms modules={r['modules']}"
+              + (f"  deferred but loaded: {', '.join(r['deferred_loaded'])}" if r["deferred_loaded"] else ""))
+        for h in r["heaviest"]:
+            print(f"{'':>22}{h['ms']:>8}ms  {h['module']}")
+
+
+if __name__ == "__main__":
+    main()
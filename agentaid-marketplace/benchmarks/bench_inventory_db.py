@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark: services.inventory_db hot-path operations on seeded SQLite DBs.
+
+For each (suppliers x SKUs) size and each journal/synchronous mode, seeds a
+fresh DB and measures:
+  * single-connection latency of get_inventory, offer_for_request,
+    deduct_allocation and upsert_item;
+  * a concurrent mixed workload (offers + deductions) with one connection per
+    thread, reporting throughput, tail latency and lock errors.
+
+Each supplier stocks --items-per-supplier SKUs drawn from a catalog of --skus
+names (a full suppliers x SKUs cross product would be unrealistic and huge).
+
+    python benchmarks/bench_inventory_db.py --suppliers 10,1000 --skus 100,5000
+    python benchmarks/bench_inventory_db.py --modes wal:normal,wal:full,delete:full --threads 8 --json
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.inventory_db import (
+    connect,
+    deduct_allocation,
+    get_inventory,
+    offer_for_request,
+    upsert_item,
+)
+from services.migrations import migrate
+
+_NOUNS = ["blanket", "water bottle", "tent", "tarp", "diaper", "glove", "mask", "flashlight",
+          "battery", "radio", "cot", "sleeping bag", "jacket", "sock", "boot", "bandage"]
+
+
+def sku_names(n: int) -> list:
+    return [f"{_NOUNS[i % len(_NOUNS)]} {i:05d}" for i in range(n)]
+
+
+def seed_db(path: str, suppliers: int, skus: list, per_supplier: int, seed: int) -> None:
+    """Bulk-load the canonical schema in one transaction (seeding is not what we measure)."""
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path, isolation_level=None)
+    migrate(conn)
+    conn.execute("BEGIN")
+    conn.executemany("INSERT OR IGNORE INTO item_catalog(name) VALUES (?)", ((n,) for n in skus))
+    id_of = dict(conn.execute("SELECT name, id FROM item_catalog"))
+    conn.executemany(
+        "INSERT INTO suppliers(id, name, lat, lon, label) VALUES (?,?,?,?,?)",
+        [(s + 1, f"bench_supplier_{s:05d}", 37.0 + rnd.random(), -122.5 + rnd.random(), "bench")
+         for s in range(suppliers)])
+    k = min(per_supplier, len(skus))
+    rows = []
+    for s in range(suppliers):
+        for i in rnd.sample(range(len(skus)), k):
+            rows.append((s + 1, id_of[skus[i]], skus[i], "ea", round(rnd.uniform(1, 50), 2), rnd.randint(100, 10_000)))
+        if len(rows) >= 50_000:
+            conn.executemany("INSERT INTO items(supplier_id, item_id, name, unit, unit_price, qty) "
+                             "VALUES (?,?,?,?,?,?)", rows)
+            rows = []
+    conn.executemany("INSERT INTO items(supplier_id, item_id, name, unit, unit_price, qty) "
+                     "VALUES (?,?,?,?,?,?)", rows)
+    conn.execute("COMMIT")
+    conn.close()
+
+
+def pct(values: list, p: float) -> float:
+    s = sorted(values)
+    return round(s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))], 1) if s else 0.0
+
+
+def summarize(lat_us: list) -> dict:
+    return {"n": len(lat_us), "p50_us": pct(lat_us, 50), "p95_us": pct(lat_us, 95),
+            "p99_us": pct(lat_us, 99), "mean_us": round(sum(lat_us) / len(lat_us), 1) if lat_us else 0.0}
+
+
+def make_ops(conn, suppliers: int, skus: list, rnd: random.Random) -> dict:
+    def sid():
+        return rnd.randint(1, suppliers)
+
+    def lines(n):
+        return [{"name": rnd.choice(skus), "qty": rnd.randint(1, 50)} for _ in range(n)]
+
+    return {
+        "get_inventory": lambda: get_inventory(conn, sid()),
+        "offer_for_request": lambda: offer_for_request(conn, sid(), lines(3)),
+        "deduct_allocation": lambda: deduct_allocation(conn, sid(), lines(2)),
+        "upsert_item": lambda: upsert_item(conn, sid(), rnd.choice(skus), 10, "ea", 5.0),
+    }
+
+
+def bench_single(path: str, mode: tuple, suppliers: int, skus: list, ops: int, seed: int) -> dict:
+    conn = connect(path, *mode)
+    rnd = random.Random(seed)
+    out = {}
+    for name, fn in make_ops(conn, suppliers, skus, rnd).items():
+        for _ in range(min(ops // 10, 50)):   # warm the page cache / catalog
+            fn()
+        lat = []
+        for _ in range(ops):
+            t0 = time.perf_counter()
+            fn()
+            lat.append((time.perf_counter() - t0) * 1e6)
+        out[name] = summarize(lat)
+    conn.close()
+    return out
+
+
+def bench_concurrent(path: str, mode: tuple, suppliers: int, skus: list, threads: int,
+                     ops: int, write_frac: float, seed: int) -> dict:
+    # open every connection up front so journal-mode switches don't race
+    conns = [connect(path, *mode) for _ in range(threads)]
+    lats = [[] for _ in range(threads)]
+    errors = [0] * threads
+    start = threading.Barrier(threads + 1)
+
+    def worker(i: int):
+        rnd = random.Random(seed + i)
+        fns = make_ops(conns[i], suppliers, skus, rnd)
+        start.wait()
+        for _ in range(ops):
+            fn = fns["deduct_allocation"] if rnd.random() < write_frac else fns["offer_for_request"]
+            t0 = time.perf_counter()
+            try:
+                fn()
+            except sqlite3.OperationalError:
+                errors[i] += 1
+            lats[i].append((time.perf_counter() - t0) * 1e6)
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in ts:
+        t.join()
+    wall = time.perf_counter() - t0
+    for c in conns:
+        c.close()
+
+    all_lat = [x for l in lats for x in l]
+    return {"threads": threads, "write_frac": write_frac, "ops_per_s": round(len(all_lat) / wall, 1),
+            "lock_errors": sum(errors), **summarize(all_lat)}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--suppliers", default="10,1000", help="comma-separated supplier counts (10-10000)")
+    p.add_argument("--skus", default="100,5000", help="comma-separated catalog sizes (100-50000)")
+    p.add_argument("--items-per-supplier", type=int, default=200)
+    p.add_argument("--modes", default="wal:normal,wal:full,delete:full",
+                   help="journal_mode:synchronous pairs")
+    p.add_argument("--ops", type=int, default=1000, help="measured ops per operation / per thread")
+    p.add_argument("--threads", type=int, default=4, help="threads for the concurrent mix (0 skips)")
+    p.add_argument("--write-frac", type=float, default=0.2, help="share of deductions in the concurrent mix")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json", action="store_true", help="emit machine-readable results")
+    args = p.parse_args()
+
+    modes = [tuple(m.split(":")) for m in args.modes.split(",")]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_inv_") as tmp:
+        for n_sup in (int(x) for x in args.suppliers.split(",")):
+            for n_sku in (int(x) for x in args.skus.split(",")):
+                skus = sku_names(n_sku)
+                for journal, sync in modes:
+                    path = str(Path(tmp) / f"inv_{n_sup}_{n_sku}_{journal}_{sync}.db")
+                    t0 = time.perf_counter()
+                    seed_db(path, n_sup, skus, args.items_per_supplier, args.seed)
+                    seed_s = time.perf_counter() - t0
+                    mode = (journal.upper(), sync.upper())
+                    rec = {
+                        "suppliers": n_sup, "skus": n_sku, "items_per_supplier": args.items_per_supplier,
+                        "journal_mode": journal, "synchronous": sync, "seed_s": round(seed_s, 3),
+                        "single": bench_single(path, mode, n_sup, skus, args.ops, args.seed),
+                    }
+                    if args.threads:
+                        rec["concurrent"] = bench_concurrent(path, mode, n_sup, skus, args.threads,
+                                                             args.ops, args.write_frac, args.seed)
+                    results.append(rec)
+                    if not args.json:
+                        print(f"--- {n_sup} suppliers x {n_sku} SKUs  journal={journal} sync={sync}  "
+                              f"(seeded in {rec['seed_s']}s)")
+                        for op, r in rec["single"].items():
+                            print(f"{op:>20}: p50={r['p50_us']}us p95={r['p95_us']}us p99={r['p99_us']}us")
+                        if "concurrent" in rec:
+                            c = rec["concurrent"]
+                            print(f"{'concurrent mix':>20}: {c['ops_per_s']} ops/s p95={c['p95_us']}us "
+                                  f"p99={c['p99_us']}us lock_errors={c['lock_errors']} ({c['threads']} threads)")
+    if args.json:
+        print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
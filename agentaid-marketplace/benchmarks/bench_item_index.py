@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ItemIndex vs. the old nested substring scan on large SKU catalogs.
+
+    python benchmarks/bench_item_index.py --skus 50000 --queries 2000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.item_index import ItemIndex
+
+_NOUNS = ["blanket", "water bottle", "tent", "tarp", "diaper", "glove", "mask", "flashlight",
+          "battery", "radio", "cot", "sleeping bag", "jacket", "sock", "boot", "bandage",
+          "splint", "syringe", "inhaler", "formula", "ration", "soap", "toothbrush", "towel"]
+_ADJS = ["wool", "thermal", "kids", "adult", "xl", "compact", "heavy duty", "disposable",
+         "sterile", "insulated", "waterproof", "emergency", "reusable", "foldable"]
+
+
+def make_catalog(n: int, seed: int) -> list:
+    rnd = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        names.add(f"{rnd.choice(_ADJS).title()} {rnd.choice(_NOUNS).title()}s {rnd.randrange(10_000):04d}")
+    return sorted(names)
+
+
+def make_queries(catalog: list, n: int, seed: int) -> list:
+    rnd = random.Random(seed + 1)
+    out = []
+    for _ in range(n):
+        kind = rnd.random()
+        if kind < 0.4:
+            out.append(rnd.choice(catalog).lower())               # exact
+        elif kind < 0.8:
+            out.append(rnd.choice(_NOUNS))                        # generic noun
+        else:
+            out.append(f"{rnd.choice(_ADJS)} {rnd.choice(_NOUNS)} for shelter")
+    return out
+
+
+def naive_match(inventory: list, item: str):
+    item_lower = item.lower()
+    for inv_item in inventory:
+        if item_lower in inv_item.lower() or inv_item.lower() in item_lower:
+            return inv_item
+    return None
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--skus", type=int, default=50_000)
+    p.add_argument("--queries", type=int, default=2_000)
+    p.add_argument("--naive-queries", type=int, default=200, help="naive scan is slow; sample fewer")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json", action="store_true", help="emit machine-readable results")
+    args = p.parse_args()
+
+    catalog = make_catalog(args.skus, args.seed)
+    queries = make_queries(catalog, args.queries, args.seed)
+
+    t0 = time.perf_counter()
+    index = ItemIndex(catalog)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    hits = sum(1 for q in queries if index.match(q) is not None)
+    index_us = (time.perf_counter() - t0) / len(queries) * 1e6
+
+    sample = queries[:args.naive_queries]
+    t0 = time.perf_counter()
+    for q in sample:
+        naive_match(catalog, q)
+    naive_us = (time.perf_counter() - t0) / max(len(sample), 1) * 1e6
+
+    # determinism: same query -> same SKU across rebuilds
+    rebuilt = ItemIndex(reversed(catalog))
+    stable = all(index.match(q) == rebuilt.match(q) for q in queries[:500])
+
+    result = {
+        "skus": len(catalog),
+        "queries": len(queries),
+        "build_s": round(build_s, 3),
+        "index_us_per_query": round(index_us, 2),
+        "naive_us_per_query": round(naive_us, 2),
+        "speedup": round(naive_us / index_us, 1) if index_us else None,
+        "hit_rate": round(hits / len(queries), 3),
+        "deterministic": stable,
+    }
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for k, v in result.items():
+            print(f"{k:>20}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: quote latency per priority during a surge, by scheduler policy.
+
+Runs a burst of --quotes quote jobs through services.priority_scheduler, the
+way supply_agent.on_quote does. Jobs arrive at --rate per second, faster than
+the workers can serve them, and --critical-frac of them are critical. Each job
+prices a random request against a generated fleet DB on the InventoryPool
+readers, then sleeps --send-ms to stand in for ctx.send. The run is repeated
+for each policy:
+  * fifo:     arrival order (the old handler-at-a-time behaviour);
+  * strict:   highest priority first;
+  * weighted: stride scheduling by weight.
+Every policy lifts a waiting job one level per --aging-s.
+
+Reports end-to-end latency (submit -> reply sent) and queue wait per priority.
+
+    python benchmarks/bench_priority_scheduler.py --quotes 2000 --rate 1500
+    python benchmarks/bench_priority_scheduler.py --policies strict,weighted --workers 8 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.inventory_db import InventoryPool, offer_for_request
+from services.priority_scheduler import PRIORITIES, PriorityScheduler
+
+
+def pct(values: list, p: float) -> float:
+    s = sorted(values)
+    return round(s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))], 1) if s else 0.0
+
+
+def make_jobs(n: int, suppliers: int, item_names: list, critical_frac: float, rnd: random.Random) -> list:
+    rest = [p for p in PRIORITIES if p != "critical"]
+    return [("critical" if rnd.random() < critical_frac else rnd.choice(rest),
+             rnd.randint(1, suppliers),
+             [{"name": name, "qty": rnd.randint(1, 200)} for name in rnd.sample(item_names, 3)])
+            for _ in range(n)]
+
+
+async def run(pool: InventoryPool, jobs: list, policy: str, workers: int, aging_s: float,
+              rate: float, send_s: float) -> dict:
+    sched = PriorityScheduler(workers=workers, policy=policy, aging_s=aging_s)
+    lat = {p: [] for p in PRIORITIES}
+    done = asyncio.Event()
+    remaining = len(jobs)
+
+    async def quote(prio, sid, lines, t_submit):
+        nonlocal remaining
+        await pool.run_read(offer_for_request, sid, lines)
+        await asyncio.sleep(send_s)
+        lat[prio].append((time.perf_counter() - t_submit) * 1000)
+        remaining -= 1
+        if not remaining:
+            done.set()
+
+    t0 = time.perf_counter()
+    for i, (prio, sid, lines) in enumerate(jobs):
+        # open-loop arrivals: submit on schedule whether or not workers keep up
+        delay = t0 + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        now = time.perf_counter()
+        sched.submit(prio, lambda p=prio, s=sid, l=lines, t=now: quote(p, s, l, t))
+    await done.wait()
+    wall = time.perf_counter() - t0
+    stats = sched.stats()
+    await sched.close()
+
+    return {"policy": policy, "wall_s": round(wall, 3), "quotes_per_s": round(len(jobs) / wall, 1),
+            "aged": stats["aged"],
+            "priorities": {p: {"n": len(lat[p]), "p50_ms": pct(lat[p], 50), "p95_ms": pct(lat[p], 95),
+                               "max_ms": pct(lat[p], 100), "wait_p95_ms": stats[p]["wait_p95_ms"]}
+                           for p in PRIORITIES}}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--quotes", type=int, default=2000, help="jobs in the surge")
+    p.add_argument("--rate", type=float, default=1500.0, help="arrivals per second")
+    p.add_argument("--critical-frac", type=float, default=0.05)
+    p.add_argument("--policies", default="fifo,strict,weighted")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--aging-s", type=float, default=1.0)
+    p.add_argument("--send-ms", type=float, default=2.0, help="simulated reply send time per quote")
+    p.add_argument("--suppliers", type=int, default=50)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json", action="store_true", help="emit machine-readable results")
+    args = p.parse_args()
+
+    from db.generate_suppliers import CORE_ITEMS, generate
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_sched_") as tmp:
+        db = os.path.join(tmp, "fleet.db")
+        generate(db, args.suppliers, 500, 100, seed=42)
+        pool = InventoryPool(db, readers=args.workers)
+        try:
+            for policy in args.policies.split(","):
+                jobs = make_jobs(args.quotes, args.suppliers, list(CORE_ITEMS), args.critical_frac,
+                                 random.Random(args.seed))
+                results.append(asyncio.run(run(pool, jobs, policy, args.workers, args.aging_s,
+                                               args.rate, args.send_ms / 1000.0)))
+        finally:
+            pool.close()
+
+    if args.json:
+        print(json.dumps({"quotes": args.quotes, "rate": args.rate, "workers": args.workers,
+                          "results": results}))
+        return
+    print(f"{args.quotes} quotes at {args.rate:.0f}/s, {args.workers} workers, "
+          f"{args.critical_frac:.0%} critical")
+    for r in results:
+        print(f"--- {r['policy']}: {r['quotes_per_s']} quotes/s, {r['aged']} aged picks")
+        for prio, s in r["priorities"].items():
+            print(f"{prio:>10}: n={s['n']:<5} p50={s['p50_ms']}ms p95={s['p95_ms']}ms "
+                  f"max={s['max_ms']}ms queue_wait_p95={s['wait_p95_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cross-supplier stock search ("who has >= N of X near P").
+
+Generates (or reuses) a synthetic fleet DB and times
+services.inventory_db.find_suppliers_for_items against a naive baseline that
+scans every supplier row and computes haversine distances in Python, which is
+what a caller without the R*Tree would have to do.
+
+    python benchmarks/bench_supplier_search.py --suppliers 10000
+    python benchmarks/bench_supplier_search.py --db /tmp/fleet.db --queries 200 --json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db.generate_suppliers import CORE_ITEMS, REGIONS, generate
+from services.inventory_db import _haversine_km, connect, find_suppliers_for_items, get_catalog
+
+
+def make_queries(n: int, seed: int) -> list:
+    rnd = random.Random(seed)
+    names = list(CORE_ITEMS)
+    out = []
+    for _ in range(n):
+        _, lat, lon, sigma = rnd.choice(REGIONS)
+        items = [(name, rnd.choice([1, 50, 200, 1000, 4000])) for name in rnd.sample(names, rnd.randint(1, 3))]
+        out.append((rnd.gauss(lat, sigma), rnd.gauss(lon, sigma), rnd.choice([10.0, 25.0, 50.0, 100.0]), items))
+    return out
+
+
+def naive_search(conn, lat, lon, radius_km, items, limit=50):
+    """Full scan baseline with the same result semantics (ids + coverage ordering)."""
+    cat = get_catalog(conn)
+    wanted = {}
+    for name, qty in items:
+        item_id = cat.resolve(name, conn)
+        if item_id is not None:
+            wanted[item_id] = (name, max(int(qty), 1))
+    floor = next(iter(wanted.values()))[1] if len(wanted) == 1 else 1
+    hits = []
+    for s in conn.execute("SELECT id, lat, lon, radius_km FROM suppliers"):
+        d_km = _haversine_km(lat, lon, s["lat"], s["lon"])
+        if d_km > radius_km or d_km > s["radius_km"]:
+            continue
+        stock = {wanted[r["item_id"]][0]: r["qty"] for r in conn.execute(
+            f"SELECT item_id, qty FROM items WHERE supplier_id = ? AND item_id IN ({','.join('?' * len(wanted))})",
+            (s["id"], *wanted)) if r["qty"] >= floor}
+        if stock:
+            cov = round(sum(min(stock.get(n, 0) / q, 1.0) for n, q in wanted.values()) / len(wanted), 3)
+            hits.append((-cov, round(d_km, 2), s["id"]))
+    hits.sort()
+    return [h[2] for h in hits[:limit]]
+
+
+def timed(fn, queries) -> dict:
+    lat_ms = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(*q)
+        lat_ms.append((time.perf_counter() - t0) * 1e3)
+    s = sorted(lat_ms)
+    return {"n": len(s), "p50_ms": round(s[len(s) // 2], 2), "p95_ms": round(s[int(0.95 * (len(s) - 1))], 2),
+            "max_ms": round(s[-1], 2)}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", default=None, help="existing fleet DB (default: generate one in a temp dir)")
+    p.add_argument("--suppliers", type=int, default=10_000)
+    p.add_argument("--skus", type=int, default=5000)
+    p.add_argument("--items-per-supplier", type=int, default=150)
+    p.add_argument("--queries", type=int, default=100)
+    p.add_argument("--naive-queries", type=int, default=10, help="the full-scan baseline is slow; 0 skips it")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json", action="store_true", help="emit machine-readable results")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_search_") as tmp:
+        db = args.db
+        if db is None:
+            db = os.path.join(tmp, "fleet.db")
+            generate(db, args.suppliers, args.skus, args.items_per_supplier, seed=42)
+        conn = connect(db)
+        queries = make_queries(args.queries, args.seed)
+        for q in queries[:10]:      # warm page cache and catalog
+            find_suppliers_for_items(conn, *q)
+
+        result = {"db": args.db or f"generated:{args.suppliers}",
+                  "suppliers": conn.execute("SELECT count(*) FROM suppliers").fetchone()[0],
+                  "indexed": timed(lambda *q: find_suppliers_for_items(conn, *q), queries)}
+        if args.naive_queries:
+            sample = queries[:args.naive_queries]
+            mismatches = sum(naive_search(conn, *q) != [r["supplier_id"] for r in find_suppliers_for_items(conn, *q)]
+                             for q in sample)
+            result["naive"] = timed(lambda *q: naive_search(conn, *q), sample)
+            result["mismatches"] = mismatches
+        conn.close()
+
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"{result['suppliers']} suppliers ({result['db']})")
+    for k in ("indexed", "naive"):
+        if k in result:
+            r = result[k]
+            print(f"{k:>8}: p50={r['p50_ms']}ms p95={r['p95_ms']}ms max={r['max_ms']}ms (n={r['n']})")
+    if "mismatches" in result:
+        print(f"result mismatches vs naive: {result['mismatches']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic supplier fleets for the canonical inventory schema.
+
+    python db/generate_suppliers.py --db /tmp/fleet.db --suppliers 5000 --skus 20000
+    python db/generate_suppliers.py --demo            # the two demo depots into db/agent_aid.db
+
+Same --seed, same DB. Suppliers are clustered around metro centres, and each
+stocks a core of common relief items plus a popularity-skewed sample of the
+SKU catalog. The fleet load runs in one transaction with executemany. The
+secondary index is dropped for the load and rebuilt afterwards, so large
+benchmark fixtures build in seconds.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.inventory_db import connect, ensure_supplier, tx, upsert_item
+from services.item_catalog import normalize
+from services.migrations import create_item_indexes, drop_item_indexes, migrate
+
+DEFAULT_DB = Path(__file__).parent / "agent_aid.db"
+
+# (region, lat, lon, sigma_deg)
+REGIONS: List[Tuple[str, float, float, float]] = [
+    ("sf", 37.77, -122.42, 0.15), ("oakland", 37.80, -122.27, 0.10), ("la", 34.05, -118.24, 0.30),
+    ("sacramento", 38.58, -121.49, 0.15), ("seattle", 47.61, -122.33, 0.20), ("portland", 45.52, -122.68, 0.15),
+    ("phoenix", 33.45, -112.07, 0.25), ("houston", 29.76, -95.37, 0.30), ("miami", 25.76, -80.19, 0.20),
+    ("nyc", 40.71, -74.01, 0.20), ("chicago", 41.88, -87.63, 0.20), ("denver", 39.74, -104.99, 0.20),
+]
+
+# relief staples every catalog carries, with (unit, price range)
+CORE_ITEMS: Dict[str, Tuple[str, float, float]] = {
+    "blanket": ("ea", 6.0, 15.0),
+    "water bottle": ("ea", 0.5, 2.0),
+    "food ration": ("pack", 3.0, 9.0),
+    "medical supply": ("kit", 10.0, 60.0),
+    "diaper": ("pack", 8.0, 20.0),
+    "baby food": ("case", 15.0, 40.0),
+    "tent": ("ea", 40.0, 200.0),
+    "flashlight": ("ea", 3.0, 15.0),
+    "battery": ("pack", 2.0, 10.0),
+    "clothing": ("ea", 5.0, 30.0),
+}
+
+_NOUNS = ["tarp", "glove", "mask", "radio", "cot", "sleeping bag", "jacket", "sock", "boot", "bandage",
+          "splint", "syringe", "inhaler", "formula", "soap", "toothbrush", "towel", "generator",
+          "water filter", "hygiene kit", "stretcher", "fire extinguisher", "rope", "shovel"]
+_ADJS = ["wool", "thermal", "kids", "adult", "xl", "compact", "heavy duty", "disposable", "sterile",
+         "insulated", "waterproof", "emergency", "reusable", "foldable", "solar", "n95"]
+_MODES = ["truck", "van", "drone", "ambulance", "boat"]
+
+# The depots start_agents_fixed.py runs supply agents for (names match SUPPLIER_NAME there)
+DEMO_SUPPLIERS = [
+    {
+        "name": "emergency_medical_fire", "lat": 37.7749, "lon": -122.4194,
+        "label": "Emergency Medical & Fire Response Depot", "base_lead_h": 1.0,
+        "radius_km": 150.0, "delivery_mode": "ambulance",
+        "items": [("blanket", 500, "ea", 12.0), ("ambulance", 10, "ea", 0.0),
+                  ("burn medicine", 200, "kit", 35.0), ("medical supply", 300, "kit", 25.0),
+                  ("water bottle", 1000, "ea", 1.0)],
+    },
+    {
+        "name": "family_child_emergency", "lat": 37.8044, "lon": -122.2712,
+        "label": "Family & Child Emergency Supplies Depot", "base_lead_h": 1.5,
+        "radius_km": 120.0, "delivery_mode": "van",
+        "items": [("baby food", 10, "case", 30.0), ("diaper", 20, "pack", 14.0),
+                  ("blanket", 50, "ea", 10.0), ("baby formula", 40, "can", 22.0),
+                  ("clothing", 100, "ea", 12.0), ("toy", 60, "ea", 6.0)],
+    },
+]
+
+
+def make_catalog(n: int, rnd: random.Random) -> List[str]:
+    """Core relief items first, then unique synthetic SKUs (already canonical)."""
+    names = list(CORE_ITEMS)
+    seen = set(names)
+    while len(names) < n:
+        name = normalize(f"{rnd.choice(_ADJS)} {rnd.choice(_NOUNS)} {rnd.randrange(100_000):05d}")
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names[:max(n, 0)]
+
+
+def make_suppliers(n: int, rnd: random.Random) -> List[tuple]:
+    rows = []
+    for i in range(n):
+        region, lat, lon, sigma = REGIONS[i % len(REGIONS)]
+        rows.append((
+            i + 1, f"sup_{region}_{i:06d}",
+            round(rnd.gauss(lat, sigma), 5), round(rnd.gauss(lon, sigma), 5),
+            f"{region.upper()} depot {i}", round(rnd.uniform(0.5, 3.0), 2),
+            float(rnd.choice([40, 60, 80, 120, 160, 200])), rnd.choice(_MODES),
+        ))
+    return rows
+
+
+def iter_items(n_suppliers: int, catalog: List[str], ids: List[int], per_supplier: int,
+               rnd: random.Random) -> Iterator[tuple]:
+    """(supplier_id, item_id, name, unit, unit_price, qty) rows; ids[i] is catalog[i]'s item id."""
+    n_core = min(len(CORE_ITEMS), len(catalog))
+    tail = len(catalog) - n_core
+    for sid in range(1, n_suppliers + 1):
+        picked = {i for i in range(n_core) if rnd.random() < 0.8}
+        want = min(per_supplier, len(catalog))
+        while len(picked) < want and tail:
+            # popularity skew: low catalog positions are stocked far more often
+            picked.add(n_core + min(int(rnd.paretovariate(1.2)) - 1, tail - 1))
+            if rnd.random() < 0.3:
+                picked.add(n_core + rnd.randrange(tail))
+        for i in sorted(picked):
+            name = catalog[i]
+            unit, lo, hi = CORE_ITEMS.get(name, ("ea", 1.0, 80.0))
+            yield (sid, ids[i], name, unit, round(rnd.uniform(lo, hi), 2), rnd.randint(0, 5_000))
+
+
+def generate(db_path: str, suppliers: int, skus: int, items_per_supplier: int, seed: int) -> Dict[str, float]:
+    """Build a fresh fleet DB at `db_path` (must not exist). Returns row counts and timings."""
+    if os.path.exists(db_path):
+        raise FileExistsError(db_path)
+    rnd = random.Random(seed)
+    t0 = time.perf_counter()
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL;")
+    migrate(conn)
+    # bulk-load settings; the DB is new, so a crash mid-load just means re-running
+    conn.execute("PRAGMA synchronous = OFF;")
+    drop_item_indexes(conn)
+
+    catalog = make_catalog(skus, rnd)
+    conn.execute("BEGIN")
+    # the migration already seeded some canonical items (alias targets); reuse their ids
+    conn.executemany("INSERT OR IGNORE INTO item_catalog(name) VALUES (?)", ((n,) for n in catalog))
+    id_of = dict(conn.execute("SELECT name, id FROM item_catalog"))
+    ids = [id_of[n] for n in catalog]
+    conn.executemany(
+        "INSERT INTO suppliers(id, name, lat, lon, label, base_lead_h, radius_km, delivery_mode) "
+        "VALUES (?,?,?,?,?,?,?,?)", make_suppliers(suppliers, rnd))
+    cur = conn.executemany(
+        "INSERT INTO items(supplier_id, item_id, name, unit, unit_price, qty) VALUES (?,?,?,?,?,?)",
+        iter_items(suppliers, catalog, ids, items_per_supplier, rnd))
+    n_items = cur.rowcount
+    conn.execute("COMMIT")
+    load_s = time.perf_counter() - t0
+
+    create_item_indexes(conn)
+    conn.execute("ANALYZE;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.close()
+
+    connect(db_path).close()   # sanity: opens like any agent would
+    return {"suppliers": suppliers, "skus": len(catalog), "items": n_items,
+            "load_s": round(load_s, 3), "total_s": round(time.perf_counter() - t0, 3)}
+
+
+def seed_demo(db_path: str) -> None:
+    """(Re)stock the demo depots; re-running resets their stock instead of adding to it."""
+    conn = connect(db_path)
+    for sup in DEMO_SUPPLIERS:
+        sid = ensure_supplier(conn, sup["name"], sup["lat"], sup["lon"], sup["label"],
+                              sup["base_lead_h"], sup["radius_km"], sup["delivery_mode"])
+        with tx(conn):
+            conn.execute("DELETE FROM items WHERE supplier_id=?", (sid,))
+            for name, qty, unit, price in sup["items"]:
+                upsert_item(conn, sid, name, qty, unit, price)
+        print(f"✅ {sup['label']}: " + ", ".join(f"{n}:{q}" for n, q, _, _ in sup["items"]))
+    conn.close()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", default=None, help="output DB (fleet mode: must not exist unless --force)")
+    p.add_argument("--suppliers", type=int, default=1000)
+    p.add_argument("--skus", type=int, default=5000)
+    p.add_argument("--items-per-supplier", type=int, default=150)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--force", action="store_true", help="overwrite an existing fleet DB")
+    p.add_argument("--demo", action="store_true", help="stock the two demo depots instead of a fleet")
+    args = p.parse_args()
+
+    if args.demo:
+        seed_demo(args.db or os.getenv("INV_DB_PATH") or str(DEFAULT_DB))
+        return
+    if not args.db:
+        raise SystemExit("--db is required for fleet generation")
+    if args.force:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    stats = generate(args.db, args.suppliers, args.skus, args.items_per_supplier, args.seed)
+    print(", ".join(f"{k}={v}" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
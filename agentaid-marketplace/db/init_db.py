@@ -5,7 +5,11 @@ Initialize the AgentAid database with proper schema
 
 import sqlite3
 import os
+import sys
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.migrations import migrate
 
 def init_database():
     """Initialize the database with proper schema"""
@@ -18,36 +22,21 @@ def init_database():
     if db_path.exists():
         print(f"🗑️  Removing existing database: {db_path}")
         db_path.unlink()
+    for suffix in ("-wal", "-shm"):
+        Path(str(db_path) + suffix).unlink(missing_ok=True)
     
     # Create database directory
     db_dir.mkdir(exist_ok=True)
     
     # Connect to database
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL;")
     
     print(f"📊 Creating database: {db_path}")
     
-    # Read and execute the schema
-    schema_file = db_dir / "inventory.sql"
-    if schema_file.exists():
-        with open(schema_file, 'r') as f:
-            schema_sql = f.read()
-        
-        # Execute the schema
-        conn.executescript(schema_sql)
-        print("✅ Database schema created")
-    else:
-        print("❌ Schema file not found")
-        return False
-    
-    # Add category column if it doesn't exist
-    try:
-        conn.execute("ALTER TABLE items ADD COLUMN category TEXT DEFAULT 'general'")
-        print("✅ Added category column")
-    except sqlite3.OperationalError:
-        # Column already exists
-        pass
+    # Apply every schema migration (services/migrations.py is the single schema source)
+    version = migrate(conn)
+    print(f"✅ Database schema created (version {version})")
     
     conn.close()
     print("✅ Database initialization complete")
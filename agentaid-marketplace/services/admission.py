@@ -0,0 +1,81 @@
+# services/admission.py
+"""
+Admission control for supply agent quote traffic.
+
+Two checks, both O(1) and without touching the DB:
+  * a token bucket per sender address (`rate`/s, up to `burst`);
+  * a cap on quotes admitted but not yet answered (`max_pending`). The
+    last `critical_reserve` share of it is held back for critical requests.
+
+Both count quotes, not messages: a batch of N requests is admitted with
+`cost=N`, takes N tokens and holds N pending slots until released.
+
+A rejected request gets a retry-after hint. For the rate limit, that is
+when the sender's tokens arrive. For the pending cap, it is roughly how
+long the current backlog takes to drain (EWMA quote time x pending / workers).
+"""
+import time
+from typing import Dict, Optional, Tuple
+
+OVERLOADED = "overloaded"
+RATE_LIMITED = "rate_limited"
+BATCH_TOO_LARGE = "batch_too_large"
+
+
+class AdmissionControl:
+    def __init__(self, rate: float = 20.0, burst: float = 40.0, max_pending: int = 256,
+                 workers: int = 4, critical_reserve: float = 0.1, max_senders: int = 10000):
+        self.rate = rate                    # <= 0 disables per-sender limiting
+        self.burst = max(burst, 1.0)
+        self.max_pending = max_pending      # <= 0 disables the cap
+        self.workers = max(workers, 1)
+        self.critical_reserve = critical_reserve
+        self.max_senders = max_senders
+        self.pending = 0
+        self._buckets: Dict[str, Tuple[float, float]] = {}   # sender -> (tokens, last refill)
+        self._job_s = 0.01                   # EWMA of admitted job duration, per quote
+        self.admitted = 0
+        self.rejected = {OVERLOADED: 0, RATE_LIMITED: 0}
+
+    def _take(self, sender: str, cost: float, now: float) -> float:
+        """Take `cost` tokens; returns 0 on success, else seconds until they are available."""
+        tokens, last = self._buckets.get(sender, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= cost:
+            self._buckets[sender] = (tokens - cost, now)
+            return 0.0
+        self._buckets[sender] = (tokens, now)
+        return (cost - tokens) / self.rate
+
+    def _sweep(self, now: float) -> None:
+        # buckets that have refilled are indistinguishable from new ones
+        full_after = self.burst / self.rate
+        for s in [s for s, (_, last) in self._buckets.items() if now - last >= full_after]:
+            del self._buckets[s]
+
+    def admit(self, sender: str, critical: bool = False, cost: float = 1.0) -> Tuple[Optional[str], float]:
+        """(None, 0) if admitted (call release() with the same cost when done), else (reason, retry_after_s)."""
+        now = time.monotonic()
+        if self.max_pending > 0:
+            limit = self.max_pending if critical else int(self.max_pending * (1.0 - self.critical_reserve))
+            if self.pending + cost > limit:
+                self.rejected[OVERLOADED] += 1
+                return OVERLOADED, round(max(0.5, self._job_s * self.pending / self.workers), 2)
+        if self.rate > 0:
+            if len(self._buckets) > self.max_senders:
+                self._sweep(now)
+            wait = self._take(sender, cost, now)
+            if wait > 0:
+                self.rejected[RATE_LIMITED] += 1
+                return RATE_LIMITED, round(wait, 2)
+        self.pending += cost
+        self.admitted += 1
+        return None, 0.0
+
+    def release(self, elapsed_s: float, cost: float = 1.0) -> None:
+        self.pending = max(self.pending - cost, 0)
+        self._job_s += 0.1 * (elapsed_s / max(cost, 1.0) - self._job_s)
+
+    def stats(self) -> Dict[str, float]:
+        return {"pending": self.pending, "admitted": self.admitted, "senders": len(self._buckets),
+                "job_ms": round(self._job_s * 1000, 1), **{f"rejected_{k}": v for k, v in self.rejected.items()}}
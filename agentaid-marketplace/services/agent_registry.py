@@ -0,0 +1,222 @@
+# services/agent_registry.py
+"""
+Local agent address registry (SQLite-backed) with incremental watches.
+
+Agents publish their address under a role ("need", "supply", "coordinator")
+on startup and withdraw it on shutdown. Every write takes the next value of a
+global sequence number, so subscribers only fetch rows newer than the last
+sequence they saw. They skip even that query when `PRAGMA data_version`
+reports no commit from another connection. At a 0.2 s poll interval, topology
+changes reach every subscriber in well under a second, without restarts.
+
+Heartbeats refresh `updated_at`; entries not refreshed within `ttl_s` are
+reported as removed, so a crashed agent ages out on its own.
+
+Writes take the database lock and may wait up to the 5 s busy timeout, so
+agents issue them through `run_write`, which runs them on the registry's own
+writer thread and connection instead of the event loop.
+"""
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+REGISTRY_PATH = os.getenv("AGENT_REGISTRY_PATH", "db/agent_registry.db")
+REGISTRY_POLL_S = float(os.getenv("AGENT_REGISTRY_POLL_S", "0.2"))
+REGISTRY_HEARTBEAT_S = float(os.getenv("AGENT_REGISTRY_HEARTBEAT_S", "10.0"))
+REGISTRY_TTL_S = float(os.getenv("AGENT_REGISTRY_TTL_S", "30.0"))
+
+REGISTRY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agents (
+  address     TEXT PRIMARY KEY,
+  role        TEXT NOT NULL,
+  name        TEXT,
+  endpoint    TEXT,
+  meta        TEXT,
+  updated_at  REAL NOT NULL,
+  removed     INTEGER NOT NULL DEFAULT 0,
+  seq         INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_agents_seq ON agents(seq);
+"""
+
+
+@dataclass(slots=True)
+class RegistryEntry:
+    address: str
+    role: str
+    name: Optional[str] = None
+    endpoint: Optional[str] = None
+    meta: Dict[str, Any] = field(default_factory=dict)
+    updated_at: float = 0.0
+    removed: bool = False
+    seq: int = 0
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "RegistryEntry":
+        address, role, name, endpoint, meta, updated_at, removed, seq = row
+        return cls(address, role, name, endpoint, json.loads(meta) if meta else {},
+                   float(updated_at), bool(removed), int(seq))
+
+
+_COLS = "address, role, name, endpoint, meta, updated_at, removed, seq"
+
+T = TypeVar("T")
+
+
+class AgentRegistry:
+    def __init__(self, path: str = REGISTRY_PATH):
+        self.path = path
+        # writes use their own connection, only ever touched from the writer thread
+        self._writer = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        self._writer.execute("PRAGMA journal_mode = WAL;")
+        self._writer.execute("PRAGMA synchronous = NORMAL;")
+        self._writer.executescript(REGISTRY_SCHEMA)
+        self._write_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="registry-write")
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        # address -> publish() arguments, so a lapsed entry is re-published as registered
+        self._published: Dict[str, Tuple[str, Optional[str], Optional[str], Dict[str, Any]]] = {}
+
+    def close(self) -> None:
+        self._write_exec.shutdown(wait=True)
+        self._writer.close()
+        self.conn.close()
+
+    async def run_write(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run a write method (publish / heartbeat / keepalive / withdraw) on the writer thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._write_exec, functools.partial(fn, *args, **kwargs))
+
+    @contextmanager
+    def _tx(self):
+        try:
+            self._writer.execute("BEGIN IMMEDIATE;")
+            yield
+            self._writer.execute("COMMIT;")
+        except Exception:
+            self._writer.execute("ROLLBACK;")
+            raise
+
+    def _next_seq(self) -> int:
+        return int(self._writer.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM agents").fetchone()[0])
+
+    def publish(self, address: str, role: str, name: Optional[str] = None,
+                endpoint: Optional[str] = None, meta: Optional[Dict[str, Any]] = None) -> int:
+        """Register (or refresh) `address` under `role`; returns the write's sequence number."""
+        with self._tx():
+            seq = self._next_seq()
+            self._writer.execute(
+                f"INSERT OR REPLACE INTO agents({_COLS}) VALUES (?,?,?,?,?,?,0,?)",
+                (address, role, name, endpoint, json.dumps(meta or {}), time.time(), seq),
+            )
+        self._published[address] = (role, name, endpoint, meta or {})
+        return seq
+
+    def heartbeat(self, address: str) -> bool:
+        """Refresh a live entry; False if it is unknown or withdrawn (caller should re-publish)."""
+        with self._tx():
+            cur = self._writer.execute(
+                "UPDATE agents SET updated_at=?, seq=? WHERE address=? AND removed=0",
+                (time.time(), self._next_seq(), address),
+            )
+        return cur.rowcount > 0
+
+    def keepalive(self, address: str) -> bool:
+        """
+        Heartbeat `address`; if its entry lapsed, re-publish it with the role,
+        name, endpoint and meta it was last published with. True if re-published.
+        """
+        if self.heartbeat(address) or address not in self._published:
+            return False
+        self.publish(address, *self._published[address])
+        return True
+
+    def withdraw(self, address: str) -> None:
+        """Tombstone `address` so watchers see the removal."""
+        with self._tx():
+            self._writer.execute(
+                "UPDATE agents SET removed=1, updated_at=?, seq=? WHERE address=?",
+                (time.time(), self._next_seq(), address),
+            )
+        self._published.pop(address, None)
+
+    def changes_since(self, seq: int, roles: Optional[Iterable[str]] = None) -> List[RegistryEntry]:
+        sql = f"SELECT {_COLS} FROM agents WHERE seq > ?"
+        args: list = [seq]
+        if roles:
+            roles = list(roles)
+            sql += f" AND role IN ({','.join('?' * len(roles))})"
+            args += roles
+        return [RegistryEntry.from_row(r) for r in self.conn.execute(sql + " ORDER BY seq", args)]
+
+    def addresses(self, role: str, ttl_s: float = REGISTRY_TTL_S) -> List[str]:
+        """Live addresses for `role` (one-shot read, no watch state)."""
+        cutoff = time.time() - ttl_s
+        return [r[0] for r in self.conn.execute(
+            "SELECT address FROM agents WHERE role=? AND removed=0 AND updated_at>=? ORDER BY address",
+            (role, cutoff),
+        )]
+
+    def watch(self, roles: Iterable[str], ttl_s: float = REGISTRY_TTL_S) -> "RegistryWatch":
+        return RegistryWatch(self, roles, ttl_s)
+
+
+def open_registry(path: str = REGISTRY_PATH) -> Optional[AgentRegistry]:
+    """Open the registry, or None if it is unavailable (discovery is best-effort)."""
+    try:
+        return AgentRegistry(path)
+    except sqlite3.Error:
+        return None
+
+
+class RegistryWatch:
+    """
+    Incremental view over the registry for a set of roles.
+
+    Call `poll()` periodically (e.g. from `@agent.on_interval`); it returns
+    (added, removed) since the previous poll, and `live` holds the current view.
+    """
+
+    def __init__(self, registry: AgentRegistry, roles: Iterable[str], ttl_s: float = REGISTRY_TTL_S):
+        self.registry = registry
+        self.roles = tuple(roles)
+        self.ttl_s = ttl_s
+        self.live: Dict[str, RegistryEntry] = {}
+        self._seq = 0
+        self._data_version: Optional[int] = None
+
+    def addresses(self, role: str) -> List[str]:
+        return sorted(a for a, e in self.live.items() if e.role == role)
+
+    def poll(self) -> Tuple[List[RegistryEntry], List[str]]:
+        added: List[RegistryEntry] = []
+        removed: List[str] = []
+
+        dv = self.registry.conn.execute("PRAGMA data_version").fetchone()[0]
+        if dv != self._data_version:
+            self._data_version = dv
+            cutoff = time.time() - self.ttl_s
+            for e in self.registry.changes_since(self._seq, self.roles):
+                self._seq = max(self._seq, e.seq)
+                known = e.address in self.live
+                if e.removed or e.updated_at < cutoff:
+                    if known:
+                        del self.live[e.address]
+                        removed.append(e.address)
+                else:
+                    self.live[e.address] = e
+                    if not known:
+                        added.append(e)
+
+        # age out agents that stopped heartbeating without withdrawing
+        cutoff = time.time() - self.ttl_s
+        for addr in [a for a, e in self.live.items() if e.updated_at < cutoff]:
+            del self.live[addr]
+            removed.append(addr)
+        return added, removed
@@ -0,0 +1,154 @@
+# services/async_inventory.py
+"""
+Awaitable inventory API for uAgent handlers.
+
+Reads (get_supplier_config, get_inventory, offer_for_request) run on the
+InventoryPool reader threads. Stock writes (deductions, restocks,
+adjustments) go through one writer task that group-commits them: whatever
+queued up while the previous commit was in flight is applied in a single
+transaction. Under load, one fsync then covers many Accepts instead of
+stalling the agent once per Accept.
+"""
+import asyncio
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from services.inventory_db import (
+    InventoryPool,
+    adjust_items,
+    apply_batch,
+    deduct_items,
+    deduct_once,
+    ensure_supplier,
+    get_inventory,
+    get_supplier_config,
+    offer_for_request,
+    prune_processed_accepts,
+)
+
+T = TypeVar("T")
+
+GROUP_COMMIT_MAX = int(os.getenv("INV_GROUP_COMMIT_MAX", "64"))
+# extra wait for stragglers before committing; 0 = batch only what is already queued
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("INV_GROUP_COMMIT_WINDOW_MS", "0"))
+
+
+class AsyncInventory:
+    def __init__(self, pool: InventoryPool, max_batch: int = GROUP_COMMIT_MAX,
+                 window_ms: float = GROUP_COMMIT_WINDOW_MS):
+        self.pool = pool
+        self.max_batch = max(max_batch, 1)
+        self.window_s = window_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None   # (fn, args, future), None = stop
+        self._writer: Optional[asyncio.Task] = None
+        self._closing = False
+        self.commits = 0
+        self.writes = 0         # ops that succeeded
+        self.batched = 0        # ops in committed batches, failed ones included
+        self.max_batch_seen = 0
+
+    @classmethod
+    def open(cls, db_path: str, **kw) -> "AsyncInventory":
+        return cls(InventoryPool(db_path), **kw)
+
+    # ---------- reads ----------
+    async def run_read(self, fn: Callable[..., T], *args) -> T:
+        return await self.pool.run_read(fn, *args)
+
+    async def get_supplier_config(self, name: str) -> Dict[str, Any] | None:
+        return await self.pool.run_read(get_supplier_config, name)
+
+    async def get_inventory(self, supplier_id: int) -> List[Dict[str, Any]]:
+        return await self.pool.run_read(get_inventory, supplier_id)
+
+    async def offer_for_request(self, supplier_id: int,
+                                requested: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], float]:
+        return await self.pool.run_read(offer_for_request, supplier_id, requested)
+
+    # ---------- writes ----------
+    async def ensure_supplier(self, name: str, lat: float, lon: float, label: str,
+                              base_lead_h: float, radius_km: float, delivery_mode: str) -> int:
+        return await self.pool.run_write(ensure_supplier, name, lat, lon, label,
+                                         base_lead_h, radius_km, delivery_mode)
+
+    async def deduct_allocation(self, supplier_id: int, items: List[Dict[str, Any]]) -> None:
+        """Resolves once the deduction is committed (possibly together with others)."""
+        await self._submit(deduct_items, supplier_id, items)
+
+    async def deduct_once(self, supplier_id: int, need_id: str, content_hash: str,
+                          items: List[Dict[str, Any]], notice: str) -> Tuple[str, bool]:
+        """Idempotent deduction (see inventory_db.deduct_once); resolves once committed."""
+        return await self._submit(deduct_once, supplier_id, need_id, content_hash, items, notice)
+
+    async def prune_processed_accepts(self, supplier_id: int, older_than: float) -> int:
+        return await self._submit(prune_processed_accepts, supplier_id, older_than)
+
+    async def adjust_stock(self, supplier_id: int, changes: List[Dict[str, Any]],
+                           create_missing: bool = True) -> List[Dict[str, Any]]:
+        """Signed qty deltas (see inventory_db.adjust_items); returns touched rows once committed."""
+        return await self._submit(adjust_items, supplier_id, changes, create_missing)
+
+    async def _submit(self, fn: Callable[..., T], *args) -> T:
+        if self._closing:
+            raise RuntimeError("inventory closed")
+        if self._writer is None:
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._write_loop())
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((fn, args, fut))
+        return await fut
+
+    async def _write_loop(self) -> None:
+        q = self._queue
+        stopping = False
+        while not stopping:
+            first = await q.get()
+            if first is None:
+                return
+            batch = [first]
+            if self.window_s > 0:
+                await asyncio.sleep(self.window_s)
+            while len(batch) < self.max_batch and not q.empty():
+                nxt = q.get_nowait()
+                if nxt is None:     # close(): commit what we have, then stop
+                    stopping = True
+                    break
+                batch.append(nxt)
+            try:
+                results = await self.pool.run_write(apply_batch, [(fn, args) for fn, args, _ in batch])
+            except Exception as e:
+                results = [(None, e)] * len(batch)
+            else:
+                self.commits += 1
+                self.writes += sum(err is None for _, err in results)
+                self.batched += len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            for (_, _, fut), (res, err) in zip(batch, results):
+                if fut.done():
+                    continue
+                if err is None:
+                    fut.set_result(res)
+                else:
+                    fut.set_exception(err)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"commits": self.commits, "writes": self.writes,
+                "max_batch": self.max_batch_seen,
+                "avg_batch": round(self.batched / self.commits, 2) if self.commits else 0.0}
+
+    async def close(self) -> None:
+        """
+        Let queued writes commit, then stop the writer and close the pool (off
+        the loop). Writes submitted from here on fail with RuntimeError, as
+        do any still queued once the writer has stopped.
+        """
+        self._closing = True
+        if self._writer is not None:
+            await self._queue.put(None)
+            await self._writer
+            self._writer = None
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not None and not item[2].done():
+                    item[2].set_exception(RuntimeError("inventory closed"))
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
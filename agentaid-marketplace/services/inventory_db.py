@@ -1,15 +1,111 @@
 # services/inventory_db.py
+import asyncio
+import math
+import os
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Dict, Any, List, Tuple
+from typing import Callable, Dict, Any, Iterable, List, Tuple, TypeVar
 
-def connect(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+from services.item_catalog import ItemCatalog
+from services.migrations import migrate
+
+class InventoryConnection(sqlite3.Connection):
+    """sqlite3 connection that carries its loaded ItemCatalog."""
+    catalog: ItemCatalog | None = None
+    has_geo_index: bool | None = None
+
+T = TypeVar("T")
+
+# prepared statements kept per connection (sqlite3's default is 128)
+CACHED_STATEMENTS = int(os.getenv("INV_DB_CACHED_STATEMENTS", "256"))
+READ_POOL_SIZE = int(os.getenv("INV_DB_READERS", "4"))
+
+def connect(db_path: str, journal_mode: str = "WAL", synchronous: str | None = None,
+            cached_statements: int = CACHED_STATEMENTS) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False,
+                           factory=InventoryConnection, cached_statements=cached_statements)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute(f"PRAGMA journal_mode = {journal_mode};")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous = {synchronous};")
     conn.execute("PRAGMA foreign_keys = ON;")
+    # only reads user_version once the file is current; the catalog loads on first use
+    migrate(conn)
+    return conn
+
+def connect_readonly(db_path: str, cached_statements: int = CACHED_STATEMENTS) -> sqlite3.Connection:
+    """Read-only connection (mode=ro); the schema must already be migrated by a writer."""
+    uri = "file:" + os.path.abspath(db_path).replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False,
+                           factory=InventoryConnection, cached_statements=cached_statements)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON;")
     return conn
 
+class InventoryPool:
+    """
+    One writer connection plus per-thread read-only connections, each with its
+    own thread pool. In WAL mode readers never wait on the writer. All writes
+    go through a single thread, so BEGIN IMMEDIATE never contends inside this
+    process. Async code awaits run_read()/run_write() and never blocks the event
+    loop on disk I/O or on the write lock.
+    """
+
+    def __init__(self, db_path: str, readers: int = READ_POOL_SIZE, synchronous: str | None = None,
+                 cached_statements: int = CACHED_STATEMENTS):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self.writer = connect(db_path, synchronous=synchronous, cached_statements=cached_statements)
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._read_exec = ThreadPoolExecutor(max_workers=max(readers, 1), thread_name_prefix="inv-read")
+        self._write_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inv-write")
+
+    def reader(self) -> sqlite3.Connection:
+        """This thread's read-only connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_readonly(self.db_path, self.cached_statements)
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def read(self, fn: Callable[..., T], *args) -> T:
+        """Run fn(conn, *args) on a read-only connection in the calling thread."""
+        return fn(self.reader(), *args)
+
+    def write(self, fn: Callable[..., T], *args) -> T:
+        """Run fn(writer, *args) on the writer thread and wait for it (sync callers)."""
+        return self._write_exec.submit(fn, self.writer, *args).result()
+
+    async def run_read(self, fn: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._read_exec, self.read, fn, *args)
+
+    async def run_write(self, fn: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._write_exec, fn, self.writer, *args)
+
+    def close(self) -> None:
+        self._read_exec.shutdown(wait=True)
+        self._write_exec.shutdown(wait=True)
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self.writer.close()
+
+def get_catalog(conn: sqlite3.Connection) -> ItemCatalog:
+    """The connection's item catalog, loaded on first use."""
+    cat = getattr(conn, "catalog", None)
+    if cat is None:
+        cat = ItemCatalog.load(conn)
+        if isinstance(conn, InventoryConnection):
+            conn.catalog = cat
+    return cat
+
 @contextmanager
 def tx(conn: sqlite3.Connection):
     try:
@@ -33,14 +129,16 @@ def ensure_supplier(conn: sqlite3.Connection, name: str, lat: float, lon: float,
 
 def upsert_item(conn: sqlite3.Connection, supplier_id: int, name: str, qty: int,
                 unit: str | None, unit_price: float | None):
+    cat = get_catalog(conn)
+    item_id = cat.ensure(conn, name)
     conn.execute("""
-        INSERT INTO items(supplier_id, name, unit, unit_price, qty)
-        VALUES (?,?,?,?,?)
+        INSERT INTO items(supplier_id, item_id, name, unit, unit_price, qty)
+        VALUES (?,?,?,?,?,?)
         ON CONFLICT(supplier_id, name) DO UPDATE SET
           unit=COALESCE(excluded.unit, items.unit),
           unit_price=COALESCE(excluded.unit_price, items.unit_price),
           qty=items.qty + excluded.qty
-    """, (supplier_id, name.lower(), unit, unit_price or 0.0, qty))
+    """, (supplier_id, item_id, cat.name_of(item_id), unit, unit_price or 0.0, qty))
 
 def get_supplier_config(conn: sqlite3.Connection, name: str) -> Dict[str, Any] | None:
     s = conn.execute("SELECT * FROM suppliers WHERE name=?", (name,)).fetchone()
@@ -49,16 +147,23 @@ def get_supplier_config(conn: sqlite3.Connection, name: str) -> Dict[str, Any] |
     return dict(s)
 
 def get_inventory(conn: sqlite3.Connection, supplier_id: int) -> List[Dict[str, Any]]:
-    rows = conn.execute("SELECT name, unit, unit_price, qty FROM items WHERE supplier_id=?", (supplier_id,)).fetchall()
+    rows = conn.execute("SELECT item_id, name, unit, unit_price, qty FROM items WHERE supplier_id=?", (supplier_id,)).fetchall()
     return [dict(r) for r in rows]
 
-def offer_for_request(conn: sqlite3.Connection, supplier_id: int, requested: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], float]:
-    inv = {r["name"]: r for r in get_inventory(conn, supplier_id)}
+def inventory_snapshot(conn: sqlite3.Connection, supplier_id: int) -> Dict[int, Dict[str, Any]]:
+    """Supplier stock keyed by item id; pass as `inv` to price many requests against one read."""
+    return {r["item_id"]: r for r in get_inventory(conn, supplier_id)}
+
+def offer_for_request(conn: sqlite3.Connection, supplier_id: int, requested: List[Dict[str, Any]],
+                      inv: Dict[int, Dict[str, Any]] | None = None) -> Tuple[List[Dict[str, Any]], float]:
+    cat = get_catalog(conn)
+    if inv is None:
+        inv = inventory_snapshot(conn, supplier_id)
     offered, ratios = [], []
     for r in requested:
         want = int(r.get("qty", 0))
-        name = r["name"].lower()
-        stock = inv.get(name, {"qty": 0, "unit": None, "unit_price": 0.0})
+        item_id = cat.resolve(r["name"], conn)
+        stock = inv.get(item_id, {"qty": 0, "unit": None, "unit_price": 0.0})
         offer = min(want, int(stock["qty"]))
         if want > 0:
             ratios.append(min(offer / float(want), 1.0))
@@ -74,26 +179,293 @@ def offer_for_request(conn: sqlite3.Connection, supplier_id: int, requested: Lis
 def add_inventory_item(conn: sqlite3.Connection, supplier_id: int, name: str, qty: int, 
                       unit: str, unit_price: float, category: str = "general"):
     """Add inventory item for a supplier"""
+    cat = get_catalog(conn)
+    item_id = cat.ensure(conn, name)
     conn.execute("""
-        INSERT INTO items(supplier_id, name, qty, unit, unit_price, category)
-        VALUES (?, ?, ?, ?, ?, ?)
+        INSERT INTO items(supplier_id, item_id, name, qty, unit, unit_price, category)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
         ON CONFLICT(supplier_id, name) DO UPDATE SET
           qty = qty + excluded.qty,
           unit = COALESCE(excluded.unit, items.unit),
           unit_price = COALESCE(excluded.unit_price, items.unit_price),
           category = COALESCE(excluded.category, items.category)
-    """, (supplier_id, name.lower(), qty, unit, unit_price, category))
+    """, (supplier_id, item_id, cat.name_of(item_id), qty, unit, unit_price, category))
+
+_BULK_UPSERT_SQL = {
+    # restock: add to what is on the shelf
+    "add": """
+        INSERT INTO items(supplier_id, item_id, name, unit, unit_price, qty, category)
+        VALUES (?,?,?,?,?,?,COALESCE(?, 'general'))
+        ON CONFLICT(supplier_id, name) DO UPDATE SET
+          unit=COALESCE(excluded.unit, items.unit),
+          unit_price=COALESCE(?, items.unit_price),
+          qty=items.qty + excluded.qty,
+          category=COALESCE(?, items.category)
+    """,
+    # stocktake: the file is the new truth for the rows it mentions
+    "set": """
+        INSERT INTO items(supplier_id, item_id, name, unit, unit_price, qty, category)
+        VALUES (?,?,?,?,?,?,COALESCE(?, 'general'))
+        ON CONFLICT(supplier_id, name) DO UPDATE SET
+          unit=COALESCE(excluded.unit, items.unit),
+          unit_price=COALESCE(?, items.unit_price),
+          qty=excluded.qty,
+          category=COALESCE(?, items.category)
+    """,
+}
+
+def bulk_upsert_items(conn: sqlite3.Connection, rows: Iterable[Tuple[int, str, int, str | None, float | None, str | None]],
+                      mode: str = "add") -> int:
+    """
+    Upsert (supplier_id, name, qty, unit, unit_price, category) rows in one
+    transaction with a single executemany. Callers chunk large inputs; a
+    missing unit_price/category keeps the stored value. Returns rows written.
+    """
+    cat = get_catalog(conn)
+    params = []
+    try:
+        with tx(conn):
+            # new catalog entries commit with the chunk (one fsync, not one per SKU)
+            for sid, name, qty, unit, price, category in rows:
+                item_id = cat.ensure(conn, name)
+                params.append((sid, item_id, cat.name_of(item_id), unit, price or 0.0, int(qty),
+                               category, price, category))
+            # key order keeps UNIQUE(supplier_id, name) page hits sequential
+            params.sort(key=lambda r: (r[0], r[2]))
+            conn.executemany(_BULK_UPSERT_SQL[mode], params)
+    except Exception:
+        cat.refresh(conn)   # drop ids handed out inside the rolled-back transaction
+        raise
+    return len(params)
+
+def deduct_items(conn: sqlite3.Connection, supplier_id: int, items: List[Dict[str, Any]]):
+    """deduct_allocation without its own transaction (for apply_batch / an open tx)."""
+    cat = get_catalog(conn)
+    for it in items:
+        item_id = cat.resolve(it["name"], conn)
+        qty  = int(it.get("qty", 0))
+        if item_id is None:
+            continue
+        # BEGIN IMMEDIATE holds the write lock; clamp at zero in one statement
+        conn.execute("UPDATE items SET qty=MAX(0, qty - ?) WHERE supplier_id=? AND item_id=?",
+                     (qty, supplier_id, item_id))
 
 def deduct_allocation(conn: sqlite3.Connection, supplier_id: int, items: List[Dict[str, Any]]):
     with tx(conn):
-        for it in items:
-            name = it["name"].lower()
-            qty  = int(it.get("qty", 0))
-            # lock row and update
-            row = conn.execute("SELECT qty FROM items WHERE supplier_id=? AND name=?",
-                               (supplier_id, name)).fetchone()
-            if not row:
+        deduct_items(conn, supplier_id, items)
+
+def deduct_once(conn: sqlite3.Connection, supplier_id: int, need_id: str, content_hash: str,
+                items: List[Dict[str, Any]], notice: str, now: float | None = None) -> Tuple[str, bool]:
+    """
+    Deduct an Accept at most once per (supplier, need_id, content_hash), with
+    no transaction of its own. The stored notice is written in the same
+    transaction as the stock change. Returns (notice, duplicate): for a
+    duplicate, the notice first recorded and no stock change.
+    """
+    row = conn.execute("SELECT notice FROM processed_accepts WHERE supplier_id=? AND need_id=? AND content_hash=?",
+                       (supplier_id, need_id, content_hash)).fetchone()
+    if row is not None:
+        return row[0], True
+    deduct_items(conn, supplier_id, items)
+    conn.execute("INSERT INTO processed_accepts(supplier_id, need_id, content_hash, notice, created_at) "
+                 "VALUES (?,?,?,?,?)", (supplier_id, need_id, content_hash, notice, now or time.time()))
+    return notice, False
+
+def prune_processed_accepts(conn: sqlite3.Connection, supplier_id: int, older_than: float) -> int:
+    """Drop a supplier's idempotency rows created before `older_than` (epoch s) in one statement."""
+    return conn.execute("DELETE FROM processed_accepts WHERE supplier_id=? AND created_at < ?",
+                        (supplier_id, older_than)).rowcount
+
+def adjust_items(conn: sqlite3.Connection, supplier_id: int, changes: List[Dict[str, Any]],
+                 create_missing: bool = True) -> List[Dict[str, Any]]:
+    """
+    Apply signed qty deltas (name, qty, optional unit/unit_price), clamping
+    at zero. Positive deltas for unstocked items create them when
+    `create_missing`. No transaction of its own. Returns the touched rows
+    with their new quantities.
+    """
+    cat = get_catalog(conn)
+    touched = []
+    for ch in changes:
+        qty = int(ch.get("qty", 0))
+        if qty > 0 and create_missing:
+            item_id = cat.ensure(conn, ch["name"])
+            conn.execute("""
+                INSERT INTO items(supplier_id, item_id, name, unit, unit_price, qty)
+                VALUES (?,?,?,?,COALESCE(?, 0.0),?)
+                ON CONFLICT(supplier_id, name) DO UPDATE SET
+                  unit=COALESCE(excluded.unit, items.unit),
+                  unit_price=COALESCE(?, items.unit_price),
+                  qty=items.qty + excluded.qty
+            """, (supplier_id, item_id, cat.name_of(item_id), ch.get("unit"), ch.get("unit_price"), qty,
+                  ch.get("unit_price")))
+        else:
+            item_id = cat.resolve(ch["name"], conn)
+            if item_id is None:
+                continue
+            conn.execute("UPDATE items SET qty=MAX(0, qty + ?), unit=COALESCE(?, unit), "
+                         "unit_price=COALESCE(?, unit_price) WHERE supplier_id=? AND item_id=?",
+                         (qty, ch.get("unit"), ch.get("unit_price"), supplier_id, item_id))
+        touched.append(item_id)
+    if not touched:
+        return []
+    marks = ",".join("?" * len(touched))
+    rows = conn.execute(f"SELECT item_id, name, unit, unit_price, qty FROM items "
+                        f"WHERE supplier_id=? AND item_id IN ({marks})", (supplier_id, *touched))
+    return [dict(r) for r in rows]
+
+def adjust_stock(conn: sqlite3.Connection, supplier_id: int, changes: List[Dict[str, Any]],
+                 create_missing: bool = True) -> List[Dict[str, Any]]:
+    """adjust_items in one transaction (restock / admin adjustments)."""
+    try:
+        with tx(conn):
+            return adjust_items(conn, supplier_id, changes, create_missing)
+    except Exception:
+        get_catalog(conn).refresh(conn)   # drop ids handed out inside the rolled-back transaction
+        raise
+
+def apply_batch(conn: sqlite3.Connection,
+                ops: List[Tuple[Callable[..., Any], tuple]]) -> List[Tuple[Any, Exception | None]]:
+    """
+    Group commit: run several fn(conn, *args) writes in one transaction, so
+    they share a single fsync. Each op runs in its own savepoint, so a failing
+    op is rolled back alone and does not abort the others. Returns
+    (result, error) per op.
+    """
+    out: List[Tuple[Any, Exception | None]] = []
+    failed = False
+    try:
+        with tx(conn):
+            for fn, args in ops:
+                conn.execute("SAVEPOINT op;")
+                try:
+                    out.append((fn(conn, *args), None))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op;")
+                    out.append((None, e))
+                    failed = True
+                conn.execute("RELEASE op;")
+    except Exception:
+        get_catalog(conn).refresh(conn)   # the whole transaction rolled back
+        raise
+    if failed:
+        get_catalog(conn).refresh(conn)   # drop ids handed out inside rolled-back savepoints
+    return out
+
+# ---------- cross-supplier stock search ----------
+KM_PER_DEG = 111.32
+
+def _geo_bbox(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    dlat = radius_km / KM_PER_DEG
+    dlon = radius_km / (KM_PER_DEG * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+def _has_geo_index(conn: sqlite3.Connection) -> bool:
+    flag = getattr(conn, "has_geo_index", None)
+    if flag is None:
+        flag = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='supplier_geo'").fetchone() is not None
+        if isinstance(conn, InventoryConnection):
+            conn.has_geo_index = flag
+    return flag
+
+def find_suppliers_for_items(conn: sqlite3.Connection, lat: float, lon: float, radius_km: float,
+                             items: Iterable[Tuple[str, int]], limit: int = 50,
+                             within_service_radius: bool = True) -> List[Dict[str, Any]]:
+    """
+    Suppliers within `radius_km` of (lat, lon) holding stock of any requested
+    item, best first (coverage desc, then distance). Each result carries
+    `distance_km`, `stock` {requested name: qty on hand} and `coverage` (the same
+    mean fill ratio offer_for_request reports). With `within_service_radius`,
+    suppliers whose own delivery radius doesn't reach the point are dropped.
+    """
+    cat = get_catalog(conn)
+    wanted: Dict[int, Tuple[str, int]] = {}
+    for name, qty in items:
+        item_id = cat.resolve(name, conn)
+        if item_id is not None:
+            wanted[item_id] = (name, max(int(qty), 1))
+    if not wanted:
+        return []
+
+    min_lat, max_lat, min_lon, max_lon = _geo_bbox(lat, lon, radius_km)
+    ids = list(wanted)
+    marks = ",".join("?" * len(ids))
+    # one item: push the quantity floor into the index range scan
+    floor = next(iter(wanted.values()))[1] if len(wanted) == 1 else 1
+    cols = "s.id, s.name, s.lat, s.lon, s.radius_km, s.base_lead_h, s.delivery_mode, i.item_id, i.qty"
+    box = (min_lat, max_lat, min_lon, max_lon)
+    params = (*box, *ids, floor)
+    if _has_geo_index(conn):
+        # Pick the driving side: walk the suppliers in the box and probe their stock
+        # (supplier_cover index), or walk the stock rows and probe the R*Tree. The
+        # probe counts are bounded, so choosing costs well under a millisecond.
+        n_near = conn.execute("SELECT count(*) FROM supplier_geo WHERE min_lat >= ? AND max_lat <= ? "
+                              "AND min_lon >= ? AND max_lon <= ?", box).fetchone()[0]
+        n_stock = conn.execute(f"SELECT count(*) FROM (SELECT 1 FROM items WHERE item_id IN ({marks}) "
+                               f"AND qty >= ? LIMIT ?)", (*ids, floor, n_near * len(ids) + 1)).fetchone()[0]
+        if n_stock > n_near * len(ids):
+            sql = f"""
+                WITH near AS MATERIALIZED (
+                  SELECT id FROM supplier_geo
+                  WHERE min_lat >= ? AND max_lat <= ? AND min_lon >= ? AND max_lon <= ?)
+                SELECT {cols}
+                FROM near CROSS JOIN items i ON i.supplier_id = near.id
+                CROSS JOIN suppliers s ON s.id = near.id
+                WHERE i.item_id IN ({marks}) AND i.qty >= ?
+            """
+        else:
+            sql = f"""
+                SELECT {cols}
+                FROM items i
+                CROSS JOIN supplier_geo g ON g.id = i.supplier_id
+                JOIN suppliers s ON s.id = i.supplier_id
+                WHERE i.item_id IN ({marks}) AND i.qty >= ?
+                  AND g.min_lat >= ? AND g.max_lat <= ? AND g.min_lon >= ? AND g.max_lon <= ?
+            """
+            params = (*ids, floor, *box)
+    else:
+        sql = f"""
+            SELECT {cols}
+            FROM suppliers s JOIN items i ON i.supplier_id = s.id
+            WHERE s.lat BETWEEN ? AND ? AND s.lon BETWEEN ? AND ?
+              AND i.item_id IN ({marks}) AND i.qty >= ?
+        """
+    found: Dict[int, Dict[str, Any]] = {}
+    for r in conn.execute(sql, params):
+        sup = found.get(r["id"])
+        if sup is None:
+            d_km = _haversine_km(lat, lon, r["lat"], r["lon"])
+            if d_km > radius_km or (within_service_radius and d_km > r["radius_km"]):
+                found[r["id"]] = {}     # remember the rejection, skip its other rows
                 continue
-            new_qty = max(0, int(row["qty"]) - qty)
-            conn.execute("UPDATE items SET qty=? WHERE supplier_id=? AND name=?",
-                         (new_qty, supplier_id, name))
+            sup = found[r["id"]] = {
+                "supplier_id": r["id"], "name": r["name"], "lat": r["lat"], "lon": r["lon"],
+                "distance_km": round(d_km, 2), "base_lead_h": r["base_lead_h"],
+                "delivery_mode": r["delivery_mode"], "stock": {},
+            }
+        if sup:
+            sup["stock"][wanted[r["item_id"]][0]] = int(r["qty"])
+
+    out = []
+    for sup in found.values():
+        if not sup:
+            continue
+        sup["coverage"] = round(sum(min(sup["stock"].get(n, 0) / q, 1.0) for n, q in wanted.values())
+                                / len(wanted), 3)
+        out.append(sup)
+    out.sort(key=lambda s: (-s["coverage"], s["distance_km"], s["supplier_id"]))
+    return out[:limit]
+
+def find_suppliers_with_stock(conn: sqlite3.Connection, lat: float, lon: float, radius_km: float,
+                              item: str, min_qty: int = 1, limit: int = 50,
+                              within_service_radius: bool = True) -> List[Dict[str, Any]]:
+    """Suppliers within `radius_km` holding at least `min_qty` of `item`, nearest first."""
+    rows = find_suppliers_for_items(conn, lat, lon, radius_km, [(item, min_qty)], limit=limit,
+                                    within_service_radius=within_service_radius)
+    return [r for r in rows if r["coverage"] >= 1.0]
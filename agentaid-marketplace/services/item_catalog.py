@@ -0,0 +1,223 @@
+# services/item_catalog.py
+"""
+Canonical item catalog shared by the inventory DB and the agents.
+
+Every item name (SKU, request line, alias) is normalized once into a canonical
+key ("Blankets" -> "blanket", "water" -> "water bottle") and resolved to an
+integer id from `item_catalog`. Inventory rows carry that id, so offers and
+deductions join on ints instead of re-normalizing strings on every request.
+"""
+import sqlite3
+from typing import Dict, Iterable, Optional
+
+from services.item_index import tokenize
+
+# alias -> canonical name; both sides are normalized before use. The DB copy is
+# seeded by the v2 migration, so new entries here need a migration to reach it.
+DEFAULT_ALIASES: Dict[str, str] = {
+    "water": "water bottle",
+    "bottled water": "water bottle",
+    "drinking water": "water bottle",
+    "food": "food ration",
+    "food supply": "food ration",
+    "meal": "food ration",
+    "medicine": "medical supply",
+    "medical": "medical supply",
+    "first aid kit": "medical supply",
+    "clothes": "clothing",
+    "diaper pack": "diaper",
+    "baby food case": "baby food",
+}
+
+# separate statements (not executescript) so they can run inside a migration transaction
+CATALOG_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS item_catalog (
+      id    INTEGER PRIMARY KEY AUTOINCREMENT,
+      name  TEXT UNIQUE NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS item_aliases (
+      alias    TEXT PRIMARY KEY,
+      item_id  INTEGER NOT NULL,
+      FOREIGN KEY (item_id) REFERENCES item_catalog(id) ON DELETE CASCADE
+    )""",
+]
+
+
+def normalize(name: str) -> str:
+    """Canonical key for an item name: lowercase, singular tokens joined by spaces."""
+    return " ".join(tokenize(name))
+
+
+_DEFAULT_KEYS: Dict[str, str] = {normalize(a): normalize(c) for a, c in DEFAULT_ALIASES.items()}
+
+
+def canonical_key(name: str) -> str:
+    """normalize() plus the default aliases, for agents that have no DB catalog."""
+    key = normalize(name)
+    return _DEFAULT_KEYS.get(key, key)
+
+
+class ItemCatalog:
+    """In-memory alias -> item id map, loaded once per connection and refreshed on miss."""
+
+    def __init__(self):
+        self._by_key: Dict[str, int] = {}
+        self._by_raw: Dict[str, int] = {}   # raw spelling cache, skips normalize() on repeats
+        self._names: Dict[int, str] = {}
+        self._stamp: tuple = ()
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "ItemCatalog":
+        cat = cls()
+        cat.refresh(conn)
+        return cat
+
+    @staticmethod
+    def _db_stamp(conn: sqlite3.Connection) -> tuple:
+        return tuple(conn.execute(
+            "SELECT (SELECT IFNULL(MAX(id), 0) FROM item_catalog), (SELECT COUNT(*) FROM item_catalog), "
+            "(SELECT COUNT(*) FROM item_aliases)"
+        ).fetchone())
+
+    def _adopt_stamp(self, conn: sqlite3.Connection, expected: tuple) -> None:
+        """
+        After our own write: keep the DB stamp only if it shows exactly that
+        write. Anything more means another process added rows we never loaded,
+        so reload now; otherwise resolve() would never see them.
+        """
+        if self._db_stamp(conn) == expected:
+            self._stamp = expected
+        else:
+            self.refresh(conn)
+
+    def refresh(self, conn: sqlite3.Connection) -> None:
+        self._stamp = self._db_stamp(conn)
+        self._names = {int(r[0]): r[1] for r in conn.execute("SELECT id, name FROM item_catalog")}
+        self._by_key = {name: iid for iid, name in self._names.items()}
+        for alias, iid in conn.execute("SELECT alias, item_id FROM item_aliases"):
+            self._by_key[alias] = int(iid)
+        self._by_raw = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def name_of(self, item_id: int) -> Optional[str]:
+        return self._names.get(item_id)
+
+    def resolve(self, name: str, conn: Optional[sqlite3.Connection] = None) -> Optional[int]:
+        """
+        Item id for `name` (any spelling/alias), or None if unknown.
+        When `conn` is given, a miss reloads the catalog once in case another
+        process registered the item since we loaded.
+        """
+        iid = self._by_raw.get(name)
+        if iid is not None:
+            return iid
+        key = normalize(name)
+        iid = self._by_key.get(key)
+        if iid is None and conn is not None and self._db_stamp(conn) != self._stamp:
+            self.refresh(conn)
+            iid = self._by_key.get(key)
+        if iid is not None:
+            self._by_raw[name] = iid
+        return iid
+
+    def ensure(self, conn: sqlite3.Connection, name: str) -> int:
+        """Resolve `name`, registering it as a new canonical item if unknown."""
+        iid = self.resolve(name, conn)
+        if iid is not None:
+            return iid
+        key = normalize(name)
+        top, items, aliases = self._stamp or (0, 0, 0)
+        conn.execute("INSERT OR IGNORE INTO item_catalog(name) VALUES (?)", (key,))
+        iid = int(conn.execute("SELECT id FROM item_catalog WHERE name=?", (key,)).fetchone()[0])
+        self._names[iid] = key
+        self._by_key[key] = iid
+        self._by_raw[name] = iid
+        self._adopt_stamp(conn, (max(top, iid), items + 1, aliases))
+        return iid
+
+    def add_alias(self, conn: sqlite3.Connection, alias: str, canonical: str) -> int:
+        """Map `alias` onto the item `canonical` resolves to (created if needed)."""
+        iid = self.ensure(conn, canonical)
+        key = normalize(alias)
+        if key and key != self._names.get(iid):
+            top, items, aliases = self._stamp or (0, 0, 0)
+            known = key in self._by_key and key not in self._names.values()
+            conn.execute("INSERT OR REPLACE INTO item_aliases(alias, item_id) VALUES (?, ?)", (key, iid))
+            self._by_key[key] = iid
+            self._by_raw.pop(alias, None)
+            self._adopt_stamp(conn, (top, items, aliases + (0 if known else 1)))
+        return iid
+
+
+def ensure_catalog_schema(conn: sqlite3.Connection) -> ItemCatalog:
+    """
+    Create catalog tables, seed default aliases and link existing inventory
+    rows, merging rows that land on the same item. Run by the v2 migration,
+    inside its transaction.
+    """
+    for stmt in CATALOG_SCHEMA:
+        conn.execute(stmt)
+    have_items = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='items'"
+    ).fetchone()
+    if have_items:
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(items)")}
+        if "item_id" not in cols:
+            conn.execute("ALTER TABLE items ADD COLUMN item_id INTEGER REFERENCES item_catalog(id)")
+
+    cat = ItemCatalog.load(conn)
+    for alias, canonical in DEFAULT_ALIASES.items():
+        if cat.resolve(alias) is None:
+            cat.add_alias(conn, alias, canonical)
+
+    if have_items:
+        conn.executemany("UPDATE items SET item_id=? WHERE id=?", [
+            (cat.ensure(conn, name), row_id)
+            for row_id, name in conn.execute("SELECT id, name FROM items WHERE item_id IS NULL").fetchall()
+        ])
+        merge_duplicate_items(conn)
+    return cat
+
+
+def merge_duplicate_items(conn: sqlite3.Connection) -> int:
+    """
+    Fold a supplier's rows that share an item_id ("blanket" and "blankets")
+    into one row under the canonical name: quantities summed, the first
+    known unit / non-zero price kept, the other rows deleted. Then rename the
+    remaining rows to their canonical spelling. Deductions match on item_id,
+    so duplicates would each be deducted. Returns the number of rows deleted.
+    """
+    dups = conn.execute("""
+        SELECT i.supplier_id, i.item_id, c.name FROM items i JOIN item_catalog c ON c.id = i.item_id
+        GROUP BY i.supplier_id, i.item_id HAVING COUNT(*) > 1
+    """).fetchall()
+    deleted = 0
+    for sid, iid, canonical in dups:
+        rows = conn.execute(
+            "SELECT id, unit, unit_price, qty FROM items WHERE supplier_id=? AND item_id=? "
+            "ORDER BY name = ? DESC, id", (sid, iid, canonical)).fetchall()
+        keep, losers = rows[0], rows[1:]
+        unit = next((r[1] for r in rows if r[1]), None)
+        price = next((r[2] for r in rows if r[2]), keep[2])
+        conn.executemany("DELETE FROM items WHERE id=?", [(r[0],) for r in losers])
+        conn.execute("UPDATE items SET qty=?, unit=?, unit_price=? WHERE id=?",
+                     (sum(int(r[3]) for r in rows), unit, price, keep[0]))
+        deleted += len(losers)
+    # one row per (supplier, item) now, so the canonical names cannot collide
+    conn.execute("""
+        UPDATE items SET name = (SELECT name FROM item_catalog c WHERE c.id = items.item_id)
+        WHERE item_id IS NOT NULL AND name <> (SELECT name FROM item_catalog c WHERE c.id = items.item_id)
+    """)
+    return deleted
+
+
+def synonyms_for(names: Iterable[str]) -> Dict[str, str]:
+    """
+    Default aliases rewritten onto display names, for in-memory catalogs that
+    never touch the DB (e.g. ItemIndex over a static inventory dict).
+    """
+    display = {normalize(n): n for n in names}
+    return {alias: display[normalize(canon)]
+            for alias, canon in DEFAULT_ALIASES.items() if normalize(canon) in display}
@@ -0,0 +1,108 @@
+# services/item_index.py
+"""
+Normalized token index over SKU names (and optional synonyms).
+
+Built once per inventory snapshot and queried per requested item, so matching
+cost depends on the query and the posting lists it touches rather than on the
+size of the catalog. Results are deterministic: ties are broken by SKU name.
+"""
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def singular(token: str) -> str:
+    """Cheap English singularization, good enough for SKU names (blankets -> blanket)."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ches", "shes", "sses", "xes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Lowercase, split on non-alphanumerics and singularize each token."""
+    return tuple(singular(t) for t in _TOKEN_RE.findall((text or "").lower()))
+
+
+class ItemIndex:
+    """
+    Inverted index from normalized tokens to SKUs.
+
+    A query resolves, in order of preference, to:
+      1. a SKU (or synonym) whose normalized tokens equal the query's;
+      2. the longest SKU phrase contained in the query ("medical supplies for burns");
+      3. the shortest SKU containing every query token ("water" -> "Water Bottles").
+    """
+
+    def __init__(self, names: Iterable[str], synonyms: Optional[Mapping[str, str]] = None):
+        # SKU ids are positions in name order, which makes tie-breaking deterministic
+        self._names: List[str] = sorted(set(names))
+        self._sku_len: List[int] = []
+        self._phrases: Dict[Tuple[str, ...], int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._max_phrase = 0
+
+        ids = {n: i for i, n in enumerate(self._names)}
+        for i, name in enumerate(self._names):
+            toks = tokenize(name)
+            self._sku_len.append(len(toks))
+            self._add_phrase(toks, i)
+        for alias, target in (synonyms or {}).items():
+            sku = ids.get(target)
+            if sku is not None:
+                self._add_phrase(tokenize(alias), sku)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _add_phrase(self, toks: Tuple[str, ...], sku: int) -> None:
+        if not toks:
+            return
+        # first writer wins; SKUs are visited in name order
+        self._phrases.setdefault(toks, sku)
+        self._max_phrase = max(self._max_phrase, len(toks))
+        for tok in set(toks):
+            posting = self._postings.setdefault(tok, [])
+            if not posting or posting[-1] != sku:
+                posting.append(sku)
+
+    def lookup(self, query: str) -> Optional[int]:
+        """Return the SKU id for `query`, or None when nothing matches."""
+        q = tokenize(query)
+        if not q:
+            return None
+
+        exact = self._phrases.get(q)
+        if exact is not None:
+            return exact
+
+        # 2. SKU phrase inside the query: contiguous n-grams, longest first
+        for size in range(min(len(q) - 1, self._max_phrase), 0, -1):
+            best = None
+            for start in range(len(q) - size + 1):
+                sku = self._phrases.get(q[start:start + size])
+                if sku is not None and (best is None or sku < best):
+                    best = sku
+            if best is not None:
+                return best
+
+        # 3. query inside a SKU: intersect postings, rarest token first
+        postings = [self._postings.get(t) for t in set(q)]
+        if not all(postings):
+            return None
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+            if not candidates:
+                return None
+        return min(candidates, key=lambda i: (self._sku_len[i], i))
+
+    def match(self, query: str) -> Optional[str]:
+        """Return the matching SKU name for `query`, or None."""
+        sku = self.lookup(query)
+        return None if sku is None else self._names[sku]
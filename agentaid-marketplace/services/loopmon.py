@@ -0,0 +1,144 @@
+# services/loopmon.py
+"""
+Event-loop lag and blocking-call detector, shared by the agents, the
+telemetry ingest service and the intel collector.
+
+Two parts:
+  * a probe task sleeps `interval_s` in a loop. How late it wakes up is the
+    loop lag, kept in a histogram;
+  * a watchdog thread watches the probe's heartbeat. If the loop has not
+    come back for `block_ms`, it grabs the loop thread's stack. That stack
+    shows the callback hogging the loop (a sync sqlite3 query, es.index,
+    a blocking HTTP call, ...).
+
+When the loop recovers, the block (duration + stack) is counted and passed
+to `on_block` on the loop thread, e.g. to log it. stats() and prometheus()
+expose lag percentiles and block counts as metrics.
+
+    LOOPMON=0             disable
+    LOOPMON_INTERVAL_S    probe period (default 0.25)
+    LOOPMON_BLOCK_MS      blocking threshold (default 100)
+    LOOPMON_REPORT_S      how often agents emit loop_stats telemetry (default 60)
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from services.profiling import BUCKETS_MS, Histogram
+
+LOOPMON = os.getenv("LOOPMON", "1") != "0"
+LOOPMON_INTERVAL_S = float(os.getenv("LOOPMON_INTERVAL_S", "0.25"))
+LOOPMON_BLOCK_MS = float(os.getenv("LOOPMON_BLOCK_MS", "100"))
+LOOPMON_REPORT_S = float(os.getenv("LOOPMON_REPORT_S", "60"))
+
+
+class LoopMonitor:
+    def __init__(self, name: str, interval_s: float = LOOPMON_INTERVAL_S, block_ms: float = LOOPMON_BLOCK_MS,
+                 on_block: Optional[Callable[[Dict[str, Any]], None]] = None, keep: int = 20,
+                 stack_depth: int = 12):
+        self.name = name
+        self.interval_s = interval_s
+        self.block_s = block_ms / 1000.0
+        self.on_block = on_block
+        self.stack_depth = stack_depth
+        self.lag = Histogram()
+        self.blocks = 0
+        self.blocked_ms = 0.0
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self._beat = time.monotonic()
+        self._stall_stack: Optional[List[str]] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    def start(self) -> "LoopMonitor":
+        """Call from inside the running loop."""
+        if self._task is None:
+            self._loop_thread = threading.get_ident()
+            self._beat = time.monotonic()
+            self._task = asyncio.get_running_loop().create_task(self._probe())
+            threading.Thread(target=self._watch, name=f"loopmon-{self.name}", daemon=True).start()
+        return self
+
+    async def _probe(self) -> None:
+        while True:
+            t0 = time.monotonic()
+            await asyncio.sleep(self.interval_s)
+            now = time.monotonic()
+            self._beat = now
+            lag_s = max(now - t0 - self.interval_s, 0.0)
+            self.lag.add(lag_s * 1000.0)
+            stack, self._stall_stack = self._stall_stack, None
+            if lag_s >= self.block_s:
+                self._record_block(lag_s, stack)
+
+    def _record_block(self, lag_s: float, stack: Optional[List[str]]) -> None:
+        block = {"ts": time.time(), "duration_ms": round(lag_s * 1000.0, 1),
+                 "stack": stack or ["<not captured: blocked for less than one watchdog tick>"]}
+        self.blocks += 1
+        self.blocked_ms += block["duration_ms"]
+        self.recent.append(block)
+        if self.on_block is not None:
+            try:
+                self.on_block(block)
+            except Exception:
+                pass
+
+    def _watch(self) -> None:
+        tick = max(self.block_s / 4.0, 0.005)
+        while not self._stop.wait(tick):
+            overdue = time.monotonic() - self._beat - self.interval_s
+            if overdue < self.block_s or self._stall_stack is not None:
+                continue
+            # first tick past the threshold: whatever runs now is what blocks the loop
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._stall_stack = [
+                    f"{os.path.basename(f.filename)}:{f.lineno} {f.name}"
+                    for f in traceback.extract_stack(frame)[-self.stack_depth:]
+                ]
+
+    def stats(self) -> Dict[str, Any]:
+        last = self.recent[-1] if self.recent else None
+        return {"lag_p50_ms": self.lag.quantile(0.5), "lag_p95_ms": self.lag.quantile(0.95),
+                "lag_p99_ms": self.lag.quantile(0.99), "lag_max_ms": round(self.lag.max, 1),
+                "probes": self.lag.count, "blocks": self.blocks, "blocked_ms": round(self.blocked_ms, 1),
+                "last_block": last}
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition of the same numbers."""
+        lbl = f'name="{self.name}"'
+        lines = ["# TYPE loop_lag_ms histogram"]
+        cum = 0
+        for i, c in enumerate(self.lag.counts):
+            cum += c
+            le = "+Inf" if i == len(BUCKETS_MS) else BUCKETS_MS[i]
+            lines.append(f'loop_lag_ms_bucket{{{lbl},le="{le}"}} {cum}')
+        lines += [f"loop_lag_ms_sum{{{lbl}}} {round(self.lag.total, 3)}",
+                  f"loop_lag_ms_count{{{lbl}}} {self.lag.count}",
+                  "# TYPE loop_blocks_total counter", f"loop_blocks_total{{{lbl}}} {self.blocks}",
+                  "# TYPE loop_blocked_ms_total counter", f"loop_blocked_ms_total{{{lbl}}} {round(self.blocked_ms, 1)}"]
+        return "\n".join(lines) + "\n"
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def format_block(block: Dict[str, Any], frames: int = 4) -> str:
+    """One log line: duration and the innermost frames of the blocking stack."""
+    return f"event loop blocked {block['duration_ms']}ms at " + " <- ".join(reversed(block["stack"][-frames:]))
+
+
+def start_loop_monitor(name: str, on_block: Optional[Callable[[Dict[str, Any]], None]] = None
+                       ) -> Optional[LoopMonitor]:
+    """LoopMonitor started on the running loop, or None when LOOPMON=0."""
+    return LoopMonitor(name, on_block=on_block).start() if LOOPMON else None
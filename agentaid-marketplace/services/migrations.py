@@ -0,0 +1,181 @@
+# services/migrations.py
+"""
+Versioned schema migrations for the inventory DB, keyed on PRAGMA user_version.
+
+This module is the single source of truth for the inventory schema. Every
+migration runs in its own IMMEDIATE transaction and bumps user_version in
+that same transaction. Existing DB files are upgraded in place ("online"),
+while other connections keep working. A half-applied step rolls back and is
+retried on the next connect().
+
+Legacy files from the old setup_dummy_suppliers module (`suppliers.key`,
+`inventory` table) stamped their own user_version 1/2. They are recognised
+by shape and upgraded from version 0.
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+from services.item_catalog import ensure_catalog_schema
+
+# secondary indexes on items; bulk loaders drop these and rebuild them after the load
+_INDEX_SQL = {
+    # covering index for get_inventory/offer_for_request/deduct_allocation (supplier_id = ?)
+    "idx_items_supplier_cover":
+        "CREATE INDEX IF NOT EXISTS idx_items_supplier_cover "
+        "ON items(supplier_id, item_id, name, unit, unit_price, qty)",
+    # cross-supplier lookups by item name
+    "idx_items_name": "CREATE INDEX IF NOT EXISTS idx_items_name ON items(name)",
+    # "who has >= N of item X" (find_suppliers_with_stock)
+    "idx_items_item_qty": "CREATE INDEX IF NOT EXISTS idx_items_item_qty ON items(item_id, qty, supplier_id)",
+}
+ITEM_INDEXES: List[Tuple[str, str]] = list(_INDEX_SQL.items())
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+
+def _v1_base(conn: sqlite3.Connection) -> None:
+    """suppliers + items (with category); converts the legacy key/inventory layout."""
+    if _has_table(conn, "suppliers") and "key" in _columns(conn, "suppliers") \
+            and "name" not in _columns(conn, "suppliers"):
+        conn.execute("ALTER TABLE suppliers RENAME COLUMN key TO name")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS suppliers (
+          id            INTEGER PRIMARY KEY AUTOINCREMENT,
+          name          TEXT UNIQUE NOT NULL,
+          lat           REAL NOT NULL,
+          lon           REAL NOT NULL,
+          label         TEXT,
+          base_lead_h   REAL NOT NULL DEFAULT 1.5,
+          radius_km     REAL NOT NULL DEFAULT 120.0,
+          delivery_mode TEXT NOT NULL DEFAULT 'truck'
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS items (
+          id           INTEGER PRIMARY KEY AUTOINCREMENT,
+          supplier_id  INTEGER NOT NULL,
+          name         TEXT NOT NULL,
+          unit         TEXT,
+          unit_price   REAL NOT NULL DEFAULT 0.0,
+          qty          INTEGER NOT NULL DEFAULT 0,
+          category     TEXT DEFAULT 'general',
+          UNIQUE(supplier_id, name),
+          FOREIGN KEY (supplier_id) REFERENCES suppliers(id) ON DELETE CASCADE
+        )""")
+    if "category" not in _columns(conn, "items"):
+        conn.execute("ALTER TABLE items ADD COLUMN category TEXT DEFAULT 'general'")
+
+    if _has_table(conn, "inventory"):
+        conn.execute("""
+            INSERT INTO items(supplier_id, name, unit, unit_price, qty, category)
+            SELECT supplier_id, name, unit, unit_price, qty, category FROM inventory WHERE true
+            ON CONFLICT(supplier_id, name) DO UPDATE SET qty = items.qty + excluded.qty
+        """)
+        conn.execute("ALTER TABLE inventory RENAME TO inventory_legacy")
+
+
+def _v2_catalog(conn: sqlite3.Connection) -> None:
+    """
+    item_catalog / item_aliases and items.item_id (see services.item_catalog);
+    rows that land on one item ("blanket" + "blankets") are merged.
+    """
+    ensure_catalog_schema(conn)
+
+
+def _v3_indexes(conn: sqlite3.Connection) -> None:
+    """Hot-path indexes; the covering index subsumes idx_items_supplier_item."""
+    for name in ("idx_items_supplier_cover", "idx_items_name"):
+        conn.execute(_INDEX_SQL[name])
+    conn.execute("DROP INDEX IF EXISTS idx_items_supplier_item")
+    conn.execute("ANALYZE items")
+
+
+def _v4_geo(conn: sqlite3.Connection) -> None:
+    """R*Tree over supplier positions, kept in sync by triggers, plus items(item_id, qty)."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS supplier_geo "
+                     "USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+    except sqlite3.OperationalError:
+        # SQLite built without R*Tree: a plain (lat, lon) index still bounds the scan
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_suppliers_lat_lon ON suppliers(lat, lon)")
+    else:
+        conn.execute("INSERT OR REPLACE INTO supplier_geo SELECT id, lat, lat, lon, lon FROM suppliers")
+        conn.execute("""CREATE TRIGGER IF NOT EXISTS suppliers_geo_ai AFTER INSERT ON suppliers BEGIN
+            INSERT OR REPLACE INTO supplier_geo VALUES (new.id, new.lat, new.lat, new.lon, new.lon);
+        END""")
+        conn.execute("""CREATE TRIGGER IF NOT EXISTS suppliers_geo_au AFTER UPDATE OF lat, lon ON suppliers BEGIN
+            INSERT OR REPLACE INTO supplier_geo VALUES (new.id, new.lat, new.lat, new.lon, new.lon);
+        END""")
+        conn.execute("""CREATE TRIGGER IF NOT EXISTS suppliers_geo_ad AFTER DELETE ON suppliers BEGIN
+            DELETE FROM supplier_geo WHERE id = old.id;
+        END""")
+    conn.execute(_INDEX_SQL["idx_items_item_qty"])
+    conn.execute("ANALYZE")
+
+
+def _v5_accepts(conn: sqlite3.Connection) -> None:
+    """processed_accepts: one row per applied Accept, with the AllocationNotice sent for it."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS processed_accepts (
+          supplier_id   INTEGER NOT NULL,
+          need_id       TEXT NOT NULL,
+          content_hash  TEXT NOT NULL,
+          notice        TEXT NOT NULL,
+          created_at    REAL NOT NULL,
+          PRIMARY KEY (supplier_id, need_id, content_hash)
+        ) WITHOUT ROWID""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_accepts_created ON processed_accepts(supplier_id, created_at)")
+
+
+# (version, description, step); append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "base suppliers/items schema", _v1_base),
+    (2, "canonical item catalog", _v2_catalog),
+    (3, "hot-path item indexes", _v3_indexes),
+    (4, "supplier R*Tree and item stock index", _v4_geo),
+    (5, "Accept idempotency table", _v5_accepts),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    if _has_table(conn, "suppliers") and "key" in _columns(conn, "suppliers"):
+        return 0    # legacy setup_dummy_suppliers layout, whatever it stamped
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def migrate(conn: sqlite3.Connection, target: int = SCHEMA_VERSION) -> int:
+    """Apply pending migrations up to `target`; returns the resulting version."""
+    version = current_version(conn)
+    for v, _, step in MIGRATIONS:
+        if version >= v or v > target:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have migrated while we waited for the lock
+            if current_version(conn) < v:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {v}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        version = v
+    return version
+
+
+def drop_item_indexes(conn: sqlite3.Connection) -> None:
+    for name, _ in ITEM_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def create_item_indexes(conn: sqlite3.Connection) -> None:
+    for _, sql in ITEM_INDEXES:
+        conn.execute(sql)
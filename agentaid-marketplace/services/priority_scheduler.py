@@ -0,0 +1,123 @@
+# services/priority_scheduler.py
+"""
+Per-priority work queues drained by a small worker pool.
+
+uAgents runs an agent's handlers one message at a time, in arrival order.
+So during a surge, a critical QuoteRequest waits behind every low-priority
+one queued before it. Handlers instead submit their work here and return at
+once, and workers pick the next job by policy:
+
+  * "strict":   always the highest non-empty priority;
+  * "weighted": stride scheduling by PRIORITY_WEIGHTS (critical gets 8x the
+                service share of low while both are backlogged).
+
+Starvation guard (all policies): each `aging_s` a job waits lifts it one
+level. Once the head of a lower queue outranks the head of the most urgent
+one, it is served next. A low job can therefore wait only a bounded time
+past the critical backlog, yet critical work still goes first during a surge.
+stats() reports queue depth and recent wait times per priority.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+PRIORITIES: List[str] = ["critical", "high", "medium", "low"]
+PRIORITY_WEIGHTS: Dict[str, float] = {"critical": 8.0, "high": 4.0, "medium": 2.0, "low": 1.0}
+POLICIES = ("strict", "weighted", "fifo")
+
+
+def _pct(sorted_vals: List[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(p / 100.0 * (len(sorted_vals) - 1))))]
+
+
+class PriorityScheduler:
+    def __init__(self, workers: int = 4, policy: str = "weighted", aging_s: float = 1.0,
+                 weights: Optional[Dict[str, float]] = None, window: int = 512):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.workers = max(workers, 1)
+        self.policy = policy
+        self.aging_s = aging_s
+        self.weights = dict(weights or PRIORITY_WEIGHTS)
+        # (enqueued_at, seq, job); seq gives the fifo policy a global arrival order
+        self._queues: Dict[str, Deque[Tuple[float, int, Callable[[], Awaitable[Any]]]]] = {
+            p: deque() for p in PRIORITIES}
+        self._pass: Dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=window) for p in PRIORITIES}
+        self._served: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._aged = 0
+        self._failed = 0
+        self._seq = 0
+        self._ready: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @staticmethod
+    def level(priority: Optional[str]) -> str:
+        p = (priority or "medium").lower()
+        return p if p in PRIORITIES else "medium"
+
+    def submit(self, priority: Optional[str], job: Callable[[], Awaitable[Any]]) -> None:
+        """Queue `job` (a zero-arg coroutine function) at `priority`; workers start on first use."""
+        if not self._tasks:
+            self._ready = asyncio.Semaphore(0)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._seq += 1
+        self._queues[self.level(priority)].append((time.monotonic(), self._seq, job))
+        self._ready.release()
+
+    def depth(self, priority: Optional[str] = None) -> int:
+        if priority is not None:
+            return len(self._queues[self.level(priority)])
+        return sum(len(q) for q in self._queues.values())
+
+    def _pick(self, now: float) -> str:
+        live = [p for p in PRIORITIES if self._queues[p]]
+        if self.aging_s > 0 and len(live) > 1:
+            rank = {p: PRIORITIES.index(p) - int((now - self._queues[p][0][0]) / self.aging_s) for p in live}
+            lifted = min(live[1:], key=lambda p: (rank[p], PRIORITIES.index(p)))
+            if rank[lifted] < rank[live[0]]:
+                self._aged += 1
+                return lifted
+        if self.policy == "strict":
+            return live[0]
+        if self.policy == "fifo":
+            return min(live, key=lambda p: self._queues[p][0][1])
+        # stride: lowest pass wins; an idle level re-enters at the current floor
+        floor = min(self._pass[p] for p in live)
+        for p in live:
+            self._pass[p] = max(self._pass[p], floor)
+        p = min(live, key=lambda q: (self._pass[q], PRIORITIES.index(q)))
+        self._pass[p] += 1.0 / self.weights.get(p, 1.0)
+        return p
+
+    async def _worker(self) -> None:
+        while True:
+            await self._ready.acquire()
+            now = time.monotonic()
+            p = self._pick(now)
+            enqueued, _, job = self._queues[p].popleft()
+            self._waits[p].append((now - enqueued) * 1000.0)
+            self._served[p] += 1
+            try:
+                await job()
+            except Exception:
+                # jobs report their own failures; one bad job must not kill a worker
+                self._failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"policy": self.policy, "aged": self._aged, "failed": self._failed}
+        for p in PRIORITIES:
+            w = sorted(self._waits[p])
+            out[p] = {"depth": len(self._queues[p]), "served": self._served[p],
+                      "wait_p50_ms": round(_pct(w, 50), 1), "wait_p95_ms": round(_pct(w, 95), 1),
+                      "wait_max_ms": round(w[-1], 1) if w else 0.0}
+        return out
+
+    async def close(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
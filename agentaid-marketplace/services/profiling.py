@@ -0,0 +1,228 @@
+# services/profiling.py
+"""
+Opt-in profiling for agent handlers, switched on by environment.
+
+  PROFILE_HANDLERS=1      wrap @profiled handlers: per-handler wall and CPU
+                          time histograms (CPU counts only the handler's own
+                          steps, not other tasks that ran while it awaited)
+  PROFILE_SAMPLE_HZ=97    also sample the event-loop thread's stack this many
+                          times a second (0 = off). Stacks are folded per
+                          handler, in the collapsed format that flamegraph.pl
+                          and speedscope read.
+  PROFILE_PORT=9100       serve GET /profile/handlers (JSON) and
+                          GET /profile/flame (folded stacks) on 127.0.0.1
+  PROFILE_DIR=.           where SIGUSR1 dumps <agent>-<ts>.folded / .json
+
+Unset, @profiled returns the handler unchanged, so it costs nothing.
+
+    @AidProtocol.on_message(model=QuoteRequest)
+    @profiled("on_quote")
+    async def on_quote(ctx, sender, req): ...
+
+    start_profiling(SUPPLIER_NAME)    # once, from the startup handler
+"""
+import bisect
+import functools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILE_HANDLERS = os.getenv("PROFILE_HANDLERS", "0") != "0"
+PROFILE_SAMPLE_HZ = float(os.getenv("PROFILE_SAMPLE_HZ", "0"))
+PROFILE_PORT = int(os.getenv("PROFILE_PORT", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", ".")
+PROFILE_MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", "64"))
+
+# histogram upper bounds in ms; the last bucket is open-ended
+BUCKETS_MS: List[float] = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, capped at the observed max."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min(BUCKETS_MS[i], round(self.max, 3)) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+                "p50_ms": self.quantile(0.5), "p95_ms": self.quantile(0.95), "p99_ms": self.quantile(0.99),
+                "max_ms": round(self.max, 3),
+                "buckets": {("+Inf" if i == len(BUCKETS_MS) else str(BUCKETS_MS[i])): c
+                            for i, c in enumerate(self.counts) if c}}
+
+
+class _Timed:
+    """Drives a coroutine step by step, charging thread CPU time only for its own steps."""
+    __slots__ = ("coro", "name", "cpu")
+
+    def __init__(self, coro, name: str):
+        self.coro = coro
+        self.name = name
+        self.cpu = 0.0
+
+    def __await__(self):
+        coro, send, exc = self.coro, None, None
+        while True:
+            prev = PROFILER.current
+            PROFILER.current = self.name
+            t = time.thread_time()
+            try:
+                step = coro.throw(exc) if exc is not None else coro.send(send)
+            except StopIteration as e:
+                return e.value
+            finally:
+                self.cpu += time.thread_time() - t
+                PROFILER.current = prev
+            send, exc = None, None
+            try:
+                send = yield step
+            except BaseException as e:      # cancellation etc. goes into the handler
+                exc = e
+
+
+class Profiler:
+    def __init__(self):
+        self.wall: Dict[str, Histogram] = {}
+        self.cpu: Dict[str, Histogram] = {}
+        self.errors: Counter = Counter()
+        self.stacks: Counter = Counter()    # folded stack -> samples
+        self.samples = 0
+        self.current: Optional[str] = None  # handler whose step is running on the loop thread
+        self.agent = "agent"
+        self.started = time.time()
+        self._loop_thread: Optional[int] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._server = None                 # ThreadingHTTPServer once PROFILE_PORT is served
+
+    def observe(self, name: str, wall_ms: float, cpu_ms: float, failed: bool = False) -> None:
+        self.wall.setdefault(name, Histogram()).add(wall_ms)
+        self.cpu.setdefault(name, Histogram()).add(cpu_ms)
+        if failed:
+            self.errors[name] += 1
+
+    # ---------- stack sampling ----------
+    def _sample_loop(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            names.append(self.current or "<loop>")
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    # ---------- output ----------
+    def report(self) -> Dict[str, Any]:
+        return {"agent": self.agent, "since": self.started, "samples": self.samples,
+                "handlers": {name: {"wall": self.wall[name].to_dict(), "cpu": self.cpu[name].to_dict(),
+                                    "errors": self.errors[name]}
+                             for name in sorted(self.wall)}}
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def dump(self, directory: str = PROFILE_DIR) -> str:
+        base = os.path.join(directory, f"{self.agent}-{int(time.time())}")
+        with open(base + ".folded", "w") as f:
+            f.write(self.folded())
+        with open(base + ".json", "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return base
+
+    def _serve(self, port: int) -> None:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        prof = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/profile/handlers"):
+                    body, ctype = json.dumps(prof.report()).encode(), "application/json"
+                elif self.path.startswith("/profile/flame"):
+                    body, ctype = prof.folded().encode(), "text/plain"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="profile-http", daemon=True).start()
+
+    def start(self, agent: str, sample_hz: float = PROFILE_SAMPLE_HZ, port: int = PROFILE_PORT) -> None:
+        """Call from the event-loop thread (e.g. the agent's startup handler)."""
+        self.agent = agent
+        self._loop_thread = threading.get_ident()
+        if sample_hz > 0 and self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, args=(1.0 / sample_hz,),
+                                             name="profile-sampler", daemon=True)
+            self._sampler.start()
+        if port and self._server is None:
+            self._serve(port)
+        if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda *_: self.dump())
+
+
+PROFILER = Profiler()
+
+
+def profiled(name: Optional[str] = None, enabled: bool = PROFILE_HANDLERS) -> Callable:
+    """Decorator for async handlers; a no-op unless PROFILE_HANDLERS is set."""
+    def wrap(fn):
+        if not enabled:
+            return fn
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def handler(*args, **kwargs):
+            timed = _Timed(fn(*args, **kwargs), label)
+            t0, failed = time.perf_counter(), False
+            try:
+                return await timed
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                PROFILER.observe(label, (time.perf_counter() - t0) * 1000.0, timed.cpu * 1000.0, failed)
+        return handler
+    return wrap
+
+
+def start_profiling(agent: str) -> None:
+    if PROFILE_HANDLERS:
+        PROFILER.start(agent)
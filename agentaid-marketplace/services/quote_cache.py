@@ -0,0 +1,87 @@
+# services/quote_cache.py
+"""
+Short-TTL memo of supplier quotes for identical repeated requests.
+
+During a surge many needers ask for the same items, at the same priority,
+from nearly the same place. The supply agent keys computed quotes by
+(quantized location, item lines, priority, max_eta). Nearby identical
+requests then reuse the result instead of re-running the radius check, the
+DB offer query and pricing. Entries are dropped when the TTL expires or
+when inventory for any item they cover changes.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class QuoteCache:
+    def __init__(self, ttl_s: float = 2.0, grid_deg: float = 0.01, max_entries: int = 4096):
+        self.ttl_s = ttl_s
+        self.grid_deg = grid_deg            # 0.01 deg ~ 1.1 km
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any, Tuple]]" = OrderedDict()
+        self._by_item: Dict[Hashable, Set[Tuple]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def key(self, lat: float, lon: float, lines: Iterable[Tuple[Hashable, int]],
+            priority: str, max_eta: Optional[float]) -> Tuple:
+        g = self.grid_deg
+        return (round(lat / g), round(lon / g), tuple(lines), priority, max_eta)
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Tuple, value: Any, items: Iterable[Hashable] = ()) -> None:
+        if key in self._entries:
+            self._drop(key)
+        items = tuple(items)
+        self._entries[key] = (time.monotonic() + self.ttl_s, value, items)
+        for it in items:
+            self._by_item.setdefault(it, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate_items(self, items: Iterable[Hashable]) -> int:
+        """Drop every cached quote that covers any of `items`; returns entries dropped."""
+        dropped = 0
+        for it in items:
+            for key in self._by_item.pop(it, ()):
+                if key in self._entries:
+                    self._drop(key)
+                    dropped += 1
+        self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._by_item.clear()
+
+    def _drop(self, key: Tuple) -> None:
+        _, _, items = self._entries.pop(key)
+        for it in items:
+            keys = self._by_item.get(it)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_item[it]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self._entries),
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,64 @@
+# services/stock_view.py
+"""
+Coordinator-side view of every supplier's stock, fed by InventoryStatus.
+
+Suppliers publish the items whose quantity changed, carrying the new
+absolute qty. They coalesce these over a short window and periodically send
+a full snapshot. Absolute quantities make updates idempotent. A per-supplier
+sequence number drops anything that arrives out of order. Suppliers that
+have not reported within `stale_s` count as unknown, so routing falls back
+to asking them.
+"""
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from services.item_catalog import canonical_key
+
+
+class StockView:
+    def __init__(self, stale_s: float = 120.0):
+        self.stale_s = stale_s
+        # supplier -> {canonical item key: qty}
+        self._stock: Dict[str, Dict[str, int]] = {}
+        self._seq: Dict[str, int] = {}
+        self._seen: Dict[str, float] = {}
+        self.updates = 0
+        self.dropped = 0
+
+    def apply(self, supplier: str, items: Iterable[Tuple[str, int]], seq: Optional[int] = None,
+              full: bool = False) -> bool:
+        """Merge one InventoryStatus; returns False if it was stale (older seq)."""
+        last = self._seq.get(supplier)
+        if seq is not None and last is not None and seq <= last:
+            self.dropped += 1
+            return False
+        if seq is not None:
+            self._seq[supplier] = seq
+        stock = {} if full else self._stock.setdefault(supplier, {})
+        for name, qty in items:
+            stock[canonical_key(name)] = max(int(qty), 0)
+        self._stock[supplier] = stock
+        self._seen[supplier] = time.monotonic()
+        self.updates += 1
+        return True
+
+    def forget(self, supplier: str) -> None:
+        for d in (self._stock, self._seq, self._seen):
+            d.pop(supplier, None)
+
+    def knows(self, supplier: str) -> bool:
+        seen = self._seen.get(supplier)
+        return seen is not None and time.monotonic() - seen <= self.stale_s
+
+    def qty(self, supplier: str, item: str) -> int:
+        return self._stock.get(supplier, {}).get(canonical_key(item), 0)
+
+    def suppliers_with_any(self, items: Iterable[str], min_qty: int = 1) -> Set[str]:
+        """Fresh suppliers holding at least `min_qty` of any of `items`."""
+        keys = [canonical_key(i) for i in items]
+        return {s for s, stock in self._stock.items()
+                if self.knows(s) and any(stock.get(k, 0) >= min_qty for k in keys)}
+
+    def stats(self) -> Dict[str, int]:
+        return {"suppliers": len(self._stock), "fresh": sum(self.knows(s) for s in self._stock),
+                "updates": self.updates, "dropped": self.dropped}
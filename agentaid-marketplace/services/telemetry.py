@@ -0,0 +1,98 @@
+# services/telemetry.py
+"""
+Batched, best-effort export of telemetry events to telemetry_ingest.
+
+emit() only appends to an in-memory buffer, so callers never wait on the
+network. A background task posts the buffer to {url}/batch whenever
+`batch_size` events are waiting, or at most every `flush_s` seconds. It uses
+one pooled HTTP client. When the ingest service is down or slow, the oldest
+events are dropped beyond `max_buffer`; agents never block or fail because of
+telemetry.
+
+httpx is imported when the first batch is shipped, not when the agent starts.
+"""
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class TelemetryExporter:
+    def __init__(self, url: str, batch_size: int = 200, flush_s: float = 1.0, max_buffer: int = 10000,
+                 timeout_s: float = 2.0):
+        self.url = url.rstrip("/") + "/batch"
+        self.batch_size = max(batch_size, 1)
+        self.flush_s = flush_s
+        self.timeout_s = timeout_s
+        self._buf: Deque[Dict[str, Any]] = deque(maxlen=max_buffer)
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failed_posts = 0
+
+    def emit(self, ev: Dict[str, Any]) -> None:
+        if len(self._buf) == self._buf.maxlen:
+            self.dropped += 1
+        self._buf.append(ev)
+        if self._task is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return      # no loop yet: shipped by the first flush once one runs
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        if len(self._buf) >= self.batch_size:
+            self._wake.set()
+
+    def _take(self) -> List[Dict[str, Any]]:
+        n = min(len(self._buf), self.batch_size)
+        return [self._buf.popleft() for _ in range(n)]
+
+    async def _post(self, client: "httpx.AsyncClient", batch: List[Dict[str, Any]]) -> None:
+        try:
+            r = await client.post(self.url, json=batch)
+            r.raise_for_status()
+            # the ingest side validates events one by one and reports the malformed ones
+            rejected = len(r.json().get("rejected") or ())
+            self.sent += len(batch) - rejected
+            self.rejected += rejected
+        except Exception:
+            # telemetry is best-effort; never break the flow
+            self.failed_posts += 1
+            self.dropped += len(batch)
+
+    async def _run(self) -> None:
+        import httpx
+        async with httpx.AsyncClient(timeout=self.timeout_s) as client:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_s)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                while self._buf:
+                    await self._post(client, self._take())
+
+    async def flush(self) -> None:
+        """Ship everything buffered now (e.g. on shutdown)."""
+        if not self._buf:
+            return
+        import httpx
+        async with httpx.AsyncClient(timeout=self.timeout_s) as client:
+            while self._buf:
+                await self._post(client, self._take())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {"buffered": len(self._buf), "sent": self.sent, "dropped": self.dropped,
+                "rejected": self.rejected, "failed_posts": self.failed_posts}
@@ -0,0 +1,122 @@
+# services/tracing.py
+"""
+Lightweight spans across the need -> supplier -> need pipeline.
+
+A trace context travels on the wire as a W3C-style traceparent string
+("00-<32 hex trace id>-<16 hex span id>-01") in the `trace` field of
+QuoteRequest / Accept and their replies. Each agent records spans for its
+own phases, such as send, receive, queue, db, score, gather and allocate.
+Each finished span becomes one "span" telemetry event. The ingest side can
+then rebuild the tree from trace_id / span_id / parent_id and split a slow
+allocation into network, queueing, DB and gather-window time.
+
+Spans are plain objects with wall-clock start/end, so phases that can only
+be measured after the fact (time spent queued) are recorded with
+Tracer.record().
+"""
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+TRACING = os.getenv("TRACING", "1") != "0"
+
+Parent = Union["Span", str, None]
+
+
+def _hex(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+def trace_id_for(key: str) -> str:
+    """Deterministic trace id for a need, so every agent (and a restarted one) agrees on it."""
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, span_id) from a traceparent string; None if absent or malformed."""
+    if not value:
+        return None
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attrs")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 start: Optional[float] = None, span_id: Optional[str] = None, **attrs: Any):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id or _hex(8)
+        self.parent_id = parent_id
+        self.start = time.time() if start is None else start
+        self.end: Optional[float] = None
+        self.attrs = attrs
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time()) - self.start) * 1000.0
+
+
+class Tracer:
+    """Creates spans for one agent and hands finished ones to `export` (e.g. TelemetryExporter.emit)."""
+
+    def __init__(self, agent_type: str, agent_id: str, export: Callable[[Dict[str, Any]], None],
+                 enabled: bool = TRACING):
+        self.agent_type = agent_type
+        self.agent_id = agent_id
+        self.export = export
+        self.enabled = enabled
+
+    def start(self, name: str, parent: Parent = None, trace_id: Optional[str] = None,
+              start: Optional[float] = None, **attrs: Any) -> Span:
+        """Child of `parent` (a Span or traceparent string), else a root in `trace_id` or a new trace."""
+        if isinstance(parent, Span):
+            return Span(name, parent.trace_id, parent.span_id, start, **attrs)
+        ctx = parse_traceparent(parent)
+        if ctx is not None:
+            return Span(name, ctx[0], ctx[1], start, **attrs)
+        return Span(name, trace_id or _hex(16), None, start, **attrs)
+
+    def root(self, name: str, key: str, start: Optional[float] = None, **attrs: Any) -> Span:
+        """The root span of the trace for `key` (e.g. a need_id); same ids every time it is rebuilt."""
+        trace_id = trace_id_for(key)
+        return Span(name, trace_id, None, start, span_id=trace_id[:16], **attrs)
+
+    def finish(self, span: Span, end: Optional[float] = None, **attrs: Any) -> Span:
+        span.end = time.time() if end is None else end
+        span.attrs.update(attrs)
+        if self.enabled:
+            self.export({
+                "ts": span.start, "agent_type": self.agent_type, "agent_id": self.agent_id,
+                "event_type": "span", "span_name": span.name, "trace_id": span.trace_id,
+                "span_id": span.span_id, "parent_id": span.parent_id,
+                "duration_ms": round(span.duration_ms, 3), "need_id": span.attrs.pop("need_id", None),
+                "supplier_id": span.attrs.pop("supplier_id", None), "meta": span.attrs or None,
+            })
+        return span
+
+    def record(self, name: str, parent: Parent, start: float, end: Optional[float] = None,
+               **attrs: Any) -> Span:
+        """A span whose start is already in the past (e.g. time spent queued)."""
+        return self.finish(self.start(name, parent, start=start, **attrs), end)
+
+    @contextmanager
+    def span(self, name: str, parent: Parent = None, trace_id: Optional[str] = None,
+             **attrs: Any) -> Iterator[Span]:
+        s = self.start(name, parent, trace_id, **attrs)
+        try:
+            yield s
+        except BaseException as e:
+            s.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self.finish(s)
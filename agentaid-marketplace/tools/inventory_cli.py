@@ -1,11 +1,47 @@
-import os, json, sqlite3, argparse
+import os, json, sqlite3, argparse, time
 from services.inventory_db import (
     connect,
     ensure_supplier,
     upsert_item,
+    bulk_upsert_items,
     get_inventory,
     get_supplier_config,
 )
+from services.migrations import SCHEMA_VERSION, current_version
+from tools.inventory_io import FORMATS, detect_format, read_rows, write_rows
+
+def import_rows(conn, rows, mode="add", chunk=50_000):
+    """Load row dicts in chunked transactions; returns (written, skipped_unknown_supplier)."""
+    suppliers = {name: sid for sid, name in conn.execute("SELECT id, name FROM suppliers")}
+    written = skipped = 0
+    batch = []
+    for rec in rows:
+        sid = suppliers.get(rec["supplier"])
+        if sid is None or not rec["name"]:
+            skipped += 1
+            continue
+        batch.append((sid, rec["name"], rec["qty"], rec["unit"], rec["unit_price"], rec["category"]))
+        if len(batch) >= chunk:
+            written += bulk_upsert_items(conn, batch, mode)
+            batch = []
+    if batch:
+        written += bulk_upsert_items(conn, batch, mode)
+    return written, skipped
+
+def export_rows(conn, supplier=None, chunk=50_000):
+    sql = ("SELECT s.name AS supplier, i.name, i.qty, i.unit, i.unit_price, i.category "
+           "FROM items i JOIN suppliers s ON s.id = i.supplier_id")
+    args = ()
+    if supplier:
+        sql += " WHERE s.name = ?"
+        args = (supplier,)
+    cur = conn.execute(sql + " ORDER BY i.supplier_id, i.name", args)  # walks UNIQUE(supplier_id, name)
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            break
+        for r in rows:
+            yield dict(r)
 
 def main():
     p = argparse.ArgumentParser()
@@ -24,6 +60,19 @@ def main():
     stock = sub.add_parser("stock")
     stock.add_argument("--name", required=True)
     stock.add_argument("--items", required=True, help='JSON e.g. \'[{"name":"blanket","qty":200,"unit":"ea","unit_price":8}]\'')
+    imp = sub.add_parser("import", help="bulk restock from CSV/JSONL/Parquet (supplier,name,qty,unit,unit_price,category)")
+    imp.add_argument("path", help="input file ('-' for stdin csv/jsonl)")
+    imp.add_argument("--format", choices=FORMATS)
+    imp.add_argument("--mode", choices=["add", "set"], default="add",
+                     help="add: qty is added to stock (restock); set: qty replaces stock (stocktake)")
+    imp.add_argument("--chunk", type=int, default=50_000, help="rows per transaction")
+
+    sub.add_parser("migrate", help="upgrade the DB file to the current schema version in place")
+
+    exp = sub.add_parser("export", help="dump inventory to CSV/JSONL/Parquet")
+    exp.add_argument("path", help="output file ('-' for stdout csv/jsonl)")
+    exp.add_argument("--format", choices=FORMATS)
+    exp.add_argument("--supplier", help="only this supplier")
     args = p.parse_args()
 
     conn = connect(args.db)
@@ -41,6 +90,22 @@ def main():
         for it in items:
             upsert_item(conn, sid, it["name"], int(it.get("qty",0)), it.get("unit"), float(it.get("unit_price",0.0)))
         print("Inventory now:", get_inventory(conn, sid))
+    elif args.cmd == "migrate":
+        # connect() already applied any pending migrations
+        print(f"Schema version: {current_version(conn)} (latest {SCHEMA_VERSION})")
+    elif args.cmd == "import":
+        t0 = time.perf_counter()
+        written, skipped = import_rows(conn, read_rows(args.path, detect_format(args.path, args.format)),
+                                       args.mode, args.chunk)
+        dt = time.perf_counter() - t0
+        print(f"Imported {written} rows in {dt:.2f}s ({written / dt if dt else 0:,.0f} rows/s)"
+              + (f"; skipped {skipped} rows with unknown supplier/name" if skipped else ""))
+    elif args.cmd == "export":
+        t0 = time.perf_counter()
+        n = write_rows(args.path, detect_format(args.path, args.format), export_rows(conn, args.supplier))
+        dt = time.perf_counter() - t0
+        if args.path != "-":
+            print(f"Exported {n} rows in {dt:.2f}s ({n / dt if dt else 0:,.0f} rows/s)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,117 @@
+# tools/inventory_io.py
+"""
+Streaming readers/writers for inventory files (CSV, JSONL, Parquet).
+
+Every format uses one record layout:
+    supplier, name, qty, unit, unit_price, category
+Readers yield plain dicts one row at a time, and writers take an iterable of
+dicts, so files of any size go through in constant memory. Parquet needs
+the optional `pyarrow` package.
+"""
+import csv
+import io
+import json
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+FIELDS = ["supplier", "name", "qty", "unit", "unit_price", "category"]
+FORMATS = ("csv", "jsonl", "parquet")
+PARQUET_BATCH = 65_536
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt
+    lower = path.lower()
+    if lower.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if lower.endswith((".parquet", ".pq")):
+        return "parquet"
+    if lower.endswith(".csv") or path == "-":
+        return "csv"
+    raise SystemExit(f"Cannot infer format of {path!r}; pass --format {{{','.join(FORMATS)}}}")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise SystemExit("Parquet support needs pyarrow (pip install pyarrow)")
+
+
+def _open_text(path: str, mode: str):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer if mode == "r" else sys.stdout.buffer,
+                                encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _clean(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize types / empties coming from loosely-typed files."""
+    def opt(v):
+        return None if v is None or v == "" else v
+    price = opt(rec.get("unit_price"))
+    return {
+        "supplier": rec.get("supplier"),
+        "name": rec.get("name"),
+        "qty": int(float(rec.get("qty") or 0)),
+        "unit": opt(rec.get("unit")),
+        "unit_price": None if price is None else float(price),
+        "category": opt(rec.get("category")),
+    }
+
+
+def read_rows(path: str, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "csv":
+        with _open_text(path, "r") as f:
+            for rec in csv.DictReader(f):
+                yield _clean(rec)
+    elif fmt == "jsonl":
+        with _open_text(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield _clean(json.loads(line))
+    elif fmt == "parquet":
+        pa = _pyarrow()
+        pf = pa.parquet.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=PARQUET_BATCH):
+            for rec in batch.to_pylist():
+                yield _clean(rec)
+    else:
+        raise SystemExit(f"Unknown format {fmt!r}")
+
+
+def write_rows(path: str, fmt: str, rows: Iterable[Dict[str, Any]]) -> int:
+    n = 0
+    if fmt == "csv":
+        with _open_text(path, "w") as f:
+            w = csv.DictWriter(f, fieldnames=FIELDS)
+            w.writeheader()
+            for rec in rows:
+                w.writerow(rec)
+                n += 1
+    elif fmt == "jsonl":
+        with _open_text(path, "w") as f:
+            for rec in rows:
+                f.write(json.dumps(rec) + "\n")
+                n += 1
+    elif fmt == "parquet":
+        pa = _pyarrow()
+        schema = pa.schema([("supplier", pa.string()), ("name", pa.string()), ("qty", pa.int64()),
+                            ("unit", pa.string()), ("unit_price", pa.float64()), ("category", pa.string())])
+        with pa.parquet.ParquetWriter(path, schema) as w:
+            batch: List[Dict[str, Any]] = []
+            for rec in rows:
+                batch.append(rec)
+                if len(batch) >= PARQUET_BATCH:
+                    w.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    n += len(batch)
+                    batch = []
+            if batch:
+                w.write_table(pa.Table.from_pylist(batch, schema=schema))
+                n += len(batch)
+    else:
+        raise SystemExit(f"Unknown format {fmt!r}")
+    return n
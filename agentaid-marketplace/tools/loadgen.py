@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Synthetic load generator for the AidProtocol quote/accept loop.
+
+Runs K need agents and M supply agents in one process on an in-memory bus.
+They exchange the real wire models (QuoteRequest -> QuoteResponse -> Accept
+-> AllocationNotice), and every hop is serialized and parsed the same way
+uAgents does. Needs arrive as a Poisson process at --rate/s. Each need runs
+the need agent's flow (broadcast, gather window, greedy allocation by score,
+accept), and is timed until its last AllocationNotice arrives.
+
+    python tools/loadgen.py --needers 4 --suppliers 8 --rate 50 --duration 10
+    python tools/loadgen.py --sweep 25,50,100,200,400 --slo-ms 500 --json
+    python tools/loadgen.py --db db/agent_aid.db ...   # suppliers quote from a copy of a real inventory DB
+
+Reports time-to-allocation percentiles, messages and bytes per need, and
+achieved throughput. --sweep reports the highest rate that still meets the SLO.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.aid_protocol import Accept, AllocationNotice, Geo, Item, QuoteRequest, QuoteResponse
+
+CENTER = (37.8715, -122.2730)   # Berkeley, same default as need_agent
+PRIORITIES = ["critical", "high", "medium", "low"]
+
+
+# ---------- bus ----------
+class Bus:
+    """Point-to-point delivery with per-hop latency; counts messages/bytes per need."""
+
+    def __init__(self, latency_ms: float, jitter_ms: float, rnd: random.Random):
+        self.latency_s = latency_ms / 1000.0
+        self.jitter_s = jitter_ms / 1000.0
+        self.rnd = rnd
+        self.inboxes: Dict[str, asyncio.Queue] = {}
+        self.msgs_by_type: Counter = Counter()
+        self.msgs_by_need: Counter = Counter()
+        self.bytes_by_need: Counter = Counter()
+
+    def register(self, address: str) -> asyncio.Queue:
+        q = self.inboxes[address] = asyncio.Queue()
+        return q
+
+    def send(self, sender: str, dest: str, msg) -> None:
+        raw = msg.json()
+        self.msgs_by_type[type(msg).__name__] += 1
+        self.msgs_by_need[msg.need_id] += 1
+        self.bytes_by_need[msg.need_id] += len(raw)
+        delay = max(0.0, self.latency_s + self.rnd.uniform(-self.jitter_s, self.jitter_s))
+        env = (sender, type(msg), raw)
+        asyncio.get_running_loop().call_later(delay, self.inboxes[dest].put_nowait, env)
+
+
+async def _serve(inbox: asyncio.Queue, handle) -> None:
+    # one message at a time, like a uAgents handler loop
+    while True:
+        sender, model, raw = await inbox.get()
+        await handle(sender, model.parse_raw(raw))
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+# ---------- supply side ----------
+class MemoryStock:
+    """Per-supplier stock dict with the same offer/deduct semantics as services.inventory_db."""
+
+    def __init__(self, stock: Dict[str, Tuple[int, float]]):
+        self.stock = {k: [q, p] for k, (q, p) in stock.items()}
+
+    def offer(self, requested: List[Tuple[str, int]]) -> Tuple[List[dict], float]:
+        offered, ratios = [], []
+        for name, want in requested:
+            qty, price = self.stock.get(name, (0, 0.0))
+            give = min(want, qty)
+            if want > 0:
+                ratios.append(min(give / float(want), 1.0))
+            offered.append({"name": name, "qty": give, "unit": "ea", "unit_price": price})
+        return offered, (sum(ratios) / len(ratios) if ratios else 0.0)
+
+    def deduct(self, items: List[Tuple[str, int]]) -> None:
+        for name, qty in items:
+            if name in self.stock:
+                self.stock[name][0] = max(0, self.stock[name][0] - qty)
+
+
+class DbStock:
+    """Stock backed by services.inventory_db on a (copied) SQLite file."""
+
+    def __init__(self, conn, supplier_id: int):
+        self.conn = conn
+        self.supplier_id = supplier_id
+
+    def offer(self, requested: List[Tuple[str, int]]) -> Tuple[List[dict], float]:
+        from services.inventory_db import offer_for_request
+        return offer_for_request(self.conn, self.supplier_id, [{"name": n, "qty": q} for n, q in requested])
+
+    def deduct(self, items: List[Tuple[str, int]]) -> None:
+        from services.inventory_db import deduct_allocation
+        deduct_allocation(self.conn, self.supplier_id, [{"name": n, "qty": q} for n, q in items])
+
+
+@dataclass
+class StubSupplier:
+    address: str
+    lat: float
+    lon: float
+    radius_km: float
+    base_lead_h: float
+    stock: object
+    service_ms: float = 0.0
+
+    async def handle(self, bus: Bus, sender: str, msg) -> None:
+        if self.service_ms:
+            await asyncio.sleep(self.service_ms / 1000.0)
+        if isinstance(msg, QuoteRequest):
+            bus.send(self.address, sender, self.quote(msg))
+        elif isinstance(msg, Accept):
+            items = [(it.name, int(it.qty or 0)) for it in msg.items]
+            self.stock.deduct(items)
+            bus.send(self.address, sender, AllocationNotice(
+                need_id=msg.need_id, supplier_id=self.address,
+                items=[Item(name=n, qty=q) for n, q in items], note="allocation confirmed"))
+
+    def quote(self, req: QuoteRequest) -> QuoteResponse:
+        # mirrors supply_agent.build_quote
+        base = dict(need_id=req.need_id, supplier_id=self.address)
+        d_km = _haversine_km(req.location.lat, req.location.lon, self.lat, self.lon)
+        if d_km > self.radius_km:
+            return QuoteResponse(ok=False, reason=f"out_of_radius_{int(d_km)}km", **base)
+        offered, cov = self.stock.offer([(it.name, int(it.qty)) for it in req.items])
+        if cov <= 0.0:
+            return QuoteResponse(ok=False, reason="no_coverage", **base)
+        eta = round(self.base_lead_h + d_km / 40.0, 2)
+        if eta > req.max_eta_hours:
+            return QuoteResponse(ok=False, reason=f"eta_exceeds_sla_{eta}h", **base)
+        mod = {"critical": 0.90, "high": 0.95, "medium": 1.00, "low": 1.05}.get(req.priority, 1.0)
+        total = round(sum(o["unit_price"] * o["qty"] for o in offered) * mod, 2)
+        return QuoteResponse(ok=True, coverage_ratio=round(cov, 3), eta_hours=eta, total_cost=total,
+                             items=[Item(**o) for o in offered], **base)
+
+
+# ---------- need side ----------
+@dataclass
+class NeedRun:
+    need_id: str
+    items: List[Item]
+    t0: float
+    quotes: List[QuoteResponse] = field(default_factory=list)
+    responses: int = 0
+    pending_notices: set = field(default_factory=set)
+    gather: Optional[asyncio.Task] = None
+    done: bool = False
+
+
+def _score(resp: QuoteResponse) -> float:
+    # need_agent.score_with_intel without the intel risk term
+    price_score = max(0.0, min(1.0, 2000.0 / max(float(resp.total_cost or 1.0), 1.0)))
+    return 0.6 * float(resp.coverage_ratio or 0.0) + 0.4 * price_score
+
+
+class StubNeeder:
+    def __init__(self, address: str, bus: Bus, suppliers: List[str], stats: "Stats",
+                 gather_s: float, max_wait_s: float, timeout_s: float):
+        self.address = address
+        self.bus = bus
+        self.suppliers = suppliers
+        self.stats = stats
+        self.gather_s = gather_s
+        self.max_wait_s = max_wait_s
+        self.timeout_s = timeout_s
+        self.needs: Dict[str, NeedRun] = {}
+
+    def submit(self, need_id: str, loc: Geo, items: List[Item], priority: str) -> None:
+        run = self.needs[need_id] = NeedRun(need_id, items, time.perf_counter())
+        req = QuoteRequest(need_id=need_id, location=loc, items=items, priority=priority, max_eta_hours=6.0)
+        for addr in self.suppliers:
+            self.bus.send(self.address, addr, req)
+        run.gather = asyncio.get_running_loop().create_task(self._deadline(run))
+
+    async def _deadline(self, run: NeedRun) -> None:
+        await asyncio.sleep(self.timeout_s)
+        self._finish(run, "timeout")
+
+    async def _gather(self, run: NeedRun) -> None:
+        await asyncio.sleep(min(self.gather_s, self.max_wait_s))
+        self._allocate(run)
+
+    async def handle(self, sender: str, msg) -> None:
+        run = self.needs.get(msg.need_id)
+        if run is None or run.done:
+            return
+        if isinstance(msg, QuoteResponse):
+            run.responses += 1
+            if msg.ok:
+                run.quotes.append(msg)
+                if len(run.quotes) == 1:
+                    run.gather.cancel()
+                    run.gather = asyncio.get_running_loop().create_task(self._gather(run))
+            # every supplier answered: no reason to sit out the window
+            if run.responses == len(self.suppliers) and not run.pending_notices:
+                if run.quotes:
+                    run.gather.cancel()
+                    self._allocate(run)
+                else:
+                    self._finish(run, "no_quotes")
+        elif isinstance(msg, AllocationNotice):
+            run.pending_notices.discard(sender)
+            if not run.pending_notices:
+                self._finish(run, "allocated")
+
+    def _allocate(self, run: NeedRun) -> None:
+        if run.done or run.pending_notices:
+            return
+        remaining = Counter()
+        for it in run.items:
+            remaining[it.name] += it.qty
+        per_supplier: Dict[str, Counter] = defaultdict(Counter)
+        for q in sorted(run.quotes, key=_score, reverse=True):
+            for it in q.items or []:
+                take = min(int(it.qty), remaining[it.name])
+                if take > 0:
+                    per_supplier[q.supplier_id][it.name] += take  # stub supplier_id == bus address
+                    remaining[it.name] -= take
+            if not +remaining:
+                break
+        if not per_supplier:
+            self._finish(run, "no_quotes")
+            return
+        run.pending_notices = set(per_supplier)
+        self.stats.unfilled_units += sum((+remaining).values())
+        for addr, lines in per_supplier.items():
+            self.bus.send(self.address, addr, Accept(
+                need_id=run.need_id, supplier_id=addr, accept=True,
+                items=[Item(name=n, qty=q) for n, q in lines.items()]))
+        run.gather = asyncio.get_running_loop().create_task(self._deadline(run))
+
+    def _finish(self, run: NeedRun, outcome: str) -> None:
+        if run.done:
+            return
+        run.done = True
+        if run.gather is not None and run.gather is not asyncio.current_task():
+            run.gather.cancel()
+        self.stats.outcomes[outcome] += 1
+        if outcome == "allocated":
+            self.stats.latencies_ms.append((time.perf_counter() - run.t0) * 1000.0)
+            self.stats.last_done = time.perf_counter()
+        del self.needs[run.need_id]
+
+
+# ---------- driver ----------
+@dataclass
+class Stats:
+    latencies_ms: List[float] = field(default_factory=list)
+    outcomes: Counter = field(default_factory=Counter)
+    unfilled_units: int = 0
+    last_done: float = 0.0
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """'blanket:5,water bottle:3' -> [(name, weight), ...]"""
+    out = []
+    for part in spec.split(","):
+        name, _, w = part.partition(":")
+        if name.strip():
+            out.append((name.strip(), float(w or 1.0)))
+    return out
+
+
+def pct(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    s = sorted(values)
+    return round(s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))], 2)
+
+
+def build_suppliers(args, rnd: random.Random, mix: List[Tuple[str, float]]) -> Tuple[List[StubSupplier], object]:
+    if args.db:
+        from services.inventory_db import connect
+        tmp = Path(tempfile.mkdtemp(prefix="loadgen_")) / "inventory.db"
+        shutil.copy(args.db, tmp)
+        conn = connect(str(tmp))
+        rows = conn.execute("SELECT id, name, lat, lon, radius_km, base_lead_h FROM suppliers ORDER BY id").fetchall()
+        if args.suppliers:
+            rows = rows[:args.suppliers]
+        sups = [StubSupplier(f"sup_{r['name']}", r["lat"], r["lon"], r["radius_km"], r["base_lead_h"],
+                             DbStock(conn, r["id"]), args.service_ms) for r in rows]
+        return sups, conn
+    sups = []
+    for i in range(args.suppliers):
+        stock = {name: (args.stock, round(rnd.uniform(2, 20), 2)) for name, _ in mix if rnd.random() < args.carry}
+        sups.append(StubSupplier(
+            f"sup_{i:03d}", CENTER[0] + rnd.uniform(-0.3, 0.3), CENTER[1] + rnd.uniform(-0.3, 0.3),
+            args.radius_km, rnd.uniform(0.5, 2.0), MemoryStock(stock), args.service_ms))
+    return sups, None
+
+
+async def run_once(args, rate: float) -> dict:
+    rnd = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    names, weights = [n for n, _ in mix], [w for _, w in mix]
+    bus = Bus(args.latency_ms, args.jitter_ms, rnd)
+    stats = Stats()
+
+    suppliers, conn = build_suppliers(args, rnd, mix)
+    if not suppliers:
+        raise SystemExit("No suppliers to quote from (empty --db or --suppliers 0).")
+    addrs = [s.address for s in suppliers]
+    needers = [StubNeeder(f"need_{i:03d}", bus, addrs, stats, args.gather_ms / 1000.0,
+                          args.max_wait_ms / 1000.0, args.timeout_s) for i in range(args.needers)]
+
+    tasks = []
+    for s in suppliers:
+        tasks.append(asyncio.create_task(_serve(bus.register(s.address),
+                                                lambda snd, m, s=s: s.handle(bus, snd, m))))
+    for n in needers:
+        tasks.append(asyncio.create_task(_serve(bus.register(n.address), n.handle)))
+
+    submitted = 0
+    t_start = time.perf_counter()
+    t_next = t_start
+    while t_next - t_start < args.duration:
+        t_next += rnd.expovariate(rate)
+        await asyncio.sleep(max(0.0, t_next - time.perf_counter()))
+        lines = {}
+        for _ in range(rnd.randint(1, args.max_lines)):
+            name = rnd.choices(names, weights)[0]
+            lines[name] = lines.get(name, 0) + rnd.randint(1, args.max_qty)
+        loc = Geo(lat=CENTER[0] + rnd.uniform(-0.2, 0.2), lon=CENTER[1] + rnd.uniform(-0.2, 0.2))
+        needers[submitted % len(needers)].submit(
+            f"lg_{submitted:07d}", loc, [Item(name=n, qty=q, unit="ea") for n, q in lines.items()],
+            rnd.choice(PRIORITIES))
+        submitted += 1
+    offered_s = time.perf_counter() - t_start
+
+    # drain: wait for in-flight needs (bounded by the per-need timeout)
+    drain_deadline = time.perf_counter() + args.timeout_s * 2 + 1
+    while any(n.needs for n in needers) and time.perf_counter() < drain_deadline:
+        await asyncio.sleep(0.01)
+    for t in tasks:
+        t.cancel()
+    if conn is not None:
+        conn.close()
+
+    done = stats.outcomes["allocated"]
+    busy_s = max((stats.last_done or t_start) - t_start, offered_s)
+    return {
+        "rate": rate,
+        "needers": len(needers),
+        "suppliers": len(suppliers),
+        "submitted": submitted,
+        "allocated": done,
+        "outcomes": dict(stats.outcomes),
+        "completion": round(done / submitted, 4) if submitted else 0.0,
+        "throughput_per_s": round(done / busy_s, 2) if busy_s else 0.0,
+        "p50_ms": pct(stats.latencies_ms, 50),
+        "p95_ms": pct(stats.latencies_ms, 95),
+        "p99_ms": pct(stats.latencies_ms, 99),
+        "msgs_per_need": round(sum(bus.msgs_by_need.values()) / submitted, 2) if submitted else 0.0,
+        "bytes_per_need": round(sum(bus.bytes_by_need.values()) / submitted, 1) if submitted else 0.0,
+        "msgs_by_type": dict(bus.msgs_by_type),
+        "unfilled_units": stats.unfilled_units,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--needers", type=int, default=4, help="K in-process need agents")
+    p.add_argument("--suppliers", type=int, default=8, help="M supply agents (with --db: first M suppliers, 0 = all)")
+    p.add_argument("--rate", type=float, default=20.0, help="need arrivals per second (Poisson)")
+    p.add_argument("--sweep", default=None, help="comma-separated rates; reports the highest rate meeting the SLO")
+    p.add_argument("--duration", type=float, default=10.0, help="seconds of arrivals per run")
+    p.add_argument("--mix", default="blanket:5,water bottle:4,food ration:3,medical supply:2,diaper:1,baby food:1",
+                   help="item:weight,...")
+    p.add_argument("--max-lines", type=int, default=3)
+    p.add_argument("--max-qty", type=int, default=50)
+    p.add_argument("--stock", type=int, default=1_000_000, help="stub stock per item per supplier")
+    p.add_argument("--carry", type=float, default=0.7, help="probability a stub supplier stocks an item")
+    p.add_argument("--radius-km", type=float, default=120.0)
+    p.add_argument("--latency-ms", type=float, default=5.0, help="one-way bus latency")
+    p.add_argument("--jitter-ms", type=float, default=2.0)
+    p.add_argument("--service-ms", type=float, default=0.0, help="extra per-message supplier handling time")
+    p.add_argument("--gather-ms", type=float, default=200.0, help="quote window after the first valid quote")
+    p.add_argument("--max-wait-ms", type=float, default=600.0)
+    p.add_argument("--timeout-s", type=float, default=5.0)
+    p.add_argument("--slo-ms", type=float, default=1000.0, help="p95 time-to-allocation target for --sweep")
+    p.add_argument("--db", default=None, help="quote from a temp copy of this inventory DB instead of stub stock")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json", action="store_true", help="emit machine-readable results")
+    args = p.parse_args()
+
+    rates = [float(r) for r in args.sweep.split(",")] if args.sweep else [args.rate]
+    runs = [asyncio.run(run_once(args, r)) for r in rates]
+
+    # a rate is sustainable if nearly every need allocates within the SLO and we keep up with arrivals
+    ok = [r for r in runs if r["completion"] >= 0.99 and r["p95_ms"] is not None
+          and r["p95_ms"] <= args.slo_ms and r["throughput_per_s"] >= 0.9 * r["rate"]]
+    result = {"runs": runs}
+    if args.sweep:
+        result["ceiling_rate"] = max((r["rate"] for r in ok), default=None)
+        result["ceiling_throughput_per_s"] = max((r["throughput_per_s"] for r in ok), default=None)
+
+    if args.json:
+        print(json.dumps(result))
+        return
+    for r in runs:
+        print(f"--- rate {r['rate']}/s  ({r['needers']} needers x {r['suppliers']} suppliers)")
+        for k, v in r.items():
+            if k not in ("rate", "needers", "suppliers"):
+                print(f"{k:>18}: {v}")
+    if args.sweep:
+        print(f"ceiling @ p95<={args.slo_ms}ms: rate={result['ceiling_rate']} "
+              f"throughput={result['ceiling_throughput_per_s']}/s")
+
+
+if __name__ == "__main__":
+    main()
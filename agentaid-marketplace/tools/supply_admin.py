@@ -1,48 +1,132 @@
 # tools/supply_admin.py
-import os, asyncio
-from typing import List
+"""
+Restock / adjust a supply agent over AidProtocol.
+
+One admin agent stays up for the whole run. Messages are pipelined (up to
+--window in flight), each carries a request_id, and the run finishes as soon
+as every ack (InventoryStatus or ErrorMessage) is back, or after --timeout.
+
+    python tools/supply_admin.py --addr agent1q... --secret s3cret --mode restock \\
+        --items '[{"name":"blanket","qty":50}]'
+    python tools/supply_admin.py --addr agent1q... --secret s3cret --mode restock --file stock.csv --chunk 200
+"""
+import os, asyncio, socket, sys, time, uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 from uagents import Agent, Context
 from agents.aid_protocol import AidProtocol, Restock, AdjustInventory, Item, InventoryStatus, ErrorMessage
 
 ADMIN_SEED = os.getenv("ADMIN_SEED", "supply_admin_sender_seed")
+ADMIN_PORT = int(os.getenv("ADMIN_PORT", "8099"))
+
+
+class AdminError(Exception):
+    pass
+
+
+class AdminClient:
+    """Long-lived admin agent; send() resolves when the supplier acks that request_id."""
+
+    def __init__(self, seed: str = ADMIN_SEED, port: int = ADMIN_PORT):
+        self.port = port
+        self.agent = Agent(name="supply_admin", seed=seed, port=port,
+                           endpoint=[f"http://127.0.0.1:{port}/submit"], loop=asyncio.get_running_loop())
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._ctx: Optional[Context] = None
+
+        @AidProtocol.on_message(model=InventoryStatus)
+        async def on_status(ctx: Context, sender: str, msg: InventoryStatus):
+            self._resolve(msg.request_id, msg)
+
+        @AidProtocol.on_message(model=ErrorMessage)
+        async def on_err(ctx: Context, sender: str, msg: ErrorMessage):
+            self._resolve(msg.request_id, AdminError(msg.message))
+
+        self.agent.include(AidProtocol)
+
+    def _resolve(self, request_id: Optional[str], result) -> None:
+        fut = self._pending.pop(request_id, None) if request_id else None
+        if fut is None or fut.done():
+            return
+        if isinstance(result, Exception):
+            fut.set_exception(result)
+        else:
+            fut.set_result(result)
+
+    async def start(self, ready_s: float = 10.0) -> None:
+        # setup() + server rather than run_async(), which tears down every task in the loop
+        self.agent.setup()
+        self._ctx = self.agent._build_context()
+        self._task = asyncio.create_task(self.agent.start_server())
+        deadline = time.monotonic() + ready_s
+        while time.monotonic() < deadline:    # replies need our endpoint listening
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.2).close()
+                return
+            except OSError:
+                await asyncio.sleep(0.05)
+        raise AdminError(f"admin agent did not start listening on :{self.port}")
+
+    async def send(self, target_addr: str, msg, timeout: float = 30.0) -> InventoryStatus:
+        msg.request_id = msg.request_id or str(uuid.uuid4())
+        fut = self._pending[msg.request_id] = asyncio.get_running_loop().create_future()
+        await self._ctx.send(target_addr, msg)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self._pending.pop(msg.request_id, None)
+
+    async def pipeline(self, target_addr: str, msgs: list, window: int = 8, timeout: float = 30.0) -> list:
+        """Send all msgs with at most `window` unacked; returns InventoryStatus or exception per msg."""
+        sem = asyncio.Semaphore(max(window, 1))
+
+        async def one(m):
+            async with sem:
+                return await self.send(target_addr, m, timeout)
+
+        return await asyncio.gather(*(one(m) for m in msgs), return_exceptions=True)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+def _chunks(items: List[Item], size: int) -> List[List[Item]]:
+    return [items[i:i + size] for i in range(0, len(items), max(size, 1))]
+
+
+async def run(addr: str, secret: str, mode: str, items: List[Item], chunk: int, window: int,
+              timeout: float) -> int:
+    model = Restock if mode == "restock" else AdjustInventory
+    msgs = [model(secret=secret, items=c) for c in _chunks(items, chunk)]
+    client = AdminClient()
+    await client.start()
+    t0 = time.perf_counter()
+    try:
+        results = await client.pipeline(addr, msgs, window=window, timeout=timeout)
+    finally:
+        await client.close()
+    elapsed = time.perf_counter() - t0
+
+    failed = 0
+    for m, r in zip(msgs, results):
+        if isinstance(r, InventoryStatus):
+            print(f"OK   {m.request_id}: {r.note} " + ", ".join(f"{i.name}:{i.qty}" for i in r.inventory[:8])
+                  + (" ..." if len(r.inventory) > 8 else ""))
+        else:
+            failed += 1
+            reason = "timeout" if isinstance(r, asyncio.TimeoutError) else r
+            print(f"FAIL {m.request_id}: {reason}")
+    print(f"{len(msgs) - failed}/{len(msgs)} {mode} messages acked ({len(items)} items) in {elapsed:.2f}s")
+    return 1 if failed else 0
 
-async def send_restock(target_addr: str, secret: str, items: List[Item]):
-    agent = Agent(name="supply_admin", seed=ADMIN_SEED, endpoint=[])
-    @AidProtocol.on_message(model=InventoryStatus)
-    async def on_status(ctx: Context, sender: str, msg: InventoryStatus):
-        ctx.logger.info(f"Restock OK from {sender}: {[(i.name, i.qty) for i in msg.inventory]}")
-        raise SystemExit(0)
-    @AidProtocol.on_message(model=ErrorMessage)
-    async def on_err(ctx: Context, sender: str, msg: ErrorMessage):
-        ctx.logger.error(f"Error from {sender}: {msg.message}")
-        raise SystemExit(1)
-    agent.include(AidProtocol)
-
-    async def run():
-        await agent._ctx.send(target_addr, Restock(secret=secret, items=items))
-        await asyncio.sleep(5)  # wait for reply
-
-    asyncio.create_task(run())
-    agent.run()
-
-async def send_adjust(target_addr: str, secret: str, items: List[Item]):
-    agent = Agent(name="supply_admin", seed=ADMIN_SEED, endpoint=[])
-    @AidProtocol.on_message(model=InventoryStatus)
-    async def on_status(ctx: Context, sender: str, msg: InventoryStatus):
-        ctx.logger.info(f"Adjust OK from {sender}: {[(i.name, i.qty) for i in msg.inventory]}")
-        raise SystemExit(0)
-    @AidProtocol.on_message(model=ErrorMessage)
-    async def on_err(ctx: Context, sender: str, msg: ErrorMessage):
-        ctx.logger.error(f"Error from {sender}: {msg.message}")
-        raise SystemExit(1)
-    agent.include(AidProtocol)
-
-    async def run():
-        await agent._ctx.send(target_addr, AdjustInventory(secret=secret, items=items))
-        await asyncio.sleep(5)
-
-    asyncio.create_task(run())
-    agent.run()
 
 if __name__ == "__main__":
     import argparse, json
@@ -50,11 +134,19 @@ if __name__ == "__main__":
     p.add_argument("--addr", required=True, help="Supplier agent address")
     p.add_argument("--secret", required=True)
     p.add_argument("--mode", choices=["restock","adjust"], required=True)
-    p.add_argument("--items", required=True, help='JSON, e.g. \'[{"name":"blanket","qty":50}]\'')
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--items", help='JSON, e.g. \'[{"name":"blanket","qty":50}]\'')
+    src.add_argument("--file", help="CSV/JSONL/Parquet in the inventory_cli layout (supplier column ignored)")
+    p.add_argument("--format", default=None, help="file format when it can't be inferred from the name")
+    p.add_argument("--chunk", type=int, default=200, help="items per message")
+    p.add_argument("--window", type=int, default=8, help="messages in flight before waiting for acks")
+    p.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for each ack")
     args = p.parse_args()
 
-    items = [Item(**x) for x in json.loads(args.items)]
-    if args.mode == "restock":
-        asyncio.run(send_restock(args.addr, args.secret, items))
+    if args.items:
+        items = [Item(**x) for x in json.loads(args.items)]
     else:
-        asyncio.run(send_adjust(args.addr, args.secret, items))
+        from tools.inventory_io import detect_format, read_rows
+        items = [Item(name=r["name"], qty=r["qty"], unit=r["unit"], unit_price=r["unit_price"])
+                 for r in read_rows(args.file, detect_format(args.file, args.format))]
+    sys.exit(asyncio.run(run(args.addr, args.secret, args.mode, items, args.chunk, args.window, args.timeout)))
@@ -1,10 +1,18 @@
 # brightdata_collector/collector.py
-import os, asyncio, time, httpx
+import os, sys, asyncio, time, httpx
+from pathlib import Path
 from datetime import datetime, timezone
 from typing import List, Dict, Any
 from elasticsearch import Elasticsearch
 from elastic_transport import ApiError
 
+# shared loop-lag / blocking-call detector (agentaid-marketplace/services/loopmon.py); optional
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "agentaid-marketplace"))
+try:
+    from services.loopmon import format_block, start_loop_monitor
+except Exception:
+    start_loop_monitor = None
+
 BRIGHT_DATA_API_KEY = os.getenv("0d618589c8138c69f02216c3faf09ff1a30a73403e474973bfa5c234598c2505")
 ES_URL = os.getenv("ES_URL", "https://my-elasticsearch-project-b5bb84.es.us-west-2.aws.elastic.cloud/")
 ES_API_KEY = os.getenv("bEtYb0hKb0Jmb09sVUNqMnRMcXc6SXJTRi05emJxQXBheGhQTEE5YTFidw==")
@@ -104,6 +112,9 @@ async def es_bulk(es: Elasticsearch, index: str, docs: List[Dict[str, Any]]):
 
 async def main():
     es = es_client()
+    # es.bulk is synchronous; blocks show up here with their stack
+    loop = start_loop_monitor("collector", on_block=lambda b: print(f"[collector] {format_block(b)}")) \
+        if start_loop_monitor is not None else None
     async with httpx.AsyncClient() as client:
         while True:
             weather = await fetch_with_bd_key(client, WEATHER_URL)
@@ -117,6 +128,10 @@ async def main():
 
             await es_bulk(es, INTEL_INDEX, docs)
             print(f"[collector] indexed {len(docs)} events at {time.strftime('%H:%M:%S')}")
+            if loop is not None:
+                s = loop.stats()
+                print(f"[collector] loop lag p95={s['lag_p95_ms']}ms max={s['lag_max_ms']}ms "
+                      f"blocks={s['blocks']} ({s['blocked_ms']}ms)")
             await asyncio.sleep(POLL_INTERVAL_S)
 
 if __name__ == "__main__":
@@ -4,32 +4,57 @@ Fixed AgentAid startup script that handles port conflicts and agent communicatio
 """
 
 import os
+import re
 import sys
 import time
+import socket
 import subprocess
 import signal
+import threading
+import urllib.request
 from pathlib import Path
 
+# uAgents log "[<name>] Address: agent1..." once the agent is up
+AGENT_ADDRESS_RE = re.compile(r"Address: (agent1[0-9a-z]+)")
+
 class FixedAgentAidOrchestrator:
-    def __init__(self):
+    """
+    Dependency-graph launcher: every service starts as soon as the services it
+    `depends_on` are ready, and "ready" is a real probe (HTTP health URL or the
+    agent printing its address) rather than a fixed sleep.
+    """
+
+    def __init__(self, ready_timeout=60.0):
         self.processes = []
         self.base_dir = Path(__file__).parent
-        
-        # First, set up the dummy suppliers
-        self.setup_dummy_suppliers()
+        self.ready_timeout = ready_timeout
+        self.t0 = time.monotonic()
+
+        # per-service readiness bookkeeping
+        self.ready = {}          # name -> threading.Event
+        self.failed = {}         # name -> bool
+        self.addresses = {}      # name -> agent address (from the log probe)
+        self.time_to_ready = {}  # name -> (seconds since launch, seconds since orchestrator start)
+        self.lock = threading.Lock()
         
         self.services = {
+            # Seeding the DB is just another node in the graph now, not a blocking constructor step
+            'dummy_suppliers': {
+                'path': self.base_dir,
+                'command': [sys.executable, str(self.base_dir / 'agentaid-marketplace' / 'db' / 'setup_dummy_suppliers.py')],
+                'oneshot': True
+            },
             'claude_service': {
                 'path': self.base_dir / 'agentaid-claude-service',
                 'command': ['node', 'server.js'],
                 'port': 3000,
-                'health_url': 'http://localhost:3000/health',
-                'startup_time': 5
+                'health_url': 'http://localhost:3000/health'
             },
             'supply_agent_emergency': {
                 'path': self.base_dir / 'agentaid-marketplace',
                 'command': ['python', 'agents/supply_agent.py'],
                 'port': 8001,
+                'depends_on': ['dummy_suppliers'],
                 'env_vars': {
                     'SUPPLIER_NAME': 'emergency_medical_fire',
                     'SUPPLIER_SEED': 'emergency_medical_fire_demo_seed',
@@ -46,6 +71,7 @@ class FixedAgentAidOrchestrator:
                 'path': self.base_dir / 'agentaid-marketplace',
                 'command': ['python', 'agents/supply_agent.py'],
                 'port': 8003,
+                'depends_on': ['dummy_suppliers'],
                 'env_vars': {
                     'SUPPLIER_NAME': 'family_child_emergency',
                     'SUPPLIER_SEED': 'family_child_emergency_demo_seed',
@@ -62,6 +88,9 @@ class FixedAgentAidOrchestrator:
                 'path': self.base_dir / 'agentaid-marketplace',
                 'command': ['python', 'agents/need_agent.py'],
                 'port': 8000,
+                # needs the supply agents' addresses, which their readiness probes capture
+                'depends_on': ['supply_agent_emergency', 'supply_agent_family'],
+                'address_env': {'SUPPLY_ADDRS': ['supply_agent_emergency', 'supply_agent_family']},
                 'env_vars': {
                     'NEEDER_NAME': 'need_agent_berkeley_1',
                     'NEEDER_SEED': 'need_agent_berkeley_1_demo_seed',
@@ -71,7 +100,7 @@ class FixedAgentAidOrchestrator:
                     'NEED_LABEL': 'Berkeley Emergency Center',
                     'NEED_PRIORITY': 'critical',
                     'NEED_ITEMS_JSON': '[{"name":"blanket","qty":200,"unit":"ea"}]',
-                    # Add supply agent addresses (will be updated after they start)
+                    # Filled from address_env once the supply agents are ready
                     'SUPPLY_ADDRS': ''
                 }
             },
@@ -79,6 +108,11 @@ class FixedAgentAidOrchestrator:
                 'path': self.base_dir / 'agentaid-marketplace',
                 'command': ['python', 'agents/coordination_agent.py'],
                 'port': 8002,
+                'depends_on': ['claude_service', 'need_agent', 'supply_agent_emergency', 'supply_agent_family'],
+                'address_env': {
+                    'NEED_AGENT_ADDRS': ['need_agent'],
+                    'SUPPLY_AGENT_ADDRS': ['supply_agent_emergency', 'supply_agent_family']
+                },
                 'env_vars': {
                     'COORDINATOR_NAME': 'coordination_agent_1',
                     'COORDINATOR_SEED': 'coordination_agent_1_demo_seed',
@@ -88,149 +122,163 @@ class FixedAgentAidOrchestrator:
             }
         }
     
-    def setup_dummy_suppliers(self):
-        """Set up dummy suppliers with inventory"""
-        print("🏥 Setting up dummy suppliers...")
-        
-        try:
-            # Run the dummy supplier setup script
-            result = subprocess.run([
-                sys.executable, 
-                str(self.base_dir / 'agentaid-marketplace' / 'db' / 'setup_dummy_suppliers.py')
-            ], capture_output=True, text=True, cwd=self.base_dir)
-            
-            if result.returncode == 0:
-                print("✅ Dummy suppliers setup complete")
-            else:
-                print("❌ Failed to setup dummy suppliers")
-                print(result.stderr)
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error setting up dummy suppliers: {e}")
-            return False
-        
-        return True
-    
     def kill_existing_processes(self):
-        """Kill any existing processes on the ports we need"""
+        """Kill any existing processes on the ports we need (one lsof call for all ports)"""
         print("🧹 Cleaning up existing processes...")
         
-        ports_to_check = [3000, 8000, 8001, 8002, 8003]
+        ports_to_check = sorted({cfg['port'] for cfg in self.services.values() if 'port' in cfg})
+        
+        try:
+            args = ['lsof', '-t']
+            for port in ports_to_check:
+                args += ['-i', f':{port}']
+            result = subprocess.run(args, capture_output=True, text=True)
+            pids = {int(p) for p in result.stdout.split() if p.strip().isdigit()}
+        except FileNotFoundError:
+            pids = set()
         
-        for port in ports_to_check:
+        for pid in pids:
             try:
-                # Find processes using the port
-                result = subprocess.run(
-                    f"lsof -ti :{port}",
-                    shell=True,
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode == 0 and result.stdout.strip():
-                    pids = result.stdout.strip().split('\n')
-                    for pid in pids:
-                        try:
-                            subprocess.run(f"kill -9 {pid}", shell=True)
-                            print(f"   🔪 Killed process {pid} on port {port}")
-                        except:
-                            pass
-            except:
+                os.kill(pid, signal.SIGKILL)
+                print(f"   🔪 Killed process {pid}")
+            except OSError:
                 pass
         
-        time.sleep(2)  # Give processes time to die
+        # wait until the ports are actually free instead of a fixed sleep
+        deadline = time.monotonic() + 5
+        while pids and time.monotonic() < deadline and any(self._port_busy(p) for p in ports_to_check):
+            time.sleep(0.05)
+    
+    @staticmethod
+    def _port_busy(port):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.05)
+            return sock.connect_ex(('127.0.0.1', port)) == 0
+    
+    def _elapsed(self):
+        return time.monotonic() - self.t0
+    
+    def _drain(self, service_name, process, address_found):
+        """Pump the child's output (so its pipe never fills) and watch for the agent address"""
+        for line in process.stdout:
+            if service_name not in self.addresses:
+                match = AGENT_ADDRESS_RE.search(line)
+                if match:
+                    with self.lock:
+                        self.addresses[service_name] = match.group(1)
+                    address_found.set()
+    
+    def _probe_http(self, url):
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                return 200 <= resp.status < 300
+        except Exception:
+            return False
+    
+    def _wait_ready(self, service_name, service_config, process, address_found):
+        """Block until the readiness probe passes, the process dies, or we time out"""
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline:
+            if service_config.get('oneshot'):
+                if process.poll() is not None:
+                    return process.returncode == 0
+            elif process.poll() is not None:
+                return False
+            elif 'health_url' in service_config:
+                if self._probe_http(service_config['health_url']):
+                    return True
+            elif address_found.wait(0):
+                return True
+            time.sleep(0.05)
+        return False
     
     def start_service(self, service_name, service_config):
-        """Start a single service with better error handling"""
-        print(f"\n🚀 Starting {service_name}...")
+        """Start one service once its dependencies are ready, then wait for its own readiness"""
+        for dep in service_config.get('depends_on', []):
+            self.ready[dep].wait()
+            if self.failed.get(dep):
+                print(f"⚠️  {service_name}: dependency {dep} failed, starting anyway")
+        
+        print(f"\n🚀 Starting {service_name}... (t+{self._elapsed():.1f}s)")
         
         # Set up environment variables
         env = os.environ.copy()
-        if 'env_vars' in service_config:
-            env.update(service_config['env_vars'])
-        
-        # Change to service directory
-        os.chdir(service_config['path'])
+        env['PYTHONUNBUFFERED'] = '1'  # the address probe reads the log as it is written
+        env.update(service_config.get('env_vars', {}))
+        for var, sources in service_config.get('address_env', {}).items():
+            addrs = [self.addresses[src] for src in sources if src in self.addresses]
+            if addrs:
+                env[var] = ','.join(addrs)
         
+        launched = time.monotonic()
+        address_found = threading.Event()
         try:
-            # Start the process
             process = subprocess.Popen(
                 service_config['command'],
+                cwd=service_config['path'],
                 env=env,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True
             )
-            
-            # Wait a moment to see if it starts successfully
-            time.sleep(3)
-            
-            if process.poll() is None:
-                print(f"✅ {service_name} started (PID: {process.pid})")
-                
+        except Exception as e:
+            print(f"❌ Failed to start {service_name}: {e}")
+            return False
+        
+        threading.Thread(target=self._drain, args=(service_name, process, address_found), daemon=True).start()
+        
+        ok = self._wait_ready(service_name, service_config, process, address_found)
+        with self.lock:
+            self.time_to_ready[service_name] = (time.monotonic() - launched, self._elapsed())
+            if not service_config.get('oneshot'):
                 self.processes.append({
                     'name': service_name,
                     'process': process,
                     'config': service_config
                 })
-                
-                # Wait for startup if specified
-                if 'startup_time' in service_config:
-                    time.sleep(service_config['startup_time'])
-                
-                return True
-            else:
-                # Process died immediately, get the error
-                stdout, stderr = process.communicate()
-                print(f"❌ {service_name} failed to start")
-                print(f"STDOUT: {stdout}")
-                print(f"STDERR: {stderr}")
-                return False
-            
+        
+        if ok:
+            extra = f" address={self.addresses[service_name]}" if service_name in self.addresses else ""
+            print(f"✅ {service_name} ready in {self.time_to_ready[service_name][0]:.2f}s (PID: {process.pid}){extra}")
+        else:
+            print(f"❌ {service_name} not ready (exit code: {process.poll()})")
+        return ok
+    
+    def _run_node(self, service_name):
+        try:
+            ok = self.start_service(service_name, self.services[service_name])
         except Exception as e:
-            print(f"❌ Failed to start {service_name}: {e}")
-            return False
+            print(f"❌ {service_name} crashed during startup: {e}")
+            ok = False
+        self.failed[service_name] = not ok
+        self.ready[service_name].set()
     
     def start_all_services(self):
-        """Start all services in the correct order"""
+        """Start all services concurrently, each gated on its dependencies' readiness"""
         print("🚨 AgentAid with Fixed Agent Communication")
         print("=" * 50)
         
         # Clean up existing processes
         self.kill_existing_processes()
+        self.t0 = time.monotonic()
+        
+        self.ready = {name: threading.Event() for name in self.services}
+        threads = [threading.Thread(target=self._run_node, args=(name,), daemon=True) for name in self.services]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
         
-        # Start Claude service first
-        if not self.start_service('claude_service', self.services['claude_service']):
+        if self.failed.get('claude_service'):
             print("❌ Failed to start Claude service. Exiting.")
             return False
         
-        # Start supply agents first
-        supply_agents = ['supply_agent_emergency', 'supply_agent_family']
-        supply_addresses = []
-        
-        for agent_name in supply_agents:
-            if self.start_service(agent_name, self.services[agent_name]):
-                print(f"✅ {agent_name} started")
-                # In a real implementation, we'd get the actual agent address
-                # For now, we'll use placeholder addresses
-                supply_addresses.append(f"agent1q{agent_name}_placeholder")
-            else:
-                print(f"⚠️  Failed to start {agent_name}, continuing...")
-        
-        # Update need agent with supply addresses
-        if supply_addresses:
-            self.services['need_agent']['env_vars']['SUPPLY_ADDRS'] = ','.join(supply_addresses)
-        
-        # Start need agent
-        if not self.start_service('need_agent', self.services['need_agent']):
-            print("⚠️  Failed to start need agent, continuing...")
-        
-        # Start coordination agent last
-        if not self.start_service('coordination_agent', self.services['coordination_agent']):
-            print("⚠️  Failed to start coordination agent, continuing...")
+        print(f"\n🎯 All services started in {self._elapsed():.2f}s!")
+        print("\n⏱️  Time to ready (own / since start):")
+        for name, (own, total) in sorted(self.time_to_ready.items(), key=lambda kv: kv[1][1]):
+            status = "❌" if self.failed.get(name) else "✅"
+            print(f"   {status} {name}: {own:.2f}s / {total:.2f}s")
         
-        print("\n🎯 All services started!")
         print("\n📊 Service Status:")
         for process_info in self.processes:
             status = "Running" if process_info['process'].poll() is None else "Stopped"
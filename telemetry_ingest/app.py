@@ -1,9 +1,22 @@
 # telemetry_ingest/app.py
 import os
-from typing import Optional, Dict, Any, Literal
+import sys
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Literal
 from fastapi import FastAPI
-from pydantic import BaseModel
-from elasticsearch import Elasticsearch
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, ValidationError
+
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
+
+# shared loop-lag / blocking-call detector (agentaid-marketplace/services/loopmon.py); optional
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "agentaid-marketplace"))
+try:
+    from services.loopmon import format_block, start_loop_monitor
+except Exception:
+    start_loop_monitor = None
 
 ES_URL = os.getenv("ES_URL", "https://my-elasticsearch-project-b5bb84.es.us-west-2.aws.elastic.cloud/")
 ES_API_KEY = os.getenv("bEtYb0hKb0Jmb09sVUNqMnRMcXc6SXJTRi05emJxQXBheGhQTEE5YTFidw==")
@@ -18,14 +31,34 @@ _DEFAULT_HEADERS = {
 }
 
 
-if ES_API_KEY:
-    es = Elasticsearch(ES_URL, api_key=ES_API_KEY, headers=_DEFAULT_HEADERS, request_timeout=30)
-else:
-    es = Elasticsearch(ES_URL, headers=_DEFAULT_HEADERS, request_timeout=30)
+# built on the first ingest: importing elasticsearch is most of this app's
+# cold start, and /health and /metrics never touch it
+_es: Optional["Elasticsearch"] = None
+
+def get_es() -> "Elasticsearch":
+    global _es
+    if _es is None:
+        from elasticsearch import Elasticsearch
+        if ES_API_KEY:
+            _es = Elasticsearch(ES_URL, api_key=ES_API_KEY, headers=_DEFAULT_HEADERS, request_timeout=30)
+        else:
+            _es = Elasticsearch(ES_URL, headers=_DEFAULT_HEADERS, request_timeout=30)
+    return _es
 
 app = FastAPI(title="AgentAid Telemetry Ingest")
+loop_monitor = None
+log = logging.getLogger("uvicorn.error")
 
-def es_client() -> Elasticsearch:
+@app.on_event("startup")
+async def start_monitoring():
+    # shows anything still holding the event loop (the ES calls run in the threadpool)
+    global loop_monitor
+    if start_loop_monitor is not None:
+        loop_monitor = start_loop_monitor("telemetry_ingest",
+                                          on_block=lambda b: log.warning(f"[ingest] {format_block(b)}"))
+
+def es_client() -> "Elasticsearch":
+    from elasticsearch import Elasticsearch
     headers = {"Accept": ES_ACCEPT, "Content-Type": ES_CT}
     if ES_API_KEY:
         return Elasticsearch(ES_URL, api_key=ES_API_KEY, headers=headers, request_timeout=30)
@@ -33,23 +66,62 @@ def es_client() -> Elasticsearch:
 
 class AgentEvent(BaseModel):
     ts: float
-    agent_type: Literal["needer","supplier"]
+    agent_type: Literal["needer","supplier","coordinator"]
     agent_id: str
-    event_type: Literal["quote_request","quote_response","accept_sent","allocation_notice","error"]
+    event_type: Literal["quote_request","quote_response","accept_sent","allocation_notice","error",
+                        "quote_cache_stats","scheduler_stats","request_received","status_update",
+                        "quote_received","allocation_confirmed","span","loop_stats","loop_block"]
     need_id: Optional[str] = None
     supplier_id: Optional[str] = None
     meta: Optional[Dict[str, Any]] = None
     lat: Optional[float] = None
     lon: Optional[float] = None
     duration_ms: Optional[float] = None
+    # spans (services/tracing.py): parent_id links the tree across agents
+    span_name: Optional[str] = None
+    trace_id: Optional[str] = None
+    span_id: Optional[str] = None
+    parent_id: Optional[str] = None
+
+def to_doc(ev: AgentEvent) -> Dict[str, Any]:
+    doc = ev.dict(exclude_none=True)
+    doc["@timestamp"] = int(ev.ts * 1000)
+    return doc
 
 @app.get("/health")
 async def health():
     return {"status":"ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Event-loop lag histogram and blocking counters (Prometheus text format)."""
+    return loop_monitor.prometheus() if loop_monitor is not None else ""
+
+# The Elasticsearch client is synchronous, so the ingest routes are plain
+# `def`: FastAPI runs them in its threadpool instead of on the event loop.
 @app.post("/ingest")
-async def ingest(ev: AgentEvent):
-    doc = ev.dict()
-    doc["@timestamp"] = int(ev.ts * 1000)
-    es.index(index=TELEMETRY_INDEX, document=doc)
+def ingest(ev: AgentEvent):
+    get_es().index(index=TELEMETRY_INDEX, document=to_doc(ev))
     return {"ok": True}
+
+@app.post("/ingest/batch")
+def ingest_batch(raw: List[Dict[str, Any]]):
+    """
+    Agents' TelemetryExporter posts here: one bulk request per batch instead of
+    one index call per event. Events are validated one by one, so a malformed
+    event is reported in `rejected` instead of failing the whole batch.
+    """
+    from elasticsearch import helpers
+    evs: List[AgentEvent] = []
+    rejected: List[Dict[str, Any]] = []
+    for i, item in enumerate(raw):
+        try:
+            evs.append(AgentEvent.model_validate(item))
+        except ValidationError as e:
+            rejected.append({"index": i, "errors": [f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                                                    for err in e.errors()]})
+    indexed, errors = 0, []
+    if evs:
+        indexed, errors = helpers.bulk(get_es(), ({"_index": TELEMETRY_INDEX, "_source": to_doc(ev)} for ev in evs),
+                                       raise_on_error=False)
+    return {"ok": not errors and not rejected, "indexed": indexed, "errors": len(errors), "rejected": rejected}
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Quote admission control: a batch of N quotes is charged N tokens from the
+sender's bucket and holds N pending slots, so batching cannot bypass either limit.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "agentaid-marketplace"))
+
+from services.admission import OVERLOADED, RATE_LIMITED, AdmissionControl  # noqa: E402
+
+
+def test_batch_of_n_takes_n_tokens():
+    adm = AdmissionControl(rate=1.0, burst=10.0, max_pending=0)
+    assert adm.admit("a", cost=7) == (None, 0.0)
+    # 3 tokens left: a 4-quote batch waits for the missing one, 3 singles still pass
+    reason, retry_after = adm.admit("a", cost=4)
+    assert reason == RATE_LIMITED and retry_after == pytest.approx(1.0, abs=0.05)
+    for _ in range(3):
+        assert adm.admit("a")[0] is None
+    assert adm.admit("a")[0] == RATE_LIMITED
+    # other senders have their own bucket
+    assert adm.admit("b", cost=10)[0] is None
+
+
+def test_batch_holds_n_pending_slots():
+    adm = AdmissionControl(rate=0, max_pending=20, critical_reserve=0.1)   # 18 for non-critical
+    assert adm.admit("a", cost=15)[0] is None
+    assert adm.pending == 15
+    assert adm.admit("b", cost=4)[0] == OVERLOADED
+    assert adm.admit("b", cost=3)[0] is None
+    # the critical reserve is shared out per quote too
+    assert adm.admit("c", critical=True, cost=3)[0] == OVERLOADED
+    assert adm.admit("c", critical=True, cost=2)[0] is None
+
+    adm.release(0.3, cost=15)
+    assert adm.pending == 5
+    assert adm.admit("b", cost=10)[0] is None
+
+
+def test_release_tracks_time_per_quote():
+    adm = AdmissionControl(rate=0, max_pending=4, workers=1)
+    adm.admit("a", cost=4)
+    for _ in range(100):
+        adm.release(2.0, cost=4)          # 0.5 s per quote
+    adm.pending = 4
+    reason, retry_after = adm.admit("a")
+    assert reason == OVERLOADED and retry_after == pytest.approx(2.0, rel=0.01)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
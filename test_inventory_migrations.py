@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Inventory schema migrations against scratch SQLite files: a legacy
+setup_dummy_suppliers DB upgraded to the current version, and the v2 catalog
+backfill merging item rows that resolve to one item.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "agentaid-marketplace"))
+
+from services.inventory_db import connect, deduct_allocation, get_inventory  # noqa: E402
+from services.migrations import migrate  # noqa: E402
+
+
+def make_legacy_db(path):
+    """The old key/inventory layout, stamped user_version 2 as that module did."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE NOT NULL,
+            lat REAL NOT NULL, lon REAL NOT NULL, label TEXT NOT NULL,
+            base_lead_h REAL NOT NULL, radius_km REAL NOT NULL, delivery_mode TEXT NOT NULL
+        );
+        CREATE TABLE inventory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_id INTEGER NOT NULL,
+            name TEXT NOT NULL, qty INTEGER NOT NULL, unit TEXT NOT NULL,
+            unit_price REAL NOT NULL, category TEXT NOT NULL,
+            FOREIGN KEY (supplier_id) REFERENCES suppliers(id)
+        );
+        CREATE UNIQUE INDEX idx_inventory_supplier_name ON inventory (supplier_id, name);
+        INSERT INTO suppliers VALUES (1, 'depot_a', 37.77, -122.42, 'Depot A', 1.5, 120, 'truck');
+        INSERT INTO inventory(supplier_id, name, qty, unit, unit_price, category) VALUES
+            (1, 'blanket',      10, 'ea',   12.0, 'shelter'),
+            (1, 'Blankets',      5, 'ea',    0.0, 'shelter'),
+            (1, 'water',         3, 'case',  0.0, 'food'),
+            (1, 'water bottle',  4, 'case',  1.5, 'food'),
+            (1, 'tent',          2, 'ea',   90.0, 'shelter');
+        PRAGMA user_version = 2;
+    """)
+    conn.commit()
+    conn.close()
+
+
+def version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def stock(conn, supplier_id=1):
+    return {r["name"]: (r["qty"], r["unit"], r["unit_price"]) for r in get_inventory(conn, supplier_id)}
+
+
+def test_legacy_db_migrates_to_current(tmp_path):
+    db = str(tmp_path / "legacy.db")
+    make_legacy_db(db)
+    conn = connect(db)
+    try:
+        assert version(conn) == 5
+        assert conn.execute("SELECT name FROM suppliers WHERE id = 1").fetchone()[0] == "depot_a"
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"items", "item_catalog", "item_aliases", "processed_accepts", "inventory_legacy"} <= tables
+        assert "inventory" not in tables
+        # aliases and plurals collapse onto one canonical row each, quantities summed
+        assert stock(conn) == {
+            "blanket": (15, "ea", 12.0),
+            "water bottle": (7, "case", 1.5),
+            "tent": (2, "ea", 90.0),
+        }
+        assert conn.execute("SELECT COUNT(*) FROM items WHERE item_id IS NULL").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_migrate_is_a_no_op_once_current(tmp_path):
+    db = str(tmp_path / "legacy.db")
+    make_legacy_db(db)
+    connect(db).close()
+    conn = connect(db)
+    try:
+        before = conn.total_changes
+        assert migrate(conn) == 5
+        assert conn.total_changes == before
+    finally:
+        conn.close()
+
+
+def test_v2_merges_rows_resolving_to_one_item(tmp_path):
+    """A v1 DB holding "water", "water bottle" and "Water Bottles" as separate rows."""
+    db = str(tmp_path / "v1.db")
+    conn = sqlite3.connect(db, isolation_level=None)
+    migrate(conn, target=1)
+    conn.execute("INSERT INTO suppliers(id, name, lat, lon) VALUES (1, 'depot_a', 37.77, -122.42)")
+    conn.executemany(
+        "INSERT INTO items(supplier_id, name, unit, unit_price, qty) VALUES (1, ?, ?, ?, ?)",
+        [("water", None, 0.0, 3), ("water bottle", "case", 1.5, 4), ("Water Bottles", "case", 2.0, 5)])
+    conn.close()
+
+    conn = connect(db)
+    try:
+        assert version(conn) == 5
+        assert stock(conn) == {"water bottle": (12, "case", 1.5)}
+        # a deduction now hits the single merged row, not every duplicate
+        deduct_allocation(conn, 1, [{"name": "water", "qty": 5}])
+        assert stock(conn) == {"water bottle": (7, "case", 1.5)}
+    finally:
+        conn.close()
+
+
+def test_failed_step_rolls_back_and_retries(tmp_path, monkeypatch):
+    from services import migrations
+
+    db = str(tmp_path / "fresh.db")
+    conn = sqlite3.connect(db, isolation_level=None)
+
+    def boom(c):
+        c.execute("CREATE TABLE half_done (x)")
+        raise RuntimeError("step failed")
+
+    steps = list(migrations.MIGRATIONS)
+    steps[4] = (5, "failing", boom)
+    monkeypatch.setattr(migrations, "MIGRATIONS", steps)
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
+    assert version(conn) == 4
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+
+    monkeypatch.undo()
+    assert migrations.migrate(conn) == 5
+    conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
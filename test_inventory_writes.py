@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Inventory write paths against a scratch SQLite file: Accept idempotency
+(deduct_once, directly and through the group-commit writer), apply_batch's
+per-op savepoints, and shutting the group-commit writer down.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "agentaid-marketplace"))
+
+from services.async_inventory import AsyncInventory  # noqa: E402
+from services.inventory_db import (  # noqa: E402
+    apply_batch, connect, deduct_items, deduct_once, ensure_supplier, get_catalog, get_inventory, tx, upsert_item,
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Path of a fresh DB with one supplier stocking blankets and water."""
+    path = str(tmp_path / "inv.db")
+    conn = connect(path)
+    sid = ensure_supplier(conn, "depot_a", 37.77, -122.42, "Depot A", 1.5, 120.0, "truck")
+    with tx(conn):
+        upsert_item(conn, sid, "blanket", 10, "ea", 12.0)
+        upsert_item(conn, sid, "water bottle", 20, "case", 1.5)
+    conn.close()
+    return path
+
+
+def qty(conn, name, supplier_id=1):
+    return {r["name"]: r["qty"] for r in get_inventory(conn, supplier_id)}.get(name)
+
+
+def test_deduct_once_ignores_a_replayed_accept(db):
+    conn = connect(db)
+    items = [{"name": "blankets", "qty": 3}, {"name": "water", "qty": 5}]
+    with tx(conn):
+        notice, duplicate = deduct_once(conn, 1, "need-1", "h1", items, '{"note": "first"}')
+    assert (notice, duplicate) == ('{"note": "first"}', False)
+
+    # the replay carries a fresh notice; the stored one comes back and stock is untouched
+    with tx(conn):
+        notice, duplicate = deduct_once(conn, 1, "need-1", "h1", items, '{"note": "replay"}')
+    assert (notice, duplicate) == ('{"note": "first"}', True)
+    assert (qty(conn, "blanket"), qty(conn, "water bottle")) == (7, 15)
+
+    # same need, different allocation: a separate Accept
+    with tx(conn):
+        _, duplicate = deduct_once(conn, 1, "need-1", "h2", [{"name": "blanket", "qty": 1}], "{}")
+    assert not duplicate and qty(conn, "blanket") == 6
+    conn.close()
+
+
+def test_deduct_once_survives_a_reconnect(db):
+    conn = connect(db)
+    with tx(conn):
+        deduct_once(conn, 1, "need-1", "h1", [{"name": "blanket", "qty": 4}], "first")
+    conn.close()
+
+    # a restarted agent has no in-memory record of the Accept
+    conn = connect(db)
+    with tx(conn):
+        assert deduct_once(conn, 1, "need-1", "h1", [{"name": "blanket", "qty": 4}], "again") == ("first", True)
+    assert qty(conn, "blanket") == 6
+    conn.close()
+
+
+def test_replayed_accepts_in_one_group_commit(db):
+    async def run():
+        inv = AsyncInventory.open(db)
+        try:
+            items = [{"name": "water bottle", "qty": 2}]
+            return await asyncio.gather(*(inv.deduct_once(1, "need-9", "h", items, f"n{i}") for i in range(5)))
+        finally:
+            await inv.close()
+
+    results = asyncio.run(run())
+    assert results[0] == ("n0", False)
+    assert all(r == ("n0", True) for r in results[1:])
+    conn = connect(db)
+    assert qty(conn, "water bottle") == 18
+    conn.close()
+
+
+def test_apply_batch_rolls_back_only_the_failing_op(db):
+    conn = connect(db)
+    cat = get_catalog(conn)
+
+    def add_new_item(c):
+        cat.ensure(c, "ghost item")
+        c.execute("INSERT INTO items(supplier_id, name, qty) VALUES (1, 'ghost item', 1)")
+        raise ValueError("bad op")
+
+    out = apply_batch(conn, [
+        (deduct_items, (1, [{"name": "blanket", "qty": 2}])),
+        (add_new_item, ()),
+        (deduct_items, (1, [{"name": "water", "qty": 3}])),
+    ])
+    assert [type(e).__name__ if e else None for _, e in out] == [None, "ValueError", None]
+    assert (qty(conn, "blanket"), qty(conn, "water bottle"), qty(conn, "ghost item")) == (8, 17, None)
+    # the catalog id handed out inside the rolled-back savepoint was dropped
+    assert cat.resolve("ghost item") is None
+    assert conn.execute("SELECT 1 FROM item_catalog WHERE name = 'ghost item'").fetchone() is None
+    assert not conn.in_transaction
+    conn.close()
+
+
+def test_apply_batch_refreshes_catalog_when_the_transaction_fails(db):
+    conn = connect(db)
+    cat = get_catalog(conn)
+
+    class Interrupted(Exception):
+        pass
+
+    def ensure_item(c):
+        cat.ensure(c, "phantom item")
+
+    orig_execute = conn.execute
+
+    def failing_release(sql, *args):
+        if sql.startswith("RELEASE"):
+            raise Interrupted()
+        return orig_execute(sql, *args)
+
+    conn.execute = failing_release
+    try:
+        with pytest.raises(Interrupted):
+            apply_batch(conn, [(ensure_item, ())])
+    finally:
+        del conn.execute
+    assert not conn.in_transaction
+    assert cat.resolve("phantom item") is None
+    conn.close()
+
+
+def test_close_fails_writes_it_cannot_commit(db):
+    async def run():
+        inv = AsyncInventory.open(db)
+        await inv.deduct_once(1, "need-1", "h", [{"name": "blanket", "qty": 1}], "n")
+        # a writer that has already seen its stop sentinel leaves this one queued
+        inv._queue.put_nowait(None)
+        stranded = asyncio.ensure_future(inv.deduct_once(1, "need-2", "h", [{"name": "blanket", "qty": 1}], "n"))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(inv.close(), 5)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(stranded, 1)
+        with pytest.raises(RuntimeError):
+            await inv.deduct_once(1, "need-3", "h", [{"name": "blanket", "qty": 1}], "n")
+
+    asyncio.run(run())
+    conn = connect(db)
+    assert qty(conn, "blanket") == 9
+    conn.close()
+
+
+def test_avg_batch_counts_failed_ops(db):
+    def fail(conn):
+        raise ValueError("bad op")
+
+    async def run():
+        inv = AsyncInventory.open(db)
+        try:
+            ops = [inv._submit(fail) for _ in range(3)] + [inv.deduct_once(1, "n", "h", [], "n")]
+            await asyncio.gather(*ops, return_exceptions=True)
+            return inv.stats()
+        finally:
+            await inv.close()
+
+    stats = asyncio.run(run())
+    assert stats["writes"] == 1
+    assert stats["avg_batch"] == 4 / stats["commits"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))